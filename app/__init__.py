@@ -5,17 +5,24 @@ from flask import Flask
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
+from core.caching import fragment_cache
+from core.caching.response_cache import response_cache
 from core.configuration.configuration import get_app_version
 from core.managers.config_manager import ConfigManager
+from core.managers.database_manager import DatabaseManager
 from core.managers.error_handler_manager import ErrorHandlerManager
 from core.managers.logging_manager import LoggingManager
+from core.managers.metrics_manager import MetricsManager
 from core.managers.module_manager import ModuleManager
+from core.managers.query_profiler_manager import QueryProfilerManager
+from core.repositories.routing import RoutingSession
+from core.services import registry as service_registry
 
 # Load environment variables
 load_dotenv()
 
 # Create the instances
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
@@ -26,9 +33,21 @@ def create_app(config_name="development"):
     config_manager = ConfigManager(app)
     config_manager.load_config(config_name=config_name)
 
-    # Initialize SQLAlchemy and Migrate with the app
+    # Initialize SQLAlchemy (with the pool tuned for the environment) and Migrate with the app
+    database_manager = DatabaseManager(app)
+    database_manager.configure_engine()
     db.init_app(app)
     migrate.init_app(app, db)
+    database_manager.register_pool_metrics(db)
+    database_manager.register_replica_stickiness(db)
+
+    # Request-scoped services and memoized lookups for model helpers
+    service_registry.init_app(app)
+
+    # Cache of the public pages served to anonymous visitors
+    response_cache.init_app(app)
+    # {% cache %} fragments in templates
+    fragment_cache.init_app(app)
 
     # Register modules
     module_manager = ModuleManager(app)
@@ -51,6 +70,14 @@ def create_app(config_name="development"):
     logging_manager = LoggingManager(app)
     logging_manager.setup_logging()
 
+    # Prometheus metrics (/metrics)
+    metrics_manager = MetricsManager(app, db)
+    metrics_manager.setup_metrics()
+
+    # Opt-in per-request SQL profiler (SQL_PROFILER=true)
+    query_profiler_manager = QueryProfilerManager(app, db)
+    query_profiler_manager.setup_profiler()
+
     # Initialize error handler manager
     error_handler_manager = ErrorHandlerManager(app)
     error_handler_manager.register_error_handlers()
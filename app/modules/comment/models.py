@@ -1,3 +1,4 @@
+import math
 from datetime import datetime
 
 from app import db
@@ -38,3 +39,63 @@ class Comment(db.Model):
             "content": self.content,
             "parent_id": self.comment_parent_id,
         }
+
+
+class CommentThread:
+    """
+    A comment with its non-deleted replies, already loaded and nested to any depth.
+
+    Attribute access falls through to the wrapped ``Comment`` so templates can use ``thread.author``,
+    ``thread.content``, etc.; ``replies`` is a plain list instead of the dynamic relationship.
+    """
+
+    def __init__(self, comment: Comment):
+        self.comment = comment
+        self.replies = []
+
+    def __getattr__(self, name):
+        return getattr(self.comment, name)
+
+    def to_dict(self):
+        data = self.comment.to_dict()
+        data["replies"] = [reply.to_dict() for reply in self.replies]
+        return data
+
+
+class CommentThreadPage:
+    """One page of top-level threads, with the attributes of Flask-SQLAlchemy's ``Pagination`` used by templates."""
+
+    def __init__(self, items: list[CommentThread], page: int, per_page: int, total: int):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.per_page)) if self.per_page else 1
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    @property
+    def has_next(self) -> bool:
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self):
+        return range(1, self.pages + 1)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
@@ -1,3 +1,6 @@
+from sqlalchemy.orm import joinedload
+
+from app.modules.auth.models import User
 from app.modules.comment.models import Comment
 from core.repositories.BaseRepository import BaseRepository
 
@@ -10,6 +13,16 @@ class CommentRepository(BaseRepository):
         # Obtiene solo comentarios principales (sin parent_id)
         return (
             self.model.query.filter_by(dataset_id=dataset_id, comment_parent_id=None, is_deleted=False)
+            .options(joinedload(self.model.author).joinedload(User.profile))
             .order_by(self.model.created_at.desc())
             .all()
         )
+
+    def get_all_by_dataset_id(self, dataset_id: int) -> list[Comment]:
+        # Todos los comentarios no borrados (cualquier nivel) en una sola consulta, con autor y perfil
+        return (
+            self.model.query.filter_by(dataset_id=dataset_id, is_deleted=False)
+            .options(joinedload(self.model.author).joinedload(User.profile))
+            .order_by(self.model.created_at, self.model.id)
+            .all()
+        )
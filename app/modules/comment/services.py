@@ -1,21 +1,79 @@
+import hashlib
+import json
+import os
 from typing import Optional
 
-from app.modules.comment.models import Comment
+from app.modules.comment.models import Comment, CommentThread, CommentThreadPage
 from app.modules.comment.repositories import CommentRepository
+from core.caching.response_cache import response_cache
+from core.caching.versioned_cache import VersionedCache
 from core.services.BaseService import BaseService
 
+# Feed JSON de comentarios por dataset. Se invalida al crear/borrar comentarios; el TTL cubre
+# cambios de nombre en los perfiles de los autores.
+comment_feed_cache = VersionedCache(
+    "comment-feed",
+    maxsize=int(os.getenv("COMMENT_FEED_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("COMMENT_FEED_CACHE_TTL", "300")),
+)
+
 
 class CommentService(BaseService):
     def __init__(self):
         super().__init__(CommentRepository())
+        self.feed_cache = comment_feed_cache
 
     def get_comments_for_dataset(self, dataset_id: int) -> list[Comment]:
         return self.repository.get_by_dataset_id(dataset_id)
 
+    def get_comment_threads(self, dataset_id: int, page: int = 1, per_page: int = 20) -> CommentThreadPage:
+        """
+        Top-level threads of a dataset, newest first, with their replies nested to any depth (oldest first).
+
+        All comments are loaded with one query and the tree is assembled in memory; replies whose parent
+        was deleted are hidden along with it.
+        """
+        roots = self._build_threads(dataset_id)
+
+        page = max(1, page)
+        start = (page - 1) * per_page
+        return CommentThreadPage(roots[start : start + per_page], page=page, per_page=per_page, total=len(roots))
+
+    def get_comment_feed(self, dataset_id: int) -> tuple[bytes, str]:
+        """
+        Serialized JSON of every thread of a dataset and its ETag.
+
+        The body is cached per dataset until a comment of that dataset is created or deleted.
+        """
+        body, generation = self.feed_cache.get(dataset_id)
+        if body is None:
+            threads = self._build_threads(dataset_id)
+            body = json.dumps([thread.to_dict() for thread in threads], separators=(",", ":")).encode()
+            self.feed_cache.set(dataset_id, generation, body)
+        return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def _build_threads(self, dataset_id: int) -> list[CommentThread]:
+        threads = {comment.id: CommentThread(comment) for comment in self.repository.get_all_by_dataset_id(dataset_id)}
+
+        roots = []
+        for thread in threads.values():
+            if thread.comment_parent_id is None:
+                roots.append(thread)
+            elif thread.comment_parent_id in threads:
+                threads[thread.comment_parent_id].replies.append(thread)
+        roots.reverse()
+        return roots
+
     def create_comment(self, author_id: int, dataset_id: int, content: str, parent_id: Optional[int] = None) -> Comment:
-        return self.create(author_id=author_id, dataset_id=dataset_id, content=content, comment_parent_id=parent_id)
+        comment = self.create(author_id=author_id, dataset_id=dataset_id, content=content, comment_parent_id=parent_id)
+        self.feed_cache.invalidate(dataset_id)
+        response_cache.invalidate(f"dataset:{dataset_id}")
+        return comment
 
     def delete_comment(self, comment_id: int):
         # Implementación de 'moderación' suave (soft delete)
         comment = self.repository.get_or_404(comment_id)
-        return self.repository.update(comment.id, is_deleted=True)
+        updated = self.repository.update(comment.id, is_deleted=True)
+        self.feed_cache.invalidate(comment.dataset_id)
+        response_cache.invalidate(f"dataset:{comment.dataset_id}")
+        return updated
@@ -3,6 +3,7 @@ import pytest
 import app.modules.dataset.routes as dataset_routes
 from app import create_app
 from app.modules.comment.services import CommentService
+from core.caching.versioned_cache import VersionedCache
 
 # ============================================================
 # Mocks para Pruebas Unitarias
@@ -203,23 +204,32 @@ def test_list_comments_success(client, monkeypatch):
         def __init__(self, id, content):
             self.id = id
             self.content = content
+            self.comment_parent_id = None
 
         def to_dict(self):
             return {"id": self.id, "content": self.content}
 
-    class StubService:
-        def get_comments_for_dataset(self, dataset_id):
-            return [DummyComment(1, "Hola"), DummyComment(2, "Adiós")]
+    class StubRepo:
+        def get_all_by_dataset_id(self, dataset_id):
+            return [DummyComment(2, "Adiós"), DummyComment(1, "Hola")]
 
-    monkeypatch.setattr(dataset_routes, "comment_service", StubService())
+    svc = CommentService()
+    svc.repository = StubRepo()
+    svc.feed_cache = VersionedCache("test-comment-feed", redis_url="")
+    monkeypatch.setattr(dataset_routes, "comment_service", svc)
 
     resp = client.get("/dataset/5/comments")
     assert resp.status_code == 200
     assert resp.get_json() == [
-        {"id": 1, "content": "Hola"},
-        {"id": 2, "content": "Adiós"},
+        {"id": 1, "content": "Hola", "replies": []},
+        {"id": 2, "content": "Adiós", "replies": []},
     ]
 
+    # Polling con el ETag recibido: 304 sin cuerpo
+    resp = client.get("/dataset/5/comments", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert resp.data == b""
+
 
 # Prueba creación exitosa de comentario vía endpoint
 
@@ -347,3 +357,133 @@ def test_delete_comment_failure(client, monkeypatch):
     resp = client.delete("/comments/1")
     assert resp.status_code == 500
     assert resp.get_json().get("message") == "Failed to delete comment"
+
+
+# ============================================================
+# Carga de hilos de comentarios
+# ============================================================
+
+
+class ThreadRepo:
+    def __init__(self, comments):
+        self.comments = comments
+        self.calls = 0
+
+    def get_all_by_dataset_id(self, dataset_id):
+        self.calls += 1
+        return self.comments
+
+
+def make_thread_service(comments):
+    svc = CommentService()
+    svc.repository = ThreadRepo(comments)
+    return svc
+
+
+def test_get_comment_threads_builds_nested_tree_with_one_query():
+    # Orden de la consulta: created_at ascendente
+    comments = [
+        DummyComment(id=1, comment_parent_id=None, content="first"),
+        DummyComment(id=2, comment_parent_id=1, content="reply"),
+        DummyComment(id=3, comment_parent_id=None, content="second"),
+        DummyComment(id=4, comment_parent_id=2, content="reply to reply"),
+        DummyComment(id=5, comment_parent_id=1, content="another reply"),
+    ]
+    svc = make_thread_service(comments)
+
+    threads = svc.get_comment_threads(dataset_id=1)
+
+    assert svc.repository.calls == 1
+    assert [t.id for t in threads] == [3, 1]
+    first = threads.items[1]
+    assert [r.id for r in first.replies] == [2, 5]
+    assert [r.id for r in first.replies[0].replies] == [4]
+    assert first.content == "first"
+    assert first.to_dict()["replies"][0]["replies"][0]["id"] == 4
+
+
+def test_get_comment_threads_hides_replies_of_deleted_comments():
+    # El comentario 1 está borrado: no lo devuelve la consulta
+    comments = [DummyComment(id=2, comment_parent_id=1), DummyComment(id=3, comment_parent_id=None)]
+    threads = make_thread_service(comments).get_comment_threads(dataset_id=1)
+    assert [t.id for t in threads] == [3]
+
+
+def test_get_comment_threads_paginates_top_level():
+    comments = [DummyComment(id=i, comment_parent_id=None) for i in range(1, 6)]
+    svc = make_thread_service(comments)
+
+    page = svc.get_comment_threads(dataset_id=1, page=2, per_page=2)
+    assert [t.id for t in page] == [3, 2]
+    assert page.total == 5
+    assert page.pages == 3
+    assert page.has_prev and page.has_next
+    assert list(page.iter_pages()) == [1, 2, 3]
+
+    last = svc.get_comment_threads(dataset_id=1, page=3, per_page=2)
+    assert [t.id for t in last] == [1]
+    assert not last.has_next
+
+
+# ============================================================
+# Feed de comentarios cacheado
+# ============================================================
+
+
+def make_feed_service():
+    svc = CommentService()
+    svc.repository = DummyRepo()
+    svc.repository.get_all_by_dataset_id = lambda dataset_id: [
+        DummyComment(id=c.id, content=c.content, comment_parent_id=None)
+        for c in svc.repository._store.values()
+        if c.dataset_id == dataset_id and not getattr(c, "is_deleted", False)
+    ]
+    svc.feed_cache = VersionedCache("test-comment-feed", redis_url="")
+    return svc
+
+
+def test_comment_feed_is_cached_until_invalidated():
+    svc = make_feed_service()
+    svc.repository._store[1] = DummyComment(id=1, dataset_id=5, content="hola")
+    calls = []
+    load = svc.repository.get_all_by_dataset_id
+    svc.repository.get_all_by_dataset_id = lambda dataset_id: calls.append(dataset_id) or load(dataset_id)
+
+    body, etag = svc.get_comment_feed(5)
+    assert svc.get_comment_feed(5) == (body, etag)
+    assert calls == [5]
+
+    # Crear un comentario invalida solo el feed de su dataset
+    svc.get_comment_feed(6)
+    svc.create_comment(author_id=1, dataset_id=5, content="nuevo")
+    new_body, new_etag = svc.get_comment_feed(5)
+    svc.get_comment_feed(6)
+    assert calls == [5, 6, 5]
+    assert new_etag != etag
+
+
+def test_comment_feed_invalidated_on_delete():
+    svc = make_feed_service()
+    svc.repository._store[1] = DummyComment(id=1, dataset_id=5, content="hola")
+
+    body, _ = svc.get_comment_feed(5)
+    assert b"hola" in body
+
+    svc.delete_comment(1)
+    body, _ = svc.get_comment_feed(5)
+    assert body == b"[]"
+
+
+def test_versioned_cache_local_tier():
+    cache = VersionedCache("test", redis_url="")
+    value, generation = cache.get("k")
+    assert value is None
+    cache.set("k", generation, b"v")
+    assert cache.get("k") == (b"v", generation)
+
+    cache.invalidate("k")
+    value, new_generation = cache.get("k")
+    assert value is None and new_generation == generation + 1
+    # Un valor calculado antes de invalidar no se vuelve a servir
+    cache.set("k", generation, b"old")
+    assert cache.get("k")[0] is None
@@ -38,6 +38,28 @@ class FMMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     solver = db.Column(db.Text)
     not_solver = db.Column(db.Text)
+    # Estadísticas del CSV calculadas al añadirlo a un dataset (app/modules/dataset/csv_stats.py)
+    row_count = db.Column(db.Integer)
+    alcohol_min = db.Column(db.Float)
+    alcohol_max = db.Column(db.Float)
+    alcohol_mean = db.Column(db.Float)
+    ibu_min = db.Column(db.Float)
+    ibu_max = db.Column(db.Float)
+    ibu_mean = db.Column(db.Float)
+    # {valor: número de filas}
+    styles = db.Column(db.JSON)
+    brands = db.Column(db.JSON)
+    origins = db.Column(db.JSON)
+
+    def to_dict(self):
+        return {
+            "row_count": self.row_count,
+            "alcohol": {"min": self.alcohol_min, "max": self.alcohol_max, "mean": self.alcohol_mean},
+            "ibu": {"min": self.ibu_min, "max": self.ibu_max, "mean": self.ibu_mean},
+            "styles": self.styles or {},
+            "brands": self.brands or {},
+            "origins": self.origins or {},
+        }
 
     def __repr__(self):
         return f"FMMetrics<solver={self.solver}, not_solver={self.not_solver}>"
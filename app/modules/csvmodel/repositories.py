@@ -1,13 +1,15 @@
 from sqlalchemy import func
 
-from app.modules.csvmodel.models import CSVModel, FMMetaData
+from app.modules.csvmodel.models import CSVModel, FMMetaData, FMMetrics
 from core.repositories.BaseRepository import BaseRepository
+from core.repositories.routing import read_only
 
 
 class CSVModelRepository(BaseRepository):
     def __init__(self):
         super().__init__(CSVModel)
 
+    @read_only
     def count_csv_models(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -16,3 +18,17 @@ class CSVModelRepository(BaseRepository):
 class FMMetaDataRepository(BaseRepository):
     def __init__(self):
         super().__init__(FMMetaData)
+
+    def get_without_stats(self) -> list[FMMetaData]:
+        """CSV models whose statistics have not been computed (uploaded before they existed)."""
+        return (
+            self.model.query.outerjoin(FMMetrics, self.model.fm_metrics_id == FMMetrics.id)
+            .filter(FMMetrics.row_count.is_(None))
+            .order_by(self.model.id)
+            .all()
+        )
+
+
+class FMMetricsRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(FMMetrics)
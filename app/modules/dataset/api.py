@@ -13,7 +13,15 @@ dataset_fields = {
     "files": "files",
 }
 
-dataset_serializer = Serializer(dataset_fields, related_serializers={"files": file_serializer})
+dataset_serializer = Serializer(
+    dataset_fields,
+    related_serializers={"files": file_serializer},
+    eager_load={
+        "name": ["ds_meta_data"],
+        "doi": ["ds_meta_data"],
+        "files": ["csv_models.files"],
+    },
+)
 
 DataSetResource = create_resource(DataSet, dataset_serializer)
 
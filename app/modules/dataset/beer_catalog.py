@@ -0,0 +1,178 @@
+import logging
+import math
+import os
+
+from flask import current_app
+
+from app.modules.dataset.csv_stats import iter_csv_rows
+from core.files.columnar_index import ColumnarIndex
+from core.files.columnar_store import ColumnarStore
+
+logger = logging.getLogger(__name__)
+
+# Columnas de los CSV de cervezas (ver validate_csv_content) y su tipo en el almacén columnar
+BEER_COLUMNS = {
+    "id": "str",
+    "name": "str",
+    "brand": "str",
+    "style": "str",
+    "alcohol": "float",
+    "ibu": "int",
+    "origin": "str",
+}
+BEER_TEXT_COLUMNS = ("name", "brand", "style", "origin")
+RANGE_OPS = ("gt", "ge", "lt", "le")
+MAX_QUERY_LIMIT = 1000
+
+
+def beer_store() -> ColumnarStore:
+    """Columnar copy of every uploaded beer CSV, under ``COLUMNAR_STORE_DIR`` (one store per app)."""
+    store = current_app.extensions.get("beer_store")
+    if store is None:
+        root = current_app.config.get("COLUMNAR_STORE_DIR") or os.path.join(
+            os.path.dirname(current_app.root_path), "columnar"
+        )
+        store = current_app.extensions["beer_store"] = ColumnarStore(os.path.join(root, "beers"))
+    return store
+
+
+def beer_index() -> ColumnarIndex:
+    """Inverted index over the text columns of ``beer_store()`` (one per app and process)."""
+    index = current_app.extensions.get("beer_index")
+    if index is None:
+        index = current_app.extensions["beer_index"] = ColumnarIndex(beer_store(), BEER_TEXT_COLUMNS)
+    return index
+
+
+def table_key(dataset_id: int, file_id: int) -> str:
+    return f"dataset_{dataset_id}/file_{file_id}"
+
+
+def read_beer_columns(file_path: str) -> dict:
+    """Columns (``{name: values}``) of a validated beer CSV, read in one streaming pass."""
+    columns = {name: [] for name in BEER_COLUMNS}
+    positions = None
+    for row in iter_csv_rows(file_path):
+        if positions is None:
+            header = [cell.strip().lower() for cell in row]
+            positions = {name: header.index(name) for name in BEER_COLUMNS if name in header}
+            continue
+        for name in BEER_COLUMNS:
+            index = positions.get(name)
+            columns[name].append(row[index].strip() if index is not None and index < len(row) else "")
+    return columns
+
+
+def write_beer_table(dataset_id: int, file_id: int, file_path: str):
+    key = table_key(dataset_id, file_id)
+    beer_store().write(
+        key, BEER_COLUMNS, read_beer_columns(file_path), attrs={"dataset_id": dataset_id, "file_id": file_id}
+    )
+    # Los demás procesos la incorporan en su siguiente refresh del índice
+    beer_index().add(key)
+
+
+def write_beer_tables(dataset_id: int, files):
+    """Columnar tables of ``(file_id, path)`` pairs; a failure is logged, the CSVs stay the source of truth."""
+    for file_id, file_path in files:
+        try:
+            write_beer_table(dataset_id, file_id, file_path)
+        except Exception as exc:
+            logger.warning("Could not write the columnar table of file %s: %s", file_id, exc)
+
+
+def parse_beer_filters(args) -> list:
+    """
+    ``(column, op, value)`` filters from query arguments: ``style=IPA`` (repeat it for several values),
+    ``name_contains=stout`` and ``alcohol_gt=7`` / ``_ge`` / ``_lt`` / ``_le`` on numeric columns.
+    """
+    filters = []
+    for name, kind in BEER_COLUMNS.items():
+        values = args.getlist(name)
+        if len(values) == 1:
+            filters.append((name, "eq", _typed(values[0], kind)))
+        elif values:
+            filters.append((name, "in", [_typed(value, kind) for value in values]))
+        if kind == "str" and args.get(f"{name}_contains"):
+            filters.append((name, "contains", args.get(f"{name}_contains")))
+        if kind != "str":
+            for op in ("gt", "ge", "lt", "le"):
+                if args.get(f"{name}_{op}"):
+                    filters.append((name, op, _bound(args.get(f"{name}_{op}"))))
+    return filters
+
+
+def query_beers(filters, dataset_ids=None, limit: int = 100) -> dict:
+    """Rows of every stored beer CSV matching ``filters`` (only of ``dataset_ids`` if given)."""
+    store = beer_store()
+    keys = store.keys()
+    if dataset_ids is not None:
+        groups = {f"dataset_{dataset_id}" for dataset_id in dataset_ids}
+        keys = [key for key in keys if key.split("/", 1)[0] in groups]
+    return store.scan(filters, keys=keys, limit=min(max(limit, 0), MAX_QUERY_LIMIT))
+
+
+def parse_beer_search(args) -> dict:
+    """
+    Arguments of ``beer_index().search`` from query arguments: ``brand=North`` (whole value, case
+    insensitive, repeat it for several values), ``q=hop stout`` (words anywhere in the row) and
+    ``alcohol_gt=7`` / ``_ge`` / ``_lt`` / ``_le`` on numeric columns.
+    """
+    values = {name: args.getlist(name) for name in BEER_TEXT_COLUMNS if args.getlist(name)}
+    ranges = [
+        (name, op, _bound(args.get(f"{name}_{op}")))
+        for name, kind in BEER_COLUMNS.items()
+        if kind != "str"
+        for op in RANGE_OPS
+        if args.get(f"{name}_{op}")
+    ]
+    return {"values": values, "tokens": args.getlist("q"), "ranges": ranges}
+
+
+def search_beers(values=None, tokens=(), ranges=(), dataset_ids=None) -> dict:
+    """
+    Datasets and files with rows matching the search, with their number of matching rows (hits).
+
+    Datasets are sorted by hits; ``dataset_ids`` restricts the search to those datasets.
+    """
+    index = beer_index()
+    keys = None
+    if dataset_ids is not None:
+        groups = {f"dataset_{dataset_id}" for dataset_id in dataset_ids}
+        keys = [key for key in index.store.keys() if key.split("/", 1)[0] in groups]
+    hits = index.search(values=values, tokens=tokens, ranges=ranges, keys=keys)
+
+    datasets = {}
+    for key, count in hits.items():
+        table = index.store.open(key)
+        if table is None:
+            # Borrada (p. ej. csv:columnar u otro proceso) entre la búsqueda y ahora
+            continue
+        attrs = table.attrs
+        dataset = datasets.setdefault(attrs["dataset_id"], {"dataset_id": attrs["dataset_id"], "hits": 0, "files": []})
+        dataset["hits"] += count
+        dataset["files"].append({"file_id": attrs["file_id"], "hits": count})
+    ranked = sorted(datasets.values(), key=lambda dataset: (-dataset["hits"], dataset["dataset_id"]))
+    for dataset in ranked:
+        dataset["files"].sort(key=lambda file: (-file["hits"], file["file_id"]))
+    return {"total_hits": sum(dataset["hits"] for dataset in ranked), "datasets": ranked}
+
+
+def _typed(value: str, kind: str):
+    if kind == "float":
+        return _bound(value)
+    if kind == "int":
+        number = _bound(value)
+        # Truncar ibu=35.5 a 35 devolvería filas que no piden
+        if not number.is_integer():
+            raise ValueError(f"'{value}' is not an integer")
+        return int(number)
+    return value
+
+
+def _bound(value: str) -> float:
+    # Los límites de un rango no se truncan: ibu_ge=20.5 no debe aceptar 20 ni ibu_lt=20.5 rechazarlo
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"'{value}' is not a finite number")
+    return number
@@ -0,0 +1,79 @@
+import csv
+from collections import Counter
+from itertools import islice
+
+NUMERIC_COLUMNS = ("alcohol", "ibu")
+# Columna del CSV -> campo de FMMetrics con el recuento de cada valor
+FACET_COLUMNS = {"style": "styles", "brand": "brands", "origin": "origins"}
+
+
+class CSVStatsAccumulator:
+    """
+    Running statistics of the rows of a beer CSV: row count, min/max/mean of ``alcohol`` and
+    ``ibu`` and how many rows have each style, brand and origin. Rows are added one at a time, so
+    memory only grows with the number of distinct facet values.
+    """
+
+    def __init__(self, header):
+        positions = {name.strip().lower(): index for index, name in enumerate(header)}
+        self.numeric = {name: positions[name] for name in NUMERIC_COLUMNS if name in positions}
+        self.facets = {name: positions[name] for name in FACET_COLUMNS if name in positions}
+        self.row_count = 0
+        self.totals = {name: 0.0 for name in self.numeric}
+        self.counts = {name: 0 for name in self.numeric}
+        self.minimums = {}
+        self.maximums = {}
+        self.values = {name: Counter() for name in self.facets}
+
+    def add(self, row):
+        self.row_count += 1
+        for name, index in self.numeric.items():
+            try:
+                value = float(row[index])
+            except (IndexError, ValueError):
+                continue
+            self.totals[name] += value
+            self.counts[name] += 1
+            self.minimums[name] = min(value, self.minimums.get(name, value))
+            self.maximums[name] = max(value, self.maximums.get(name, value))
+        for name, index in self.facets.items():
+            if index < len(row) and row[index].strip():
+                self.values[name][row[index].strip()] += 1
+
+    def to_dict(self) -> dict:
+        stats = {"row_count": self.row_count}
+        for name in NUMERIC_COLUMNS:
+            count = self.counts.get(name, 0)
+            stats[f"{name}_min"] = self.minimums.get(name)
+            stats[f"{name}_max"] = self.maximums.get(name)
+            stats[f"{name}_mean"] = round(self.totals[name] / count, 4) if count else None
+        for name, field in FACET_COLUMNS.items():
+            stats[field] = dict(self.values[name].most_common()) if name in self.values else {}
+        return stats
+
+
+def iter_csv_rows(file_path: str):
+    """Non-empty rows of a CSV file (header first), streamed with the dialect ``validate_csv_content`` detects."""
+    with open(file_path, "r", encoding="utf-8-sig", errors="ignore", newline="") as file:
+        sample = "".join(islice(file, 10))
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "\t"])
+        except csv.Error:
+            dialect = csv.excel
+        file.seek(0)
+
+        for row in csv.reader(file, dialect):
+            if any(cell.strip() for cell in row):
+                yield row
+
+
+def compute_csv_stats(file_path: str) -> dict:
+    """Statistics of a validated beer CSV (see ``validate_csv_content``) in one streaming pass over the file."""
+    accumulator = None
+    for row in iter_csv_rows(file_path):
+        if accumulator is None:
+            accumulator = CSVStatsAccumulator(row)
+        else:
+            accumulator.add(row)
+
+    return (accumulator or CSVStatsAccumulator([])).to_dict()
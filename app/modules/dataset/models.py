@@ -1,10 +1,13 @@
+import hashlib
 from datetime import datetime
 from enum import Enum
 
 from flask import request
 from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import inspect
 
 from app import db
+from core.services.registry import get_service, request_memoize
 
 
 class PublicationType(Enum):
@@ -16,6 +19,20 @@ class PublicationType(Enum):
     OTHER = "other"
 
 
+class PublicationStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    PUBLISHED = "published"
+    FAILED = "failed"
+
+
+class PublicationStep(Enum):
+    CREATE_DEPOSITION = "create deposition"
+    UPLOAD_FILES = "upload files"
+    PUBLISH = "publish"
+    DONE = "done"
+
+
 class Author(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -44,8 +61,15 @@ class DSMetaData(db.Model):
     description = db.Column(db.Text, nullable=False)
     publication_type = db.Column(SQLAlchemyEnum(PublicationType), nullable=False)
     publication_doi = db.Column(db.String(120))
-    dataset_doi = db.Column(db.String(120))
+    dataset_doi = db.Column(db.String(120), index=True)
     tags = db.Column(db.String(120))
+
+    # Estado de la publicación asíncrona en Zenodo/Fakenodo (step = siguiente paso pendiente)
+    publication_status = db.Column(SQLAlchemyEnum(PublicationStatus))
+    publication_step = db.Column(SQLAlchemyEnum(PublicationStep))
+    publication_error = db.Column(db.Text)
+    publication_updated_at = db.Column(db.DateTime)
+
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
     authors = db.relationship("Author", backref="ds_meta_data", lazy=True, cascade="all, delete")
@@ -57,6 +81,9 @@ class DataSet(db.Model):
 
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Agregados de sus ficheros, mantenidos al crear/borrar ficheros (ver hubfile/models.py y rosemary db:aggregates)
+    files_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_size_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
 
     ds_meta_data = db.relationship("DSMetaData", backref=db.backref("data_set", uselist=False))
     csv_models = db.relationship("CSVModel", backref="data_set", lazy=True, cascade="all, delete")
@@ -81,23 +108,37 @@ class DataSet(db.Model):
         return f"https://zenodo.org/record/{self.ds_meta_data.deposition_id}" if self.ds_meta_data.dataset_doi else None
 
     def get_files_count(self):
-        return sum(len(fm.files) for fm in self.csv_models)
+        return self.files_count or 0
 
     def get_file_total_size(self):
-        return sum(file.size for fm in self.csv_models for file in fm.files)
+        return self.total_size_bytes or 0
 
     def get_file_total_size_for_human(self):
         from app.modules.dataset.services import SizeService
 
-        return SizeService().get_human_readable_size(self.get_file_total_size())
+        return get_service(SizeService).get_human_readable_size(self.get_file_total_size())
 
     def get_csvhub_doi(self):
         from app.modules.dataset.services import DataSetService
 
-        return DataSetService().get_csvhub_doi(self)
+        return request_memoize("dataset_doi", self.id, lambda: get_service(DataSetService).get_csvhub_doi(self))
 
-    def to_dict(self):
-        return {
+    def get_cache_version(self):
+        """Short hash of the dataset's metadata row (DOI, publication state...), for versioned cache keys."""
+        meta = self.ds_meta_data
+        state = [getattr(meta, attr.key) for attr in inspect(meta).mapper.column_attrs]
+        return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+    def get_metadata_cache_version(self):
+        """``get_cache_version`` plus what the metadata section also shows: the authors and the uploader's name."""
+        authors = [(author.name, author.affiliation, author.orcid) for author in self.ds_meta_data.authors]
+        profile = self.user.profile
+        uploader = (profile.name, profile.surname) if profile else None
+        state = [self.get_cache_version(), authors, uploader]
+        return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+    def to_dict(self, include_files: bool = True):
+        data = {
             "title": self.ds_meta_data.title,
             "id": self.id,
             "created_at": self.created_at,
@@ -111,11 +152,13 @@ class DataSet(db.Model):
             "url": self.get_csvhub_doi(),
             "download": f'{request.host_url.rstrip("/")}/dataset/download/{self.id}',
             "zenodo": self.get_zenodo_url(),
-            "files": [file.to_dict() for fm in self.csv_models for file in fm.files],
             "files_count": self.get_files_count(),
             "total_size_in_bytes": self.get_file_total_size(),
             "total_size_in_human_format": self.get_file_total_size_for_human(),
         }
+        if include_files:
+            data["files"] = [file.to_dict() for fm in self.csv_models for file in fm.files]
+        return data
 
     def __repr__(self):
         return f"DataSet<{self.id}>"
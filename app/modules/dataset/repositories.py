@@ -3,10 +3,13 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from flask_login import current_user
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.orm import contains_eager, joinedload
 
+from app.modules.auth.models import User
 from app.modules.dataset.models import Author, DataSet, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord
 from core.repositories.BaseRepository import BaseRepository
+from core.repositories.routing import read_only
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,7 @@ class DSDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSDownloadRecord)
 
+    @read_only
     def total_dataset_downloads(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -37,6 +41,7 @@ class DSViewRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSViewRecord)
 
+    @read_only
     def total_dataset_views(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -84,12 +89,64 @@ class DataSetRepository(BaseRepository):
             .first()
         )
 
+    @read_only
     def count_synchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.isnot(None)).count()
 
+    @read_only
     def count_unsynchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.is_(None)).count()
 
+    def get_by_doi(self, doi: str) -> Optional[DataSet]:
+        """Dataset with a given DOI (indexed lookup), with its metadata, authors and owner profile loaded."""
+        return (
+            self.model.query.join(DSMetaData)
+            .filter(DSMetaData.dataset_doi == doi)
+            .options(
+                contains_eager(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+                joinedload(DataSet.user).joinedload(User.profile),
+            )
+            .first()
+        )
+
+    @staticmethod
+    def _actual_file_aggregates():
+        """Correlated subqueries with the file count and total size of a dataset, computed from its file rows."""
+        from app.modules.csvmodel.models import CSVModel
+        from app.modules.hubfile.models import Hubfile
+
+        def aggregate(expression):
+            return (
+                select(expression)
+                .select_from(Hubfile)
+                .join(CSVModel, Hubfile.csv_model_id == CSVModel.id)
+                .where(CSVModel.data_set_id == DataSet.id)
+                .scalar_subquery()
+            )
+
+        count = aggregate(func.count(Hubfile.id))
+        size = aggregate(func.coalesce(func.sum(Hubfile.size), 0))
+        return count, size
+
+    def refresh_file_aggregates(self, dataset_ids=None, commit: bool = True) -> int:
+        """Recompute ``files_count``/``total_size_bytes`` from the file rows (all datasets if no ids)."""
+        count, size = self._actual_file_aggregates()
+        statement = update(DataSet).values(files_count=count, total_size_bytes=size)
+        if dataset_ids is not None:
+            statement = statement.where(DataSet.id.in_(list(dataset_ids)))
+        result = self.session.execute(statement, execution_options={"synchronize_session": False})
+        self._finish(commit)
+        return result.rowcount
+
+    def inconsistent_file_aggregates(self) -> list:
+        """``(id, files_count, real count, total_size_bytes, real size)`` of the datasets whose aggregates drifted."""
+        count, size = self._actual_file_aggregates()
+        rows = self.session.execute(
+            select(DataSet.id, DataSet.files_count, count, DataSet.total_size_bytes, size).order_by(DataSet.id)
+        ).all()
+        return [tuple(row) for row in rows if row[1] != row[2] or row[3] != row[4]]
+
+    @read_only
     def latest_synchronized(self):
         return (
             self.model.query.join(DSMetaData)
@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import shutil
@@ -8,6 +7,7 @@ from datetime import datetime, timezone
 from zipfile import ZipFile
 
 from flask import (
+    Response,
     abort,
     jsonify,
     make_response,
@@ -22,9 +22,10 @@ from flask_login import current_user, login_required
 from app.modules.comment.services import CommentService
 from app.modules.dataset import dataset_bp
 from app.modules.dataset.forms import DataSetForm
-from app.modules.dataset.models import DSDownloadRecord
+from app.modules.dataset.models import DSDownloadRecord, PublicationStatus
 from app.modules.dataset.services import (
     AuthorService,
+    DataSetPublicationService,
     DataSetService,
     DOIMappingService,
     DSDownloadRecordService,
@@ -32,6 +33,8 @@ from app.modules.dataset.services import (
     DSViewRecordService,
 )
 from app.modules.zenodo.services import ZenodoService
+from core.caching.response_cache import response_cache
+from core.metrics.metrics import ZIP_BUILD_LATENCY, timed
 
 from .csv_validator import validate_csv_content
 
@@ -43,6 +46,7 @@ author_service = AuthorService()
 dsmetadata_service = DSMetaDataService()
 zenodo_service = ZenodoService()
 doi_mapping_service = DOIMappingService()
+publication_service = DataSetPublicationService()
 ds_view_record_service = DSViewRecordService()
 comment_service = CommentService()
 
@@ -60,68 +64,72 @@ def create_dataset():
         try:
             logger.info("Creating dataset...")
             dataset = dataset_service.create_from_form(form=form, current_user=current_user)
-            logger.info(f"Created dataset: {dataset}")
+            logger.info("Created dataset: %s", dataset)
             dataset_service.move_csv_models(dataset)
         except Exception as exc:
-            logger.exception(f"Exception while create dataset data in local {exc}")
+            logger.exception("Exception while create dataset data in local %s", exc)
             return jsonify({"Exception while create dataset data in local: ": str(exc)}), 400
 
-        # send dataset as deposition to Zenodo
-        data = {}
-        try:
-            zenodo_response_json = zenodo_service.create_new_deposition(dataset)
-            response_data = json.dumps(zenodo_response_json)
-            data = json.loads(response_data)
-        except Exception as exc:
-            data = {}
-            zenodo_response_json = {}
-            logger.exception(f"Exception while create dataset data in Zenodo {exc}")
-
-        if data.get("id"):
-            deposition_id = data.get("id")
-
-            # update dataset with deposition id in Zenodo
-            dataset_service.update_dsmetadata(dataset.ds_meta_data_id, deposition_id=deposition_id)
-
-            try:
-                # iterate for each csv model (one csv model = one request to Zenodo)
-                for csv_model in dataset.csv_models:
-                    zenodo_service.upload_file(dataset, deposition_id, csv_model)
-
-                # publish deposition y guardar DOI
-                zenodo_response = zenodo_service.publish_deposition(deposition_id)
-
-                doi = zenodo_response.get("doi")
-                if doi:
-                    dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=doi)
-                    logger.info(f"DOI actualizado: {doi}")
-                    try:
-                        logger.info("DOI actualizado. Re-entrenando el motor de recomendación...")
-                        engine = dataset_service._get_or_create_engine()
-                        engine.force_retrain()
-                        logger.info("Motor de recomendación re-entrenado.")
-                        logger.info("Datasets cargados en motor: %s", engine.df["dataset_id"].tolist())
-                    except Exception as e:
-                        logger.error(f"FALLO al re-entrenar el motor de recomendación: {e}")
-
-                # update DOI
-                # deposition_doi = zenodo_service.get_doi(deposition_id)
-                # dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=deposition_doi)
-            except Exception as e:
-                msg = f"it has not been possible upload csv models in Zenodo and update the DOI: {e}"
-                return jsonify({"message": msg}), 200
-
-        # Delete temp folder
+        # Delete temp folder (the CSVs were already moved to the dataset)
         file_path = current_user.temp_folder()
         if os.path.exists(file_path) and os.path.isdir(file_path):
             shutil.rmtree(file_path)
 
+        status_url = url_for("dataset.publication_status", dataset_id=dataset.id)
+
+        # send dataset as deposition to Zenodo in the background; the UI polls the publication status
+        try:
+            publication_service.enqueue(dataset)
+        except Exception as exc:
+            logger.exception("Exception while queueing the Zenodo publication %s", exc)
+            # El dataset queda en FAILED: se puede reintentar con /publication/retry
+            return (
+                jsonify(
+                    {
+                        "message": "The dataset was created but its publication could not be queued",
+                        "dataset_id": dataset.id,
+                        "status_url": status_url,
+                    }
+                ),
+                503,
+            )
+
         msg = "Everything works!"
-        return jsonify({"message": msg}), 200
+        return jsonify({"message": msg, "dataset_id": dataset.id, "status_url": status_url}), 202
 
     return render_template("dataset/upload_dataset.html", form=form)
 
 
+@dataset_bp.route("/dataset/<int:dataset_id>/publication", methods=["GET"])
+@login_required
+def publication_status(dataset_id):
+    """Estado de la publicación en Zenodo/Fakenodo de un dataset del usuario."""
+    dataset = dataset_service.get_or_404(dataset_id)
+    if dataset.user_id != current_user.id:
+        return jsonify({"message": "Forbidden"}), 403
+
+    return jsonify(publication_service.get_status(dataset)), 200
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/publication/retry", methods=["POST"])
+@login_required
+def retry_publication(dataset_id):
+    """Vuelve a encolar una publicación fallida; continúa desde el paso que falló."""
+    dataset = dataset_service.get_or_404(dataset_id)
+    if dataset.user_id != current_user.id:
+        return jsonify({"message": "Forbidden"}), 403
+
+    if dataset.ds_meta_data.publication_status != PublicationStatus.FAILED:
+        return jsonify({"message": "Only failed publications can be retried"}), 409
+
+    try:
+        publication_service.enqueue(dataset)
+    except Exception as exc:
+        logger.exception("Exception while queueing the Zenodo publication %s", exc)
+        return jsonify(publication_service.get_status(dataset)), 503
+    return jsonify(publication_service.get_status(dataset)), 202
+
+
 @dataset_bp.route("/dataset/file/validate", methods=["POST"])
 @login_required
 def validate_file():
@@ -225,7 +233,7 @@ def download_dataset(dataset_id):
     temp_dir = tempfile.mkdtemp()
     zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
 
-    with ZipFile(zip_path, "w") as zipf:
+    with timed(ZIP_BUILD_LATENCY), ZipFile(zip_path, "w") as zipf:
         for subdir, dirs, files in os.walk(file_path):
             for file in files:
                 full_path = os.path.join(subdir, file)
@@ -292,33 +300,25 @@ def subdomain_index(doi):
     dataset = ds_meta_data.data_set
 
     # Obtener la URL del record (Fakenodo o Zenodo)
-    from app.modules.zenodo.services import ZenodoService
-
-    zenodo_service = ZenodoService()
     record_url = zenodo_service.get_record_url(dataset.ds_meta_data.deposition_id)
     is_fakenodo = zenodo_service.is_fakenodo
 
     user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
 
-    recs_general = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="full_text_corpus")
-    recs_authors = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="authors")
-    recs_tags = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="tags")
-    recs_affiliation = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="affiliation")
-    comments = comment_service.get_comments_for_dataset(dataset.id)
+    def render_page():
+        comments = comment_service.get_comment_threads(dataset.id, page=request.args.get("comments_page", 1, type=int))
 
-    resp = make_response(
-        render_template(
+        return render_template(
             "dataset/view_dataset.html",
             dataset=dataset,
-            recs_general=recs_general,
-            recs_authors=recs_authors,
-            recs_tags=recs_tags,
-            recs_affiliation=recs_affiliation,
             comments=comments,
             record_url=record_url,
             is_fakenodo=is_fakenodo,
+            **recommendations_context(dataset),
         )
-    )
+
+    # La visita se registra siempre (cookie incluida); solo el render de la página sale de la caché
+    resp = make_response(response_cache.render(tags=["datasets", f"dataset:{dataset.id}"], render=render_page))
     resp.set_cookie("view_cookie", user_cookie)
 
     return resp
@@ -335,19 +335,20 @@ def get_unsynchronized_dataset(dataset_id):
     if not dataset:
         abort(404)
 
-    recs_general = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="full_text_corpus")
-    recs_authors = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="authors")
-    recs_tags = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="tags")
-    recs_affiliation = dataset_service.get_similar_datasets(target_dataset_id=dataset.id, field_type="affiliation")
+    return render_template("dataset/view_dataset.html", dataset=dataset, **recommendations_context(dataset))
 
-    return render_template(
-        "dataset/view_dataset.html",
-        dataset=dataset,
-        recs_general=recs_general,
-        recs_authors=recs_authors,
-        recs_tags=recs_tags,
-        recs_affiliation=recs_affiliation,
-    )
+
+def recommendations_context(dataset):
+    """
+    Recommendations for ``view_dataset.html``: the template calls ``similar_datasets(field_type)`` inside
+    a ``{% cache %}`` block versioned with ``recommendations_version``, so they are only computed on a miss.
+    """
+    return {
+        "similar_datasets": lambda field_type: dataset_service.get_similar_datasets(
+            target_dataset_id=dataset.id, field_type=field_type
+        ),
+        "recommendations_version": dataset_service.get_recommendations_version(),
+    }
 
 
 @dataset_bp.route("/dataset/<int:dataset_id>/comments", methods=["POST"])
@@ -383,7 +384,7 @@ def create_comment_endpoint(dataset_id):
         return jsonify(comment.to_dict()), 201
 
     except Exception as e:
-        logger.exception(f"Error creating comment: {e}")
+        logger.exception("Error creating comment: %s", e)
         return (
             jsonify({"message": "Failed to create comment due to server error."}),
             500,
@@ -393,9 +394,12 @@ def create_comment_endpoint(dataset_id):
 @dataset_bp.route("/dataset/<int:dataset_id>/comments", methods=["GET"])
 def list_comments_endpoint(dataset_id):
     """Lista los comentarios asociados a un dataset."""
-    comments = comment_service.get_comments_for_dataset(dataset_id)
-    comments_data = [c.to_dict() for c in comments]
-    return jsonify(comments_data), 200
+    body, etag = comment_service.get_comment_feed(dataset_id)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Los clientes que hacen polling revalidan siempre y reciben 304 si no hay cambios
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @dataset_bp.route("/comments/<int:comment_id>", methods=["DELETE"])
@@ -419,28 +423,31 @@ def delete_comment_endpoint(comment_id):
 
 
 @dataset_bp.route("/dataset/ranking", methods=["GET"])
+@response_cache.cached(tags=[])
 def ranking():
     """Muestra la página de rankings de datasets."""
     return render_template("dataset/ranking.html")
 
 
 @dataset_bp.route("/dataset/ranking/downloads", methods=["GET"])
+@response_cache.cached(tags=["datasets", "counters"])
 def get_most_downloaded_datasets():
     """Obtiene el ranking de datasets más descargados (Top 5)."""
     try:
         ranking = dataset_service.get_most_downloaded_datasets(limit=5)
         return jsonify(ranking), 200
     except Exception as e:
-        logger.exception(f"Error getting most downloaded datasets: {e}")
+        logger.exception("Error getting most downloaded datasets: %s", e)
         return jsonify({"message": "Failed to get ranking"}), 500
 
 
 @dataset_bp.route("/dataset/ranking/views", methods=["GET"])
+@response_cache.cached(tags=["datasets", "counters"])
 def get_most_viewed_datasets():
     """Obtiene el ranking de datasets más vistos (Top 5)."""
     try:
         ranking = dataset_service.get_most_viewed_datasets(limit=5)
         return jsonify(ranking), 200
     except Exception as e:
-        logger.exception(f"Error getting most viewed datasets: {e}")
+        logger.exception("Error getting most viewed datasets: %s", e)
         return jsonify({"message": "Failed to get ranking"}), 500
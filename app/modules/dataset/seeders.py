@@ -5,7 +5,8 @@ from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 from app.modules.auth.models import User
-from app.modules.csvmodel.models import CSVModel, FMMetaData
+from app.modules.csvmodel.models import CSVModel, FMMetaData, FMMetrics
+from app.modules.dataset.csv_stats import compute_csv_stats
 from app.modules.dataset.models import Author, DataSet, DSMetaData, DSMetrics, PublicationType
 from app.modules.hubfile.models import Hubfile
 from core.seeders.BaseSeeder import BaseSeeder
@@ -122,3 +123,7 @@ class DataSetSeeder(BaseSeeder):
                 csv_model_id=csv_model.id,
             )
             self.seed([csv_file])
+
+            fm_metrics = self.seed([FMMetrics(**compute_csv_stats(file_path))])[0]
+            seeded_fm_meta_data[i].fm_metrics_id = fm_metrics.id
+            self.db.session.commit()
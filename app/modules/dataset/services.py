@@ -1,13 +1,15 @@
 import hashlib
+import json
 import logging
 import os
 import shutil
 import tempfile
 import uuid
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
 import pandas as pd
-from flask import request
+from flask import has_app_context, request
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sqlalchemy import func
@@ -20,9 +22,19 @@ from app.modules.auth.services import AuthenticationService
 from app.modules.csvmodel.repositories import (
     CSVModelRepository,
     FMMetaDataRepository,
+    FMMetricsRepository,
 )
 from app.modules.dataset import nlp_utils
-from app.modules.dataset.models import DataSet, DSDownloadRecord, DSMetaData, DSViewRecord
+from app.modules.dataset.beer_catalog import write_beer_tables
+from app.modules.dataset.csv_stats import compute_csv_stats
+from app.modules.dataset.models import (
+    DataSet,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    PublicationStatus,
+    PublicationStep,
+)
 from app.modules.dataset.repositories import (
     AuthorRepository,
     DataSetRepository,
@@ -36,12 +48,19 @@ from app.modules.hubfile.repositories import (
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from app.modules.zenodo.services import ZenodoService
+from core.caching.response_cache import response_cache
+from core.jobs.job_queue import JobQueue
+from core.metrics.metrics import NLP_DOCUMENTS, NLP_LATENCY, RECOMMENDER_LATENCY, timed
+from core.repositories.routing import read_only
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
 CorpusRecord = dict[str, any]
 INDEXABLE_FIELDS = ["authors", "tags", "affiliation"]
+# Visitas y descargas invalidan los contadores como mucho una vez por ventana; si no, cada visita vaciaría la caché
+COUNTERS_INVALIDATION_INTERVAL = 30
 
 
 def calculate_checksum_and_size(file_path):
@@ -63,9 +82,12 @@ class RecommendationEngine:
         self.whoosh_indices = {}
         self.tfidf_matrix = None
         self.tfidf_vectorizer = None
+        # Hash del corpus entrenado: versiona los fragmentos de recomendaciones cacheados, igual en todos los procesos
+        self.version = None
         self._initialize_engine()
         logger.info("RecommendationEngine initialized.")
 
+    @read_only
     def _get_corpus_data_from_db(self) -> List[CorpusRecord]:
         corpus_data: List[CorpusRecord] = []
         logger.debug("--- INICIO: Extracción de corpus de la Base de Datos ---")
@@ -97,7 +119,9 @@ class RecommendationEngine:
 
                 combined_text = " ".join([" ".join(authors), " ".join(affiliations), " ".join(tags), publication_type])
 
-                full_text_processed = nlp_utils.proceso_contenido_completo(combined_text)
+                with timed(NLP_LATENCY):
+                    full_text_processed = nlp_utils.proceso_contenido_completo(combined_text)
+                NLP_DOCUMENTS.inc()
 
                 corpus_data.append(
                     {
@@ -160,12 +184,17 @@ class RecommendationEngine:
         logger.info("TF-IDF models trained for fields: %s.", list(self.models.keys()))
         logger.info("Whoosh indices created for fields: %s.", list(self.whoosh_indices.keys()))
 
+    @timed(RECOMMENDER_LATENCY, operation="train")
     def _initialize_engine(self):
         """Carga los datos y entrena el modelo."""
         corpus = self._get_corpus_data_from_db()
         if corpus:
             self.df = pd.DataFrame(corpus)
             self._train_and_index_models()
+        # Mismos datasets con el mismo estado -> misma versión, así otro proceso o un re-entrenamiento
+        # sin cambios no invalida los fragmentos ya cacheados
+        state = json.dumps(corpus, sort_keys=True, default=str)
+        self.version = hashlib.sha1(state.encode()).hexdigest()[:12]
 
     def force_retrain(self):
         """
@@ -184,6 +213,7 @@ class DataSetService(BaseService):
         self.author_repository = AuthorRepository()
         self.dsmetadata_repository = DSMetaDataRepository()
         self.fmmetadata_repository = FMMetaDataRepository()
+        self.fmmetrics_repository = FMMetricsRepository()
         self.dsdownloadrecord_repository = DSDownloadRecordRepository()
         self.hubfiledownloadrecord_repository = HubfileDownloadRecordRepository()
         self.hubfilerepository = HubfileRepository()
@@ -200,6 +230,10 @@ class DataSetService(BaseService):
             DataSetService._recommendation_engine = RecommendationEngine(flask_app_instance)
         return DataSetService._recommendation_engine
 
+    def get_recommendations_version(self) -> str:
+        return self._get_or_create_engine().version
+
+    @timed(RECOMMENDER_LATENCY, operation="query")
     def get_similar_datasets(
         self, target_dataset_id: int, field_type: str = "full_text_corpus", top_n: int = 5
     ) -> List[Dict]:
@@ -208,7 +242,7 @@ class DataSetService(BaseService):
 
         valid_fields = list(engine.models.keys())
         if field_type not in valid_fields:
-            logger.warning(f"Field type '{field_type}' not found in models. Using default: 'full_text_corpus'.")
+            logger.warning("Field type '%s' not found in models. Using default: 'full_text_corpus'.", field_type)
             field_type = "full_text_corpus"
 
         model = engine.models.get(field_type)
@@ -225,7 +259,7 @@ class DataSetService(BaseService):
             return []
 
         if not target_index:
-            logger.warning(f"Dataset ID {target_dataset_id} no encontrado en el motor. Devolviendo [].")
+            logger.warning("Dataset ID %s no encontrado en el motor. Devolviendo [].", target_dataset_id)
             return []
 
         target_idx = target_index[0]
@@ -288,6 +322,7 @@ class DataSetService(BaseService):
     def count_dsmetadata(self) -> int:
         return self.dsmetadata_repository.count()
 
+    @read_only
     def get_most_downloaded_datasets(self, limit=10):
         """
         Devuelve los datasets más descargados.
@@ -316,6 +351,7 @@ class DataSetService(BaseService):
 
         return [{"id": ds.id, "title": ds.title, "downloads": ds.downloads, "doi": ds.doi} for ds in ranking]
 
+    @read_only
     def get_most_viewed_datasets(self, limit=10):
         """
         Devuelve los datasets más vistos.
@@ -358,47 +394,68 @@ class DataSetService(BaseService):
         }
         try:
             logger.info("Creating dsmetadata...: %s", form.get_dsmetadata())
-            dsmetadata = self.dsmetadata_repository.create(**form.get_dsmetadata())
-            for author_data in [main_author] + form.get_authors():
-                author = self.author_repository.create(commit=False, ds_meta_data_id=dsmetadata.id, **author_data)
-                dsmetadata.authors.append(author)
+            dsmetadata = self.dsmetadata_repository.create(commit=False, **form.get_dsmetadata())
+            # Autores y ficheros se insertan en bloque al final: un INSERT por tabla en lugar de uno por fila
+            authors = [
+                dict(author_data, ds_meta_data_id=dsmetadata.id) for author_data in [main_author] + form.get_authors()
+            ]
+            files = []
 
             dataset = self.create(commit=False, user_id=current_user.id, ds_meta_data_id=dsmetadata.id)
 
             for csv_model in form.csv_models:
                 csv_filename = csv_model.csv_filename.data
-                fmmetadata = self.fmmetadata_repository.create(commit=False, **csv_model.get_fmmetadata())
-                for author_data in csv_model.get_authors():
-                    author = self.author_repository.create(commit=False, fm_meta_data_id=fmmetadata.id, **author_data)
-                    fmmetadata.authors.append(author)
+                # associated files in csv model
+                file_path = os.path.join(current_user.temp_folder(), csv_filename)
+                # Estadísticas del CSV (ya validado al subirlo), para no tener que volver a leerlo después
+                fm_metrics = self.fmmetrics_repository.create(commit=False, **compute_csv_stats(file_path))
+                fmmetadata = self.fmmetadata_repository.create(
+                    commit=False, fm_metrics_id=fm_metrics.id, **csv_model.get_fmmetadata()
+                )
+                authors.extend(
+                    dict(author_data, fm_meta_data_id=fmmetadata.id) for author_data in csv_model.get_authors()
+                )
 
                 fm = self.csv_model_repository.create(
                     commit=False, data_set_id=dataset.id, fm_meta_data_id=fmmetadata.id
                 )
 
-                # associated files in csv model
-                file_path = os.path.join(current_user.temp_folder(), csv_filename)
                 checksum, size = calculate_checksum_and_size(file_path)
+                files.append({"name": csv_filename, "checksum": checksum, "size": size, "csv_model_id": fm.id})
 
-                file = self.hubfilerepository.create(
-                    commit=False, name=csv_filename, checksum=checksum, size=size, csv_model_id=fm.id
-                )
-                fm.files.append(file)
+            self.author_repository.bulk_create(authors, commit=False)
+            file_ids = self.hubfilerepository.bulk_create(files, returning=True, commit=False)
+            # bulk_create no pasa por los eventos del ORM: los agregados del dataset se calculan aquí
+            self.repository.refresh_file_aggregates([dataset.id], commit=False)
             self.repository.session.commit()
         except Exception as exc:
             logger.info("Exception creating dataset from form...: %s", exc)
             self.repository.session.rollback()
             raise exc
+
+        response_cache.invalidate("datasets")
+        # Copia columnar de los CSV para las consultas sobre cervezas de todo el catálogo
+        write_beer_tables(
+            dataset.id,
+            [
+                (file_id, os.path.join(current_user.temp_folder(), file["name"]))
+                for file_id, file in zip(file_ids, files)
+            ],
+        )
+
+        # El re-entrenamiento del motor se hace en el job de publicación (ver DataSetPublicationService)
+        return dataset
+
+    def retrain_recommendation_engine(self):
         try:
-            logger.info("Nuevo dataset creado. Re-entrenando el motor de recomendación...")
+            logger.info("Re-entrenando el motor de recomendación...")
             engine = self._get_or_create_engine()
             engine.force_retrain()
             logger.info("Motor de recomendación re-entrenado.")
-            logger.info("Datasets cargados en motor: %s", engine.df["dataset_id"].tolist())
+            logger.info("Datasets cargados en motor: %d", len(engine.df))
+            logger.debug("Ids de los datasets del motor: %s", engine.df["dataset_id"].tolist())
         except Exception as e:
-            logger.error(f"FALLO al re-entrenar el motor de recomendación: {e}")
-
-        return dataset
+            logger.error("FALLO al re-entrenar el motor de recomendación: %s", e)
 
     def update_dsmetadata(self, ds_id, **kwargs):
         return self.dsmetadata_repository.update(ds_id, **kwargs)
@@ -409,6 +466,146 @@ class DataSetService(BaseService):
         return f"/doi/{dataset.ds_meta_data.dataset_doi}/"
 
 
+# --- Publicación asíncrona en Zenodo/Fakenodo ---
+
+publication_queue = JobQueue("publication")
+
+
+def publish_dataset_job(dataset_id: int):
+    """Entry point of the background publication job (importable by RQ workers)."""
+    if has_app_context():
+        return DataSetPublicationService().publish(dataset_id)
+
+    from app import app as flask_app_instance
+
+    with flask_app_instance.app_context():
+        return DataSetPublicationService().publish(dataset_id)
+
+
+class DataSetPublicationService(BaseService):
+    """
+    Publishes a dataset to Zenodo/Fakenodo as a sequence of resumable steps:
+    create deposition -> upload files -> publish. The next pending step is persisted in
+    ``DSMetaData.publication_step`` so a retried job picks up where the failed one stopped.
+    """
+
+    def __init__(self):
+        super().__init__(DataSetRepository())
+        self.dsmetadata_repository = DSMetaDataRepository()
+        self.zenodo_service = ZenodoService()
+
+    def enqueue(self, dataset: DataSet) -> str:
+        self._set_state(
+            dataset.ds_meta_data_id,
+            publication_status=PublicationStatus.QUEUED,
+            publication_step=dataset.ds_meta_data.publication_step or PublicationStep.CREATE_DEPOSITION,
+            publication_error=None,
+        )
+        try:
+            return publication_queue.enqueue(publish_dataset_job, dataset.id, retries=3)
+        except Exception as exc:
+            # Sin job detrás no puede quedarse en QUEUED: FAILED permite reintentarla
+            logger.exception("Could not queue the publication of dataset %s", dataset.id)
+            self._set_state(
+                dataset.ds_meta_data_id, publication_status=PublicationStatus.FAILED, publication_error=str(exc)
+            )
+            raise
+
+    def get_status(self, dataset: DataSet) -> dict:
+        ds_meta_data = dataset.ds_meta_data
+        status = ds_meta_data.publication_status
+        if status is None and ds_meta_data.dataset_doi:
+            # Datasets publicados antes del pipeline asíncrono
+            status = PublicationStatus.PUBLISHED
+
+        return {
+            "dataset_id": dataset.id,
+            "status": status.value if status else None,
+            "step": ds_meta_data.publication_step.value if ds_meta_data.publication_step else None,
+            "error": ds_meta_data.publication_error,
+            "deposition_id": ds_meta_data.deposition_id,
+            "dataset_doi": ds_meta_data.dataset_doi,
+            "updated_at": (
+                ds_meta_data.publication_updated_at.isoformat() if ds_meta_data.publication_updated_at else None
+            ),
+        }
+
+    def publish(self, dataset_id: int) -> Optional[DSMetaData]:
+        dataset = self.repository.get_by_id(dataset_id)
+        if dataset is None:
+            logger.warning("Publication job: dataset %s no longer exists", dataset_id)
+            return None
+
+        ds_meta_data = dataset.ds_meta_data
+        if ds_meta_data.publication_step == PublicationStep.DONE:
+            return ds_meta_data
+
+        self._set_state(ds_meta_data.id, publication_status=PublicationStatus.RUNNING)
+        try:
+            self._run_steps(dataset)
+        except Exception as exc:
+            logger.exception("Publication of dataset %s failed at step %s", dataset_id, ds_meta_data.publication_step)
+            self.repository.session.rollback()
+            self._set_state(ds_meta_data.id, publication_status=PublicationStatus.FAILED, publication_error=str(exc))
+            raise
+
+        # Solo tras confirmar PUBLISHED: ni los fallos ni los reintentos de RQ re-entrenan el motor
+        if ds_meta_data.publication_status == PublicationStatus.PUBLISHED:
+            DataSetService().retrain_recommendation_engine()
+
+        return ds_meta_data
+
+    def _run_steps(self, dataset: DataSet):
+        ds_meta_data = dataset.ds_meta_data
+
+        if ds_meta_data.publication_step in (None, PublicationStep.CREATE_DEPOSITION):
+            if not ds_meta_data.deposition_id:
+                deposition = self.zenodo_service.create_new_deposition(dataset)
+                if not deposition.get("id"):
+                    raise Exception(f"Zenodo did not return a deposition id: {deposition}")
+                ds_meta_data.deposition_id = deposition["id"]
+            self._set_state(ds_meta_data.id, publication_step=PublicationStep.UPLOAD_FILES)
+
+        deposition_id = ds_meta_data.deposition_id
+
+        if ds_meta_data.publication_step == PublicationStep.UPLOAD_FILES:
+            # Solo se suben los ficheros que aún no están en la deposición (reintentos idempotentes)
+            uploaded = self._get_uploaded_filenames(deposition_id)
+            pending = [fm for fm in dataset.csv_models if fm.fm_meta_data.csv_filename not in uploaded]
+            self.zenodo_service.upload_files(dataset, deposition_id, pending, user=dataset.user)
+            self._set_state(ds_meta_data.id, publication_step=PublicationStep.PUBLISH)
+
+        if ds_meta_data.publication_step == PublicationStep.PUBLISH:
+            zenodo_response = self.zenodo_service.publish_deposition(deposition_id)
+            doi = zenodo_response.get("doi")
+            if doi:
+                ds_meta_data.dataset_doi = doi
+                logger.info("DOI actualizado: %s", doi)
+            self._set_state(
+                ds_meta_data.id,
+                publication_status=PublicationStatus.PUBLISHED,
+                publication_step=PublicationStep.DONE,
+                publication_error=None,
+            )
+            # El dataset pasa a la portada, los rankings y su página /doi/
+            response_cache.invalidate("datasets", f"dataset:{dataset.id}")
+
+    def _get_uploaded_filenames(self, deposition_id: int) -> set:
+        try:
+            deposition = self.zenodo_service.get_deposition(deposition_id)
+        except Exception as exc:
+            logger.warning("Could not list files of deposition %s: %s", deposition_id, exc)
+            return set()
+
+        # Zenodo devuelve dicts con "filename"; Fakenodo, nombres sueltos
+        return {f.get("filename") if isinstance(f, dict) else f for f in deposition.get("files") or []}
+
+    def _set_state(self, ds_meta_data_id: int, **kwargs):
+        return self.dsmetadata_repository.update(
+            ds_meta_data_id, publication_updated_at=datetime.now(timezone.utc), **kwargs
+        )
+
+
 # --- Otras Clases de Servicio ---
 
 
@@ -423,6 +620,11 @@ class DSDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(DSDownloadRecordRepository())
 
+    def create(self, **kwargs):
+        record = super().create(**kwargs)
+        response_cache.invalidate("counters", interval=COUNTERS_INVALIDATION_INTERVAL)
+        return record
+
 
 class DSMetaDataService(BaseService):
 
@@ -445,7 +647,9 @@ class DSViewRecordService(BaseService):
         return self.repository.the_record_exists(dataset, user_cookie)
 
     def create_new_record(self, dataset: DataSet, user_cookie: str) -> DSViewRecord:
-        return self.repository.create_new_record(dataset, user_cookie)
+        record = self.repository.create_new_record(dataset, user_cookie)
+        response_cache.invalidate("counters", interval=COUNTERS_INVALIDATION_INTERVAL)
+        return record
 
     def create_cookie(self, dataset: DataSet) -> str:
 
@@ -11,7 +11,8 @@ from werkzeug.datastructures import FileStorage
 import app.modules.dataset.routes as dataset_routes
 from app import create_app
 from app.modules.dataset.csv_validator import validate_csv_content
-from app.modules.dataset.services import DataSetService, RecommendationEngine
+from app.modules.dataset.models import PublicationStatus, PublicationStep
+from app.modules.dataset.services import DataSetPublicationService, DataSetService, RecommendationEngine
 
 
 # --- Mock Classes ---
@@ -565,3 +566,890 @@ class TestRecommendationEngine:
         with patch.object(engine, "_initialize_engine") as mock_init:
             engine.force_retrain()
             mock_init.assert_called_once()
+
+    @patch("app.modules.dataset.services.RecommendationEngine._train_and_index_models")
+    def test_version_is_derived_from_the_trained_corpus(self, mock_train, flask_app):
+        corpus = [{"dataset_id": 1, "title": "Lager", "dataset_doi": "", "full_text_corpus": "lager"}]
+        with patch.object(RecommendationEngine, "_get_corpus_data_from_db", return_value=corpus):
+            first = RecommendationEngine(flask_app)
+            second = RecommendationEngine(flask_app)
+            assert first.version == second.version
+
+            first.force_retrain()
+            assert first.version == second.version
+
+            corpus[0]["title"] = "Pilsner"
+            first.force_retrain()
+            assert first.version != second.version
+
+
+# --- Publicación asíncrona en Zenodo ---
+def make_publication_service(meta, csv_filenames):
+    csv_models = []
+    for name in csv_filenames:
+        csv_model = MagicMock()
+        csv_model.fm_meta_data.csv_filename = name
+        csv_models.append(csv_model)
+
+    dataset = MagicMock(id=1, ds_meta_data=meta, ds_meta_data_id=meta.id, csv_models=csv_models)
+
+    def fake_update(_id, **kwargs):
+        for key, value in kwargs.items():
+            setattr(meta, key, value)
+        return meta
+
+    svc = DataSetPublicationService.__new__(DataSetPublicationService)
+    svc.repository = MagicMock()
+    svc.repository.get_by_id.return_value = dataset
+    svc.dsmetadata_repository = MagicMock()
+    svc.dsmetadata_repository.update.side_effect = fake_update
+    svc.zenodo_service = MagicMock()
+    return svc, dataset
+
+
+def make_publication_meta(step=PublicationStep.CREATE_DEPOSITION, deposition_id=None):
+    return MagicMock(
+        id=7,
+        deposition_id=deposition_id,
+        dataset_doi=None,
+        publication_status=PublicationStatus.QUEUED,
+        publication_step=step,
+        publication_error=None,
+    )
+
+
+@patch.object(DataSetService, "retrain_recommendation_engine")
+def test_publish_runs_every_step(mock_retrain):
+    meta = make_publication_meta()
+    svc, dataset = make_publication_service(meta, ["a.csv", "b.csv"])
+    svc.zenodo_service.create_new_deposition.return_value = {"id": 55}
+    svc.zenodo_service.get_deposition.return_value = {"files": []}
+    svc.zenodo_service.publish_deposition.return_value = {"doi": "10.9999/fakenodo.abc"}
+
+    svc.publish(dataset.id)
+
+    svc.zenodo_service.upload_files.assert_called_once_with(dataset, 55, dataset.csv_models, user=dataset.user)
+    assert meta.deposition_id == 55
+    assert meta.dataset_doi == "10.9999/fakenodo.abc"
+    assert meta.publication_status == PublicationStatus.PUBLISHED
+    assert meta.publication_step == PublicationStep.DONE
+    mock_retrain.assert_called_once()
+
+
+@patch.object(DataSetService, "retrain_recommendation_engine")
+def test_publish_resumes_upload_skipping_uploaded_files(mock_retrain):
+    meta = make_publication_meta(step=PublicationStep.UPLOAD_FILES, deposition_id=55)
+    meta.publication_status = PublicationStatus.FAILED
+    svc, dataset = make_publication_service(meta, ["a.csv", "b.csv"])
+    svc.zenodo_service.get_deposition.return_value = {"files": [{"filename": "a.csv"}]}
+    svc.zenodo_service.publish_deposition.return_value = {"doi": "10.9999/fakenodo.abc"}
+
+    svc.publish(dataset.id)
+
+    svc.zenodo_service.create_new_deposition.assert_not_called()
+    pending = svc.zenodo_service.upload_files.call_args.args[2]
+    assert [fm.fm_meta_data.csv_filename for fm in pending] == ["b.csv"]
+    assert meta.publication_status == PublicationStatus.PUBLISHED
+
+
+@patch.object(DataSetService, "retrain_recommendation_engine")
+def test_publish_failure_keeps_failed_step(mock_retrain):
+    meta = make_publication_meta()
+    svc, dataset = make_publication_service(meta, ["a.csv"])
+    svc.zenodo_service.create_new_deposition.return_value = {"id": 55}
+    svc.zenodo_service.get_deposition.return_value = {"files": []}
+    svc.zenodo_service.upload_files.side_effect = Exception("Zenodo down")
+
+    with pytest.raises(Exception):
+        svc.publish(dataset.id)
+
+    assert meta.publication_status == PublicationStatus.FAILED
+    assert meta.publication_step == PublicationStep.UPLOAD_FILES
+    assert meta.publication_error == "Zenodo down"
+    svc.zenodo_service.publish_deposition.assert_not_called()
+    mock_retrain.assert_not_called()
+
+
+@patch.object(DataSetService, "retrain_recommendation_engine")
+def test_publish_already_done_is_noop(mock_retrain):
+    meta = make_publication_meta(step=PublicationStep.DONE, deposition_id=55)
+    svc, dataset = make_publication_service(meta, ["a.csv"])
+
+    svc.publish(dataset.id)
+
+    svc.zenodo_service.publish_deposition.assert_not_called()
+    mock_retrain.assert_not_called()
+
+
+def test_enqueue_failure_marks_the_publication_failed():
+    meta = make_publication_meta()
+    meta.publication_status = None
+    svc, dataset = make_publication_service(meta, ["a.csv"])
+
+    with patch("app.modules.dataset.services.publication_queue") as mock_queue:
+        mock_queue.enqueue.side_effect = ConnectionError("Redis down")
+        with pytest.raises(ConnectionError):
+            svc.enqueue(dataset)
+
+    assert meta.publication_status == PublicationStatus.FAILED
+    assert meta.publication_error == "Redis down"
+
+
+def test_retry_publication_reports_enqueue_failure(client, monkeypatch):
+    dataset = MagicMock(id=3, user_id=10)
+    dataset.ds_meta_data.publication_status = PublicationStatus.FAILED
+
+    class StubService:
+        def get_or_404(self, id):
+            return dataset
+
+    class StubPublicationService:
+        def enqueue(self, dataset):
+            raise ConnectionError("Redis down")
+
+        def get_status(self, dataset):
+            return {"dataset_id": dataset.id, "status": "failed", "error": "Redis down"}
+
+    monkeypatch.setattr(dataset_routes, "dataset_service", StubService())
+    monkeypatch.setattr(dataset_routes, "publication_service", StubPublicationService())
+
+    resp = client.post("/dataset/3/publication/retry")
+    assert resp.status_code == 503
+    assert resp.get_json()["status"] == "failed"
+
+
+def test_publication_status_forbidden(client, monkeypatch):
+    class StubService:
+        def get_or_404(self, id):
+            return MagicMock(user_id=99)
+
+    monkeypatch.setattr(dataset_routes, "dataset_service", StubService())
+
+    resp = client.get("/dataset/1/publication")
+    assert resp.status_code == 403
+
+
+def test_publication_status_success(client, monkeypatch):
+    class StubService:
+        def get_or_404(self, id):
+            return MagicMock(id=id, user_id=10)
+
+    class StubPublicationService:
+        def get_status(self, dataset):
+            return {"dataset_id": dataset.id, "status": "running"}
+
+    monkeypatch.setattr(dataset_routes, "dataset_service", StubService())
+    monkeypatch.setattr(dataset_routes, "publication_service", StubPublicationService())
+
+    resp = client.get("/dataset/3/publication")
+    assert resp.status_code == 200
+    assert resp.get_json() == {"dataset_id": 3, "status": "running"}
+
+
+def test_retry_publication_only_when_failed(client, monkeypatch):
+    dataset = MagicMock(id=3, user_id=10)
+    dataset.ds_meta_data.publication_status = PublicationStatus.RUNNING
+
+    class StubService:
+        def get_or_404(self, id):
+            return dataset
+
+    monkeypatch.setattr(dataset_routes, "dataset_service", StubService())
+
+    resp = client.post("/dataset/3/publication/retry")
+    assert resp.status_code == 409
+
+
+# --- API REST /api/v1/datasets ---
+
+
+def create_api_datasets(count, files_per_dataset=2):
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.csvmodel.models import CSVModel, FMMetaData
+    from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+    from app.modules.hubfile.models import Hubfile
+
+    user = User.query.first()
+    for i in range(count):
+        meta = DSMetaData(
+            title=f"API dataset {i}", description="d", publication_type=PublicationType.NONE, dataset_doi=f"10.1/{i}"
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        db.session.add(dataset)
+        db.session.flush()
+        for j in range(files_per_dataset):
+            fm_meta = FMMetaData(
+                csv_filename=f"f{j}.csv", title="t", description="d", publication_type=PublicationType.NONE
+            )
+            csv_model = CSVModel(data_set_id=dataset.id, fm_meta_data=fm_meta)
+            db.session.add(csv_model)
+            db.session.flush()
+            db.session.add(Hubfile(name=f"f{j}.csv", checksum="c", size=10, csv_model_id=csv_model.id))
+    db.session.commit()
+
+
+def test_api_datasets_keyset_pagination(test_client, clean_database):
+    from app import db
+    from app.modules.auth.models import User
+
+    db.session.add(User(email="api@example.com", password="1234"))
+    db.session.commit()
+    create_api_datasets(5)
+
+    first = test_client.get("/api/v1/datasets/?limit=2").get_json()
+    assert [d["name"] for d in first["items"]] == ["API dataset 0", "API dataset 1"]
+    assert first["next_cursor"]
+
+    second = test_client.get(f"/api/v1/datasets/?limit=2&cursor={first['next_cursor']}").get_json()
+    third = test_client.get(f"/api/v1/datasets/?limit=2&cursor={second['next_cursor']}").get_json()
+    assert [d["name"] for d in second["items"]] == ["API dataset 2", "API dataset 3"]
+    assert [d["name"] for d in third["items"]] == ["API dataset 4"]
+    assert third["next_cursor"] is None
+
+    dataset_id = first["items"][0]["dataset_id"]
+    assert test_client.get(f"/api/v1/datasets/{dataset_id}?fields=name").get_json() == {"name": "API dataset 0"}
+
+
+def test_api_datasets_fields_and_eager_loading(test_client, clean_database):
+    from sqlalchemy import event
+
+    from app import db
+    from app.modules.auth.models import User
+
+    db.session.add(User(email="api@example.com", password="1234"))
+    db.session.commit()
+    create_api_datasets(4, files_per_dataset=3)
+    db.session.expunge_all()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        response = test_client.get("/api/v1/datasets/?fields=dataset_id,name,files")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    items = response.get_json()["items"]
+    assert set(items[0]) == {"dataset_id", "name", "files"}
+    assert len(items[0]["files"]) == 3
+    # datasets + metadatos (join), modelos CSV y ficheros: no depende del número de datasets
+    assert len(statements) <= 3
+
+
+def test_api_datasets_bad_parameters(test_client):
+    from core.resources.generic_resource import GenericResource
+
+    assert test_client.get("/api/v1/datasets/?fields=nope").status_code == 400
+    assert test_client.get("/api/v1/datasets/?limit=abc").status_code == 400
+    assert test_client.get("/api/v1/datasets/?cursor=%%%").status_code == 400
+
+    # Cursores bien codificados cuyo valor no es un id entero
+    for value in ({"$gt": 1}, [1, 2], "3", 1.5, True, None):
+        cursor = GenericResource._encode_cursor(value)
+        response = test_client.get(f"/api/v1/datasets/?cursor={cursor}")
+        assert response.status_code == 400 and response.get_json() == {"message": "Invalid cursor"}
+
+
+def test_compiled_serializer_matches_generic_lookup():
+    import json
+    from datetime import datetime
+
+    from core.serialisers.serializer import Serializer
+
+    class File:
+        def __init__(self, id):
+            self.id = id
+
+        def get_formatted_size(self):
+            return "1 KB"
+
+    class Dataset:
+        title = "Titulo"
+
+        def __init__(self):
+            self.created_at = datetime(2024, 1, 2, 3, 4, 5)
+            self.files = lambda: [File(1), File(2)]
+
+        def name(self):
+            return self.title
+
+    serializer = Serializer(
+        {"created": "created_at", "name": "name", "title": "title", "missing": "missing", "files": "files"},
+        related_serializers={"files": Serializer({"file_id": "id", "size": "get_formatted_size"})},
+    )
+    expected = {
+        "created": "2024-01-02T03:04:05",
+        "name": "Titulo",
+        "title": "Titulo",
+        "missing": None,
+        "files": [{"file_id": 1, "size": "1 KB"}, {"file_id": 2, "size": "1 KB"}],
+    }
+
+    assert serializer.serialize(Dataset()) == expected
+    assert serializer.serialize(Dataset(), ["name", "created"]) == {"name": "Titulo", "created": "2024-01-02T03:04:05"}
+    assert serializer.serialize_many([Dataset(), Dataset()]) == [expected, expected]
+    assert json.loads(serializer.serialize_many_json([Dataset()])) == [expected]
+
+    # Los planes dependen de la clase: un MagicMock sigue pasando por la búsqueda genérica
+    mock = MagicMock()
+    mock.created_at = datetime(2024, 1, 2, 3, 4, 5)
+    mock.files.return_value = []
+    assert serializer.serialize(mock, ["created", "files"]) == {"created": "2024-01-02T03:04:05", "files": []}
+
+
+def test_repository_bulk_operations(test_client, clean_database):
+    from app import db
+    from app.modules.dataset.models import Author
+    from app.modules.dataset.repositories import AuthorRepository
+
+    repository = AuthorRepository()
+    rows = [{"name": f"Author {i}", "affiliation": "US"} for i in range(5)]
+
+    ids = repository.bulk_create(rows, returning=True, batch_size=2)
+    assert len(ids) == 5
+    assert [db.session.get(Author, i).name for i in ids] == [f"Author {i}" for i in range(5)]
+    assert repository.bulk_create([{"name": "Other"}]) == 1
+
+    assert repository.bulk_update([{"id": ids[0], "name": "Renamed"}, {"id": ids[1], "orcid": "0000"}]) == 2
+    assert repository.update_where({"affiliation": "USE"}, affiliation="US") == 5
+    db.session.expire_all()
+    assert db.session.get(Author, ids[0]).name == "Renamed"
+    assert db.session.get(Author, ids[1]).orcid == "0000"
+    assert db.session.get(Author, ids[2]).affiliation == "USE"
+
+    assert repository.bulk_delete(ids[:3], batch_size=2) == 3
+    assert repository.bulk_delete(name="Other") == 1
+    assert repository.count() == 2
+
+    with pytest.raises(ValueError):
+        repository.bulk_update([{"name": "sin id"}])
+    with pytest.raises(ValueError):
+        repository.bulk_delete()
+
+
+# --- Pool de conexiones ---
+
+
+def test_build_engine_options_from_profile_and_env(monkeypatch):
+    from sqlalchemy.pool import NullPool
+
+    from core.managers.config_manager import ProductionConfig
+    from core.managers.database_manager import TimedQueuePool, build_engine_options
+
+    uri = "mysql+pymysql://u:p@db:3306/app"
+    monkeypatch.setenv("DB_POOL_MODE", "queue")
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    options = build_engine_options(uri, ProductionConfig.DB_POOL_PROFILE)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 3 and options["max_overflow"] == 20 and options["pool_recycle"] == 280
+    assert options["pool_pre_ping"] is True and options["pool_use_lifo"] is False
+    assert options["connect_args"]["init_command"] == "SET SESSION max_statement_time=30"
+
+    monkeypatch.setenv("DB_POOL_MODE", "gevent")
+    monkeypatch.delenv("DB_POOL_SIZE")
+    options = build_engine_options(uri, ProductionConfig.DB_POOL_PROFILE)
+    assert options["pool_size"] == 20 and options["max_overflow"] == 40 and options["pool_use_lifo"] is True
+
+    monkeypatch.setenv("DB_POOL_MODE", "null")
+    assert build_engine_options(uri, {})["poolclass"] is NullPool
+    assert "connect_args" not in build_engine_options("sqlite:////tmp/x.db", {})
+
+    monkeypatch.setenv("DB_POOL_MODE", "bogus")
+    with pytest.raises(ValueError):
+        build_engine_options(uri, {})
+
+
+def test_pool_metrics_track_checkouts_and_churn(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, text
+
+    from core.managers.database_manager import PoolMetrics, build_engine_options
+
+    monkeypatch.setenv("DB_POOL_MODE", "queue")
+    uri = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(uri, **build_engine_options(uri, {"pool_size": 2, "max_overflow": 1}))
+    metrics = PoolMetrics()
+    metrics.listen(engine)
+
+    with engine.connect() as first, engine.connect():
+        first.execute(text("select 1"))
+        assert metrics.snapshot()["checked_out"] == 2
+        assert metrics.snapshot()["utilisation"] == round(2 / 3, 4)
+
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 3 and snapshot["checkout_errors"] == 0
+    assert snapshot["connections_opened"] == 3 and snapshot["connections_closed"] == 2
+    assert snapshot["checked_out"] == 0 and snapshot["checkout_wait_seconds_total"] > 0
+
+
+# --- Réplicas de lectura ---
+
+
+def test_read_only_queries_use_replica_until_the_session_writes(tmp_path, monkeypatch):
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+    from core.managers.database_manager import DatabaseManager
+    from core.repositories.routing import RoutingSession, read_only
+
+    monkeypatch.setenv("DB_REPLICA_URIS", f"sqlite:///{tmp_path / 'replica.db'}")
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}", SECRET_KEY="test")
+    manager = DatabaseManager(app)
+    manager.configure_engine()
+    routing_db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+    manager.register_replica_stickiness(routing_db)
+
+    class Beer(routing_db.Model):
+        id = routing_db.Column(routing_db.Integer, primary_key=True)
+        name = routing_db.Column(routing_db.String(20))
+
+    @read_only
+    def names():
+        return [beer.name for beer in routing_db.session.query(Beer).order_by(Beer.id)]
+
+    @app.route("/names")
+    def list_names():
+        return {"names": names()}
+
+    @app.route("/add", methods=["POST"])
+    def add():
+        routing_db.session.add(Beer(name="new"))
+        routing_db.session.commit()
+        return {"names": names()}
+
+    with app.app_context():
+        for engine, name in ((routing_db.engines[None], "primary"), (routing_db.engines["replica_0"], "replica")):
+            Beer.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(Beer.__table__.insert().values(name=name))
+
+        assert names() == ["replica"]
+        assert [beer.name for beer in routing_db.session.query(Beer)] == ["primary"]
+        routing_db.session.remove()
+
+    client = app.test_client()
+    assert client.get("/names").get_json() == {"names": ["replica"]}
+    # La petición que escribe lee sus propios cambios, y la siguiente del mismo cliente también
+    assert client.post("/add").get_json() == {"names": ["primary", "new"]}
+    assert client.get("/names").get_json() == {"names": ["primary", "new"]}
+    assert app.test_client().get("/names").get_json() == {"names": ["replica"]}
+
+
+# --- Perfilado SQL ---
+
+
+def test_query_profiler_reports_queries_and_n_plus_one(tmp_path, caplog):
+    import logging
+
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+    from core.managers.query_profiler_manager import QueryProfilerManager
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'profile.db'}",
+        SQL_PROFILER=True,
+        SQL_PROFILER_N_PLUS_ONE_THRESHOLD=3,
+    )
+    profile_db = SQLAlchemy(app)
+
+    class Brewery(profile_db.Model):
+        id = profile_db.Column(profile_db.Integer, primary_key=True)
+
+    QueryProfilerManager(app, profile_db).setup_profiler()
+
+    @app.route("/breweries")
+    def breweries():
+        ids = [brewery.id for brewery in Brewery.query.all()]
+        for brewery_id in ids + [ids[0]]:
+            profile_db.session.get(Brewery, brewery_id, populate_existing=True)
+        return "ok"
+
+    with app.app_context():
+        profile_db.create_all()
+        profile_db.session.add_all([Brewery() for _ in range(4)])
+        profile_db.session.commit()
+
+    with caplog.at_level(logging.INFO, logger="core.managers.query_profiler_manager"):
+        response = app.test_client().get("/breweries")
+
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="6 queries"' in response.headers["Server-Timing"]
+    record = caplog.records[-1]
+    assert record.levelno == logging.WARNING
+    assert record.endpoint == "breweries" and record.queries == 6 and record.duplicates == 1
+    assert record.n_plus_one[0]["count"] == 5
+    assert "test_unit.py" in record.n_plus_one[0]["origin"]
+
+
+# --- Métricas ---
+
+
+def test_metrics_endpoint_exposes_request_and_db_metrics(test_client):
+    test_client.get("/api/v1/datasets/?limit=1")
+    body = test_client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_request_duration_seconds_count{endpoint="dataset.datasets",method="GET",status="200"}' in body
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in body
+    assert "recommender_duration_seconds" in body and "dataset_zip_build_duration_seconds" in body
+
+
+def test_metrics_are_aggregated_across_processes(tmp_path, monkeypatch):
+    import subprocess
+    import sys
+
+    from core.metrics.metrics import render_latest
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+    script = "from core.metrics.metrics import ZIP_BUILD_LATENCY; ZIP_BUILD_LATENCY.observe(0.2)"
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), PYTHONPATH=root)
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", script], env=env, cwd=root, check=True)
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert "dataset_zip_build_duration_seconds_count 2.0" in render_latest().decode()
+
+
+# --- Logging ---
+
+
+def test_request_id_header_and_json_log_records(test_client):
+    import json
+    import logging
+
+    from core.logging.json_formatter import JSONFormatter
+    from core.logging.request_context import RequestContextFilter
+
+    assert test_client.get("/metrics", headers={"X-Request-ID": "req-1"}).headers["X-Request-ID"] == "req-1"
+    assert len(test_client.get("/metrics").headers["X-Request-ID"]) == 32
+
+    with test_client.application.test_request_context("/doi/x", headers={"X-Request-ID": "req-2"}):
+        test_client.application.preprocess_request()
+        record = logging.LogRecord("app.modules.x", logging.INFO, __file__, 1, "hola %s", ("mundo",), None)
+        record.dataset_id = 7
+        RequestContextFilter().filter(record)
+
+    line = json.loads(JSONFormatter().format(record))
+    assert line["message"] == "hola mundo" and line["level"] == "INFO" and line["logger"] == "app.modules.x"
+    assert line["request_id"] == "req-2" and line["path"] == "/doi/x" and line["dataset_id"] == 7
+
+
+# --- Response cache ---
+
+
+def test_response_cache_tags_and_stale_while_revalidate(test_client, monkeypatch):
+    from core.caching.response_cache import LRUBackend, ResponseCacheStore, response_cache
+
+    store = ResponseCacheStore(LRUBackend(), ttl=60, stale_ttl=300, lock_wait=0.1)
+    monkeypatch.setitem(test_client.application.extensions, "response_cache", store)
+    calls = []
+
+    class StubService:
+        def get_most_downloaded_datasets(self, limit):
+            calls.append(limit)
+            return [{"downloads": len(calls)}]
+
+    monkeypatch.setattr(dataset_routes, "dataset_service", StubService())
+    url = "/dataset/ranking/downloads"
+
+    first, second = test_client.get(url), test_client.get(url)
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert second.get_json() == [{"downloads": 1}] and len(calls) == 1
+    assert test_client.get(url + "?limit=5").headers["X-Cache"] == "MISS"
+
+    # Invalidada mientras otra petición la regenera: se sirve la copia anterior
+    store.invalidate("counters")
+    with test_client.application.test_request_context(url):
+        key = response_cache._request_key("view")
+    store.backend.add(f"lock:{key}", 1)
+    stale = test_client.get(url)
+    assert stale.headers["X-Cache"] == "STALE" and stale.get_json() == [{"downloads": 1}]
+
+    store.backend.delete(f"lock:{key}")
+    fresh = test_client.get(url)
+    assert fresh.headers["X-Cache"] == "MISS" and fresh.get_json() == [{"downloads": 3}]
+    assert test_client.get(url).headers["X-Cache"] == "HIT"
+
+
+def test_response_cache_throttles_frequent_invalidations(test_client, monkeypatch):
+    from app.modules.dataset.services import DSViewRecordService
+    from core.caching.response_cache import LRUBackend, ResponseCacheStore
+
+    store = ResponseCacheStore(LRUBackend())
+    monkeypatch.setitem(test_client.application.extensions, "response_cache", store)
+    monkeypatch.setattr(DSViewRecordService, "__init__", lambda self: setattr(self, "repository", MagicMock()))
+
+    with test_client.application.test_request_context("/"):
+        DSViewRecordService().create_new_record(MagicMock(), "cookie-1")
+        version = store.backend.get("tag:counters")
+        DSViewRecordService().create_new_record(MagicMock(), "cookie-2")
+        assert version and store.backend.get("tag:counters") == version
+
+        # Pasada la ventana, la siguiente visita vuelve a invalidar
+        store.backend.delete("throttle:counters")
+        DSViewRecordService().create_new_record(MagicMock(), "cookie-3")
+        assert store.backend.get("tag:counters") != version
+
+    # Sin interval se invalida siempre
+    store.invalidate("datasets")
+    version = store.backend.get("tag:datasets")
+    store.invalidate("datasets")
+    assert store.backend.get("tag:datasets") != version
+
+
+def test_fragment_cache_extension_caches_by_versioned_key(test_client):
+    from jinja2 import Environment
+
+    from core.caching.fragment_cache import FragmentCacheExtension
+    from core.caching.response_cache import LRUBackend
+
+    env = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    env.fragment_cache = LRUBackend()
+    template = env.from_string('{% cache ["ds", 1, version], 60 %}<b>{{ render() }}</b>{% endcache %} {{ user }}')
+    calls = []
+
+    def render():
+        calls.append(1)
+        return f"<{len(calls)}>"
+
+    assert template.render(version="a", render=render, user="ana") == "<b>&lt;1&gt;</b> ana"
+    assert template.render(version="a", render=render, user="bob") == "<b>&lt;1&gt;</b> bob"
+    assert template.render(version="b", render=render, user="ana") == "<b>&lt;2&gt;</b> ana"
+    assert len(calls) == 2
+
+    # La página del dataset compila con los bloques {% cache %}
+    assert test_client.application.jinja_env.get_template("dataset/view_dataset.html")
+
+
+def test_metadata_cache_version_changes_with_authors_and_uploader(test_client, clean_database):
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import Author, DataSet
+    from app.modules.profile.models import UserProfile
+
+    user = User(email="fragment@example.com", password="1234")
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(UserProfile(user_id=user.id, name="Ana", surname="Ruiz"))
+    db.session.commit()
+    create_api_datasets(1)
+    dataset = DataSet.query.first()
+    versions = [dataset.get_metadata_cache_version()]
+
+    user.profile.surname = "Gil"
+    db.session.commit()
+    versions.append(dataset.get_metadata_cache_version())
+
+    db.session.add(Author(name="Bea", ds_meta_data_id=dataset.ds_meta_data_id))
+    db.session.commit()
+    db.session.refresh(dataset.ds_meta_data)
+    versions.append(dataset.get_metadata_cache_version())
+
+    assert len(set(versions)) == 3
+    assert dataset.get_metadata_cache_version() == versions[-1]
+
+
+# --- Agregados de ficheros ---
+
+
+def test_dataset_file_aggregates_are_maintained_and_checked(test_client, clean_database):
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import DataSet
+    from app.modules.dataset.repositories import DataSetRepository
+    from app.modules.hubfile.models import Hubfile
+
+    db.session.add(User(email="agg@example.com", password="1234"))
+    db.session.commit()
+    create_api_datasets(2, files_per_dataset=3)
+    first, second = DataSet.query.order_by(DataSet.id).all()
+    assert (first.get_files_count(), first.get_file_total_size()) == (3, 30)
+
+    db.session.delete(Hubfile.query.filter(Hubfile.csv_model_id.in_([fm.id for fm in first.csv_models])).first())
+    db.session.commit()
+    assert (first.files_count, first.total_size_bytes) == (2, 20)
+    assert "files" not in first.to_dict(include_files=False)
+
+    repository = DataSetRepository()
+    assert repository.inconsistent_file_aggregates() == []
+    repository.update_where({"files_count": 0, "total_size_bytes": 5}, id=second.id)
+    assert repository.inconsistent_file_aggregates() == [(second.id, 0, 3, 5, 30)]
+
+    repository.refresh_file_aggregates([second.id])
+    db.session.refresh(second)
+    assert (second.files_count, second.total_size_bytes) == (3, 30)
+    assert repository.inconsistent_file_aggregates() == []
+
+
+def test_compute_csv_stats_in_one_pass_and_store_them_in_fm_metrics(test_client, tmp_path):
+    from app import db
+    from app.modules.csvmodel.models import FMMetrics
+    from app.modules.csvmodel.repositories import FMMetaDataRepository
+    from app.modules.dataset.csv_stats import compute_csv_stats
+
+    path = tmp_path / "beers.csv"
+    path.write_text(
+        "﻿id;name;brand;style;alcohol;ibu;origin\n"
+        "1;A;North;Stout;6.8;45;UK\n"
+        "\n"
+        "2;B;North;IPA;5.2;60;US\n"
+        "3;C;South;Stout;4.0;15;UK\n"
+    )
+
+    stats = compute_csv_stats(str(path))
+    assert stats["row_count"] == 3
+    assert (stats["alcohol_min"], stats["alcohol_max"], stats["alcohol_mean"]) == (4.0, 6.8, 5.3333)
+    assert (stats["ibu_min"], stats["ibu_max"], stats["ibu_mean"]) == (15.0, 60.0, 40.0)
+    assert stats["styles"] == {"Stout": 2, "IPA": 1}
+    assert stats["brands"] == {"North": 2, "South": 1} and stats["origins"] == {"UK": 2, "US": 1}
+
+    with test_client.application.app_context():
+        metrics = FMMetrics(**stats)
+        db.session.add(metrics)
+        db.session.commit()
+        db.session.expire_all()
+        stored = db.session.get(FMMetrics, metrics.id).to_dict()
+        assert stored["styles"] == {"Stout": 2, "IPA": 1} and stored["ibu"]["mean"] == 40.0
+        assert all(fm.fm_metrics_id != metrics.id for fm in FMMetaDataRepository().get_without_stats())
+
+
+def test_columnar_index_counts_hits_incrementally_and_matches_a_full_scan(tmp_path):
+    import random
+
+    from core.files.columnar_index import ColumnarIndex
+    from core.files.columnar_store import ColumnarStore
+
+    kinds = {"name": "str", "brand": "str", "style": "str", "alcohol": "float", "ibu": "int"}
+    store = ColumnarStore(str(tmp_path))
+    index = ColumnarIndex(store, ("name", "brand", "style"), refresh_interval=0)
+    generator = random.Random(7)
+    tables = {}
+    for number in range(4):
+        rows = [
+            {
+                "name": f"{generator.choice(['Hop', 'Dark', 'Golden'])} {generator.choice(['Bomb', 'Night'])}",
+                "brand": generator.choice(["North", "South", "East"]),
+                "style": generator.choice(["IPA", "ipa", "Stout", "Lager"]),
+                "alcohol": round(generator.uniform(3, 10), 1),
+                "ibu": generator.randint(5, 90),
+            }
+            for _ in range(200)
+        ]
+        rows[0]["alcohol"] = "n/a"
+        key = f"dataset_{number // 2}/file_{number}"
+        store.write(key, kinds, {name: [row[name] for row in rows] for name in kinds})
+        index.add(key)
+        tables[key] = rows
+
+    def scan(predicate):
+        counts = {key: sum(1 for row in rows if predicate(row)) for key, rows in tables.items()}
+        return {key: count for key, count in counts.items() if count}
+
+    def alcohol(row):
+        return row["alcohol"] if isinstance(row["alcohol"], float) else None
+
+    assert index.search(values={"style": ["ipa"]}) == scan(lambda row: row["style"].lower() == "ipa")
+    assert index.search(ranges=[("alcohol", "gt", 7), ("alcohol", "le", 9)]) == scan(
+        lambda row: alcohol(row) is not None and 7 < alcohol(row) <= 9
+    )
+    assert index.search(
+        values={"brand": ["North", "east"]}, tokens=["hop"], ranges=[("ibu", "ge", 40)], keys=["dataset_1/file_2"]
+    ) == {
+        key: count
+        for key, count in scan(
+            lambda row: row["brand"] in ("North", "East") and "Hop" in row["name"] and row["ibu"] >= 40
+        ).items()
+        if key == "dataset_1/file_2"
+    }
+
+    # Una tabla reescrita o borrada desde otro proceso entra en el índice con el siguiente refresh
+    store.write(
+        "dataset_0/file_0",
+        kinds,
+        {"name": ["Only Stout"], "brand": ["West"], "style": ["Stout"], "alcohol": [5.0], "ibu": [30]},
+    )
+    store.delete("dataset_1/file_3")
+    index.refresh(force=True)
+    assert index.search(values={"brand": ["west"]}) == {"dataset_0/file_0": 1}
+    assert "dataset_1/file_3" not in index.search(values={"style": ["Stout"]})
+
+
+def test_columnar_index_does_not_double_count_repeated_or_case_variant_values(tmp_path):
+    from core.files.columnar_index import ColumnarIndex
+    from core.files.columnar_store import ColumnarStore
+
+    kinds = {"brand": "str", "style": "str", "ibu": "int"}
+    store = ColumnarStore(str(tmp_path))
+    store.write(
+        "dataset_1/file_1",
+        kinds,
+        {"brand": ["North", "north", "South"], "style": ["IPA", "Stout", "IPA"], "ibu": [40, 50, 60]},
+    )
+    index = ColumnarIndex(store, ("brand", "style"), refresh_interval=0)
+
+    assert index.search(values={"brand": ["North"]}) == {"dataset_1/file_1": 2}
+    assert index.search(values={"brand": ["North", "NORTH", " north "]}) == {"dataset_1/file_1": 2}
+    assert index.search(values={"brand": ["North", "north"], "style": ["IPA"]}) == {"dataset_1/file_1": 1}
+    assert index.search(values={"brand": ["north", "North"]}, tokens=["north", "NORTH"]) == {"dataset_1/file_1": 2}
+
+
+def test_columnar_store_treats_non_finite_numbers_as_missing(tmp_path):
+    from core.files.columnar_store import ColumnarStore
+
+    store = ColumnarStore(str(tmp_path))
+    store.write(
+        "dataset_1/file_1",
+        {"alcohol": "float", "ibu": "int"},
+        {"alcohol": ["nan", "-inf", "5.5", "1e999"], "ibu": ["inf", "NaN", "1e30", "40"]},
+    )
+    table = store.open("dataset_1/file_1")
+
+    assert table.take(table.mask([])) == [
+        {"alcohol": None, "ibu": None},
+        {"alcohol": None, "ibu": None},
+        {"alcohol": 5.5, "ibu": None},
+        {"alcohol": None, "ibu": 40},
+    ]
+
+
+def test_columnar_index_ranges_skip_nan_cells_like_the_scan(tmp_path):
+    from core.files.columnar_index import ColumnarIndex
+    from core.files.columnar_store import ColumnarStore
+
+    kinds = {"style": "str", "alcohol": "float", "ibu": "int"}
+    store = ColumnarStore(str(tmp_path))
+    store.write(
+        "dataset_1/file_1",
+        kinds,
+        {"style": ["IPA", "IPA", "Stout"], "alcohol": ["nan", "7.5", "inf"], "ibu": ["40", "nan", "60"]},
+    )
+    index = ColumnarIndex(store, ("style",), refresh_interval=0)
+
+    for column, op, value, expected in [("alcohol", "gt", 7, 1), ("ibu", "ge", 40, 2), ("alcohol", "lt", 8, 1)]:
+        assert store.scan([(column, op, value)])["total"] == expected
+        assert index.search(ranges=[(column, op, value)]) == {"dataset_1/file_1": expected}
+    assert index.search(values={"style": ["IPA"]}, ranges=[("ibu", "ge", 0)]) == {"dataset_1/file_1": 1}
+
+
+def test_search_beers_skips_tables_removed_after_the_search(test_client, monkeypatch):
+    from app.modules.dataset.beer_catalog import search_beers
+
+    tables = {"dataset_1/file_1": MagicMock(attrs={"dataset_id": 1, "file_id": 1})}
+    index = MagicMock()
+    index.search.return_value = {"dataset_1/file_1": 2, "dataset_1/file_2": 3}
+    index.store.open.side_effect = tables.get
+    monkeypatch.setitem(test_client.application.extensions, "beer_index", index)
+
+    with test_client.application.app_context():
+        result = search_beers(tokens=["hop"])
+
+    assert result == {"total_hits": 2, "datasets": [{"dataset_id": 1, "hits": 2, "files": [{"file_id": 1, "hits": 2}]}]}
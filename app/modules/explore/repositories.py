@@ -6,13 +6,39 @@ from sqlalchemy import func, or_
 from app import db
 from app.modules.csvmodel.models import CSVModel, FMMetaData
 from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.hubfile.models import Hubfile
 from core.repositories.BaseRepository import BaseRepository
+from core.repositories.routing import read_only
 
 
 class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
 
+    @read_only
+    def published_dataset_ids(self) -> set:
+        """Ids of the datasets listed in explore (those with a DOI)."""
+        rows = db.session.query(DataSet.id).join(DataSet.ds_meta_data).filter(DSMetaData.dataset_doi.isnot(None))
+        return {dataset_id for (dataset_id,) in rows}
+
+    @read_only
+    def dataset_titles(self, dataset_ids) -> dict:
+        if not dataset_ids:
+            return {}
+        rows = (
+            db.session.query(DataSet.id, DSMetaData.title)
+            .join(DataSet.ds_meta_data)
+            .filter(DataSet.id.in_(dataset_ids))
+        )
+        return dict(rows)
+
+    @read_only
+    def file_names(self, file_ids) -> dict:
+        if not file_ids:
+            return {}
+        return dict(db.session.query(Hubfile.id, Hubfile.name).filter(Hubfile.id.in_(file_ids)))
+
+    @read_only
     def filter(
         self,
         query="",
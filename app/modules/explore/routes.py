@@ -1,5 +1,8 @@
+import time
+
 from flask import jsonify, render_template, request
 
+from app.modules.dataset.beer_catalog import parse_beer_filters, parse_beer_search
 from app.modules.explore import explore_bp
 from app.modules.explore.forms import ExploreForm
 from app.modules.explore.services import ExploreService
@@ -16,6 +19,35 @@ def index():
         if request.method == "POST":
             criteria = request.get_json()
             datasets = ExploreService().filter(**criteria)
-            return jsonify([dataset.to_dict() for dataset in datasets])
+            # El listado usa files_count/total_size_bytes: no hace falta cargar los ficheros
+            return jsonify([dataset.to_dict(include_files=False) for dataset in datasets])
     except Exception as e:
         return jsonify({"message": str(e)}), 500
+
+
+@explore_bp.route("/explore/beers", methods=["GET"])
+def query_beers():
+    """Beers (CSV rows) of every published dataset, e.g. ``/explore/beers?style=IPA&alcohol_gt=7``."""
+    try:
+        filters = parse_beer_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid filter: {e}"}), 400
+
+    result = ExploreService().query_beers(filters, limit=request.args.get("limit", 100, type=int))
+    return jsonify(result)
+
+
+@explore_bp.route("/explore/beers/search", methods=["GET"])
+def search_beers():
+    """Which published datasets and files contain matching beers, e.g. ``/explore/beers/search?brand=North``."""
+    start = time.perf_counter()
+    try:
+        search = parse_beer_search(request.args)
+    except ValueError as e:
+        return jsonify({"message": f"Invalid filter: {e}"}), 400
+    if not any(search.values()):
+        return jsonify({"message": "At least one search criterion is required"}), 400
+
+    result = ExploreService().search_beers(**search)
+    result["took_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return jsonify(result)
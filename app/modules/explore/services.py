@@ -1,3 +1,4 @@
+from app.modules.dataset.beer_catalog import query_beers, search_beers
 from app.modules.explore.repositories import ExploreRepository
 from core.services.BaseService import BaseService
 
@@ -8,3 +9,20 @@ class ExploreService(BaseService):
 
     def filter(self, query="", sorting="newest", publication_type="any", tags=[], **kwargs):
         return self.repository.filter(query, sorting, publication_type, tags, **kwargs)
+
+    def query_beers(self, filters, limit=100):
+        """Beers of the published datasets matching ``filters``, scanned on the columnar copy of their CSVs."""
+        return query_beers(filters, dataset_ids=self.repository.published_dataset_ids(), limit=limit)
+
+    def search_beers(self, values=None, tokens=(), ranges=()):
+        """Published datasets and files with beers matching the search (inverted index), with hit counts."""
+        result = search_beers(values, tokens, ranges, dataset_ids=self.repository.published_dataset_ids())
+        titles = self.repository.dataset_titles([dataset["dataset_id"] for dataset in result["datasets"]])
+        names = self.repository.file_names(
+            [file["file_id"] for dataset in result["datasets"] for file in dataset["files"]]
+        )
+        for dataset in result["datasets"]:
+            dataset["title"] = titles.get(dataset["dataset_id"])
+            for file in dataset["files"]:
+                file["name"] = names.get(file["file_id"])
+        return result
@@ -244,7 +244,8 @@ def test_explore_post(client, monkeypatch):
         def __init__(self, id):
             self.id = id
 
-        def to_dict(self):
+        def to_dict(self, include_files=True):
+            assert include_files is False
             return {"id": self.id}
 
     def fake_filter(**criteria):
@@ -281,3 +282,101 @@ def test_explore_get_failure(client, monkeypatch):
     response = client.get("/explore")
 
     assert response.status_code == 500
+
+
+def test_explore_beers_scans_the_columnar_copy_of_published_csvs(
+    clean_database, build_dataset, client, tmp_path, monkeypatch
+):
+    from app.modules.dataset.beer_catalog import beer_store, write_beer_table
+
+    app = client.application
+    monkeypatch.setitem(app.config, "COLUMNAR_STORE_DIR", str(tmp_path))
+    monkeypatch.setitem(app.extensions, "beer_store", None)
+    published = build_dataset(title="Published")
+    hidden = build_dataset(title="Local", dataset_doi=None)
+
+    csv_path = tmp_path / "beers.csv"
+    csv_path.write_text(
+        "id,name,brand,style,alcohol,ibu,origin\n"
+        "1,Hop Bomb,North,IPA,7.5,70,US\n"
+        "2,Light Hop,North,ipa,4.5,40,US\n"
+        "3,Dark Night,South,Stout,8.0,50,UK\n"
+    )
+    with app.app_context():
+        write_beer_table(published.id, 1, str(csv_path))
+        write_beer_table(hidden.id, 2, str(csv_path))
+        assert beer_store().keys() == sorted([f"dataset_{published.id}/file_1", f"dataset_{hidden.id}/file_2"])
+
+    data = client.get("/explore/beers?style=IPA&alcohol_gt=7").get_json()
+    assert data["total"] == 1
+    assert data["rows"] == [
+        {
+            "id": "1",
+            "name": "Hop Bomb",
+            "brand": "North",
+            "style": "IPA",
+            "alcohol": 7.5,
+            "ibu": 70,
+            "origin": "US",
+            "dataset_id": published.id,
+            "file_id": 1,
+        }
+    ]
+
+    data = client.get("/explore/beers?style=IPA&style=Stout&ibu_le=50&name_contains=h&limit=1").get_json()
+    assert data["total"] == 2 and len(data["rows"]) == 1
+
+    # Los límites decimales de una columna entera no se truncan
+    assert client.get("/explore/beers?ibu_ge=50.5").get_json()["total"] == 1
+    assert client.get("/explore/beers?ibu_lt=40.5").get_json()["total"] == 1
+    # Un valor exacto no entero en una columna entera no se trunca: se rechaza
+    assert client.get("/explore/beers?ibu=70").get_json()["total"] == 1
+    assert client.get("/explore/beers?ibu=70.5").status_code == 400
+    assert client.get("/explore/beers?ibu=40&ibu=69.9").status_code == 400
+    assert client.get("/explore/beers?alcohol_gt=nan").status_code == 400
+
+    assert client.get("/explore/beers?alcohol_gt=strong").status_code == 400
+
+
+def test_explore_beers_search_returns_datasets_and_files_with_hit_counts(
+    clean_database, build_dataset, client, tmp_path, monkeypatch
+):
+    from app.modules.dataset.beer_catalog import write_beer_table
+
+    app = client.application
+    monkeypatch.setitem(app.config, "COLUMNAR_STORE_DIR", str(tmp_path))
+    monkeypatch.setitem(app.extensions, "beer_store", None)
+    monkeypatch.setitem(app.extensions, "beer_index", None)
+    published = build_dataset(title="Published")
+    hidden = build_dataset(title="Local", dataset_doi=None)
+
+    csv_path = tmp_path / "beers.csv"
+    csv_path.write_text(
+        "id,name,brand,style,alcohol,ibu,origin\n"
+        "1,Hop Bomb,North Brewery,IPA,7.5,70,US\n"
+        "2,Light Hop,North Brewery,IPA,4.5,40,US\n"
+        "3,Dark Night,South,Stout,8.0,50,UK\n"
+    )
+    with app.app_context():
+        write_beer_table(published.id, 1, str(csv_path))
+        write_beer_table(published.id, 2, str(csv_path))
+        write_beer_table(hidden.id, 3, str(csv_path))
+
+    data = client.get("/explore/beers/search?brand=north%20brewery&alcohol_ge=4").get_json()
+    assert data["total_hits"] == 4 and "took_ms" in data
+    assert data["datasets"] == [
+        {
+            "dataset_id": published.id,
+            "title": "Published",
+            "hits": 4,
+            "files": [{"file_id": 1, "name": None, "hits": 2}, {"file_id": 2, "name": None, "hits": 2}],
+        }
+    ]
+
+    data = client.get("/explore/beers/search?q=hop&alcohol_gt=7").get_json()
+    assert data["total_hits"] == 2 and [file["hits"] for file in data["datasets"][0]["files"]] == [1, 1]
+
+    assert client.get("/explore/beers/search?ibu_lt=40.5").get_json()["total_hits"] == 2
+    assert client.get("/explore/beers/search?origin=Mars").get_json()["datasets"] == []
+    assert client.get("/explore/beers/search").status_code == 400
+    assert client.get("/explore/beers/search?ibu_lt=bitter").status_code == 400
@@ -0,0 +1,153 @@
+import io
+import math
+import os
+import random
+import threading
+import time
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "exponential", "lognormal")
+
+
+class ThrottledStream(io.RawIOBase):
+    """Readable stream that delivers the wrapped ``wsgi.input`` at no more than ``bytes_per_second``."""
+
+    chunk_size = 16 * 1024
+
+    def __init__(self, stream, bytes_per_second: float):
+        self._stream = stream
+        self._bytes_per_second = bytes_per_second
+        self._read = 0
+        self._start = time.monotonic()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # Trozos pequeños para que el ritmo sea uniforme y no a saltos
+        view = memoryview(buffer)[: self.chunk_size]
+        data = self._stream.read(len(view))
+        size = len(data)
+        view[:size] = data
+
+        self._read += size
+        delay = self._read / self._bytes_per_second - (time.monotonic() - self._start)
+        if delay > 0:
+            time.sleep(delay)
+        return size
+
+
+class FaultInjector:
+    """
+    Latency, error, rate-limit and bandwidth faults for the Fakenodo API, so load tests can measure how
+    the app degrades when the archive is slow or unreliable.
+
+    Every fault is off by default. The initial values come from ``FAKENODO_*`` environment variables
+    and can be changed at runtime through ``/fakenodo/api/admin/faults``; runtime changes only affect
+    the worker process that receives them, so multi-worker deployments should use the env vars.
+    """
+
+    # nombre -> (variable de entorno, tipo, valor por defecto)
+    SETTINGS = {
+        "latency_ms": ("FAKENODO_LATENCY_MS", float, 0.0),
+        "latency_jitter_ms": ("FAKENODO_LATENCY_JITTER_MS", float, 0.0),
+        "latency_distribution": ("FAKENODO_LATENCY_DISTRIBUTION", str, "fixed"),
+        "error_rate": ("FAKENODO_ERROR_RATE", float, 0.0),
+        "error_status": ("FAKENODO_ERROR_STATUS", int, 503),
+        "rate_limit_per_second": ("FAKENODO_RATE_LIMIT", float, 0.0),
+        "rate_limit_burst": ("FAKENODO_RATE_LIMIT_BURST", int, 10),
+        "bandwidth_kbps": ("FAKENODO_BANDWIDTH_KBPS", float, 0.0),
+    }
+
+    def __init__(self, rng: random.Random = None, **settings):
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        for name, (_, _, default) in self.SETTINGS.items():
+            setattr(self, name, default)
+        self.update(settings)
+
+    @classmethod
+    def from_env(cls) -> "FaultInjector":
+        return cls(**{name: os.environ[env] for name, (env, _, _) in cls.SETTINGS.items() if env in os.environ})
+
+    def update(self, settings: dict):
+        """Validate and apply a partial configuration. Raises ``ValueError`` on bad input."""
+        values = {}
+        for name, value in settings.items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"Unknown fault setting: {name}")
+            _, kind, _ = self.SETTINGS[name]
+            try:
+                values[name] = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}: {value!r}") from None
+
+        if values.get("latency_distribution", self.latency_distribution) not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        if not 0 <= values.get("error_rate", self.error_rate) <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        if not 400 <= values.get("error_status", self.error_status) <= 599:
+            raise ValueError("error_status must be an HTTP error status")
+        for name in self.SETTINGS:
+            if self.SETTINGS[name][1] is not str and values.get(name, getattr(self, name)) < 0:
+                raise ValueError(f"{name} must not be negative")
+
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, value)
+            # El bucket se rellena al cambiar la configuración
+            self._tokens = float(self.rate_limit_burst)
+            self._refilled_at = time.monotonic()
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.SETTINGS}
+
+    def sample_latency(self) -> float:
+        """Delay to apply to one request, in seconds."""
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        distribution = self.latency_distribution
+
+        if distribution == "uniform":
+            delay = self._rng.uniform(mean - jitter, mean + jitter)
+        elif distribution == "normal":
+            delay = self._rng.gauss(mean, jitter)
+        elif distribution == "exponential":
+            delay = self._rng.expovariate(1 / mean) if mean > 0 else 0.0
+        elif distribution == "lognormal":
+            # Cola larga con media ``mean``; ``jitter`` hace de desviación típica
+            delay = self._lognormal(mean, jitter)
+        else:
+            delay = mean
+        return max(0.0, delay) / 1000
+
+    def _lognormal(self, mean: float, stddev: float) -> float:
+        if mean <= 0:
+            return 0.0
+        sigma2 = math.log(1 + (stddev / mean) ** 2)
+        return self._rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    def acquire(self) -> float:
+        """
+        Take a token from the rate-limit bucket.
+
+        Returns 0 when the request may proceed, or the seconds until a token is available (for ``Retry-After``).
+        """
+        if self.rate_limit_per_second <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1, self.rate_limit_burst)
+            self._tokens = min(capacity, self._tokens + (now - self._refilled_at) * self.rate_limit_per_second)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate_limit_per_second
+
+    def throttle(self, stream):
+        if self.bandwidth_kbps <= 0:
+            return stream
+        return ThrottledStream(stream, self.bandwidth_kbps * 1024)
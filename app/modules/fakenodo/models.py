@@ -1,14 +1,20 @@
+import uuid
+
+
+def generate_doi() -> str:
+    return f"10.9999/fakenodo.{uuid.uuid4().hex[:6]}"
+
+
 class Fakenodo:
     def __init__(self, id, meta, created_at=None):
         self.id = id
         self.meta = meta
         self.created_at = created_at
+        self.revision = 0
         self.versions = []  # lista de dicts con {doi, meta, published, files}
 
     def add_version(self, meta, files=None, published=False):
-        import uuid
-
-        doi = f"10.9999/fakenodo.{uuid.uuid4().hex[:6]}" if published else None
+        doi = generate_doi() if published else None
         version = {
             "doi": doi,
             "meta": meta,
@@ -25,3 +31,12 @@ class Fakenodo:
             "meta": self.meta,
             "versions": self.versions,
         }
+
+    def __eq__(self, other):
+        if not isinstance(other, Fakenodo):
+            return NotImplemented
+        return self.id == other.id and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        # Solo el id: el resto es mutable y dos depósitos iguales siempre comparten id
+        return hash(self.id)
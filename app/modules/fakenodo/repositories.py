@@ -1,26 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
-from app.modules.fakenodo.models import Fakenodo
+from app.modules.fakenodo.models import Fakenodo, generate_doi
+
+# Intentos de generar un DOI libre antes de rendirse
+DOI_ATTEMPTS = 5
+DOI_CONFLICT = "UNIQUE constraint failed: versions.doi"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meta TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    touched_at REAL NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_records_touched_at ON records (touched_at);
+
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id INTEGER NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    doi TEXT UNIQUE,
+    meta TEXT NOT NULL,
+    published INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_versions_record_id ON versions (record_id);
+
+CREATE TABLE IF NOT EXISTS version_files (
+    version_id INTEGER NOT NULL REFERENCES versions (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    PRIMARY KEY (version_id, name)
+);
+
+-- Unión de los archivos de todas las versiones, mantenida al añadir archivos
+CREATE TABLE IF NOT EXISTS record_files (
+    record_id INTEGER NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    PRIMARY KEY (record_id, name)
+);
+"""
 
 
 class FakenodoRepository:
-    def __init__(self):
-        self._records = {}
-        self._counter = 1
+    """
+    SQLite-backed store for Fakenodo records.
+
+    With ``FAKENODO_STORE_PATH`` set, records live in that SQLite file, so every gunicorn worker
+    (and every process) sees the same records; SQLite's file locking serialises the writers.
+    Without it the store is a private in-memory database, like the old per-process dict.
+    ``FAKENODO_MAX_RECORDS`` (0 = unlimited) evicts the least recently touched records.
+    """
+
+    def __init__(self, path: str = None, max_records: int = None):
+        self.path = path if path is not None else os.getenv("FAKENODO_STORE_PATH") or None
+        if max_records is None:
+            max_records = int(os.getenv("FAKENODO_MAX_RECORDS", "0"))
+        self.max_records = max_records
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Las conexiones no se heredan tras un fork de gunicorn
+        if self._connection is None or self._pid != os.getpid():
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+            else:
+                connection = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    @contextmanager
+    def _transaction(self, write: bool = True):
+        # BEGIN IMMEDIATE toma el bloqueo de escritura al empezar; BEGIN da lecturas consistentes
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
 
     def create(self, meta):
-        record = Fakenodo(id=self._counter, meta=meta, created_at=datetime.now(timezone.utc))
-        # primera versión sin publicar
-        record.add_version(meta, published=False)
-        self._records[self._counter] = record
-        self._counter += 1
-        return record
+        now = datetime.now(timezone.utc).isoformat()
+        with self._transaction() as connection:
+            record_id = connection.execute(
+                "INSERT INTO records (meta, created_at, touched_at) VALUES (?, ?, ?)",
+                (json.dumps(meta), now, time.time()),
+            ).lastrowid
+            # primera versión sin publicar
+            self._insert_version(connection, record_id, meta, [], published=False)
+            self._evict(connection)
+        return self.get_or_404(record_id)
+
+    def add_version(self, record_id, files=None, published=False) -> dict:
+        """Add a version with the record's metadata and return it."""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT meta FROM records WHERE id = ?", (int(record_id),)).fetchone()
+            if row is None:
+                raise KeyError(f"Record {record_id} not found")
+            return self._insert_version(connection, int(record_id), json.loads(row["meta"]), files or [], published)
+
+    def add_files(self, record_id, files) -> None:
+        """Attach files to the latest version of a record (duplicates are ignored)."""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT MAX(id) AS version_id FROM versions WHERE record_id = ?", (int(record_id),)
+            ).fetchone()
+            if row["version_id"] is None:
+                raise KeyError(f"Record {record_id} not found")
+            self._insert_files(connection, int(record_id), row["version_id"], files)
+            self._touch(connection, int(record_id))
 
     def get_or_404(self, record_id):
-        record = self._records.get(int(record_id))
-        if not record:
+        records = self._load_records("WHERE id = ?", (int(record_id),))
+        if not records:
+            raise KeyError(f"Record {record_id} not found")
+        return records[0]
+
+    def get_revision(self, record_id) -> int:
+        with self._lock:
+            row = self._connect().execute("SELECT revision FROM records WHERE id = ?", (int(record_id),)).fetchone()
+        if row is None:
             raise KeyError(f"Record {record_id} not found")
-        return record
+        return row["revision"]
+
+    def get_by_doi(self, doi):
+        with self._lock:
+            row = self._connect().execute("SELECT record_id FROM versions WHERE doi = ?", (doi,)).fetchone()
+        if row is None:
+            raise KeyError(f"Record with DOI {doi} not found")
+        return self.get_or_404(row["record_id"])
+
+    def get_files(self, record_id) -> list[str]:
+        """Files of every version of a record, in upload order."""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute("SELECT name FROM record_files WHERE record_id = ? ORDER BY rowid", (int(record_id),))
+                .fetchall()
+            )
+        return [row["name"] for row in rows]
 
     def list_all(self):
-        return [r.to_dict() for r in self._records.values()]
+        return [r.to_dict() for r in self._load_records()]
+
+    def _load_records(self, where: str = "", params: tuple = ()) -> list[Fakenodo]:
+        # Tres consultas en total, sea cual sea el número de registros o versiones
+        with self._transaction(write=False) as connection:
+            record_rows = connection.execute(f"SELECT * FROM records {where} ORDER BY id", params).fetchall()
+            record_filter = f"WHERE record_id IN (SELECT id FROM records {where})"
+            version_rows = connection.execute(f"SELECT * FROM versions {record_filter} ORDER BY id", params).fetchall()
+            file_rows = connection.execute(
+                f"SELECT version_id, name FROM version_files WHERE version_id IN "
+                f"(SELECT id FROM versions {record_filter}) ORDER BY rowid",
+                params,
+            ).fetchall()
+
+        if not record_rows:
+            return []
+
+        files_by_version = {}
+        for row in file_rows:
+            files_by_version.setdefault(row["version_id"], []).append(row["name"])
+
+        records = {}
+        for row in record_rows:
+            records[row["id"]] = Fakenodo(
+                id=row["id"], meta=json.loads(row["meta"]), created_at=datetime.fromisoformat(row["created_at"])
+            )
+            records[row["id"]].revision = row["revision"]
+        for row in version_rows:
+            records[row["record_id"]].versions.append(self._version_dict(row, files_by_version.get(row["id"], [])))
+        return list(records.values())
+
+    def _insert_version(self, connection, record_id, meta, files, published) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        for attempt in range(1, DOI_ATTEMPTS + 1):
+            doi = generate_doi() if published else None
+            try:
+                version_id = connection.execute(
+                    "INSERT INTO versions (record_id, doi, meta, published, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (record_id, doi, json.dumps(meta), int(published), now),
+                ).lastrowid
+                break
+            except sqlite3.IntegrityError as exc:
+                # Solo un DOI repetido se reintenta (con otro DOI); p. ej. un registro ya borrado no
+                if not published or DOI_CONFLICT not in str(exc) or attempt == DOI_ATTEMPTS:
+                    raise
+        self._insert_files(connection, record_id, version_id, files)
+        self._touch(connection, record_id)
+        row = connection.execute("SELECT * FROM versions WHERE id = ?", (version_id,)).fetchone()
+        return self._version_dict(row, list(dict.fromkeys(f for f in files if f)))
+
+    @staticmethod
+    def _insert_files(connection, record_id, version_id, files):
+        names = [f for f in dict.fromkeys(files) if f]
+        connection.executemany(
+            "INSERT OR IGNORE INTO version_files (version_id, name) VALUES (?, ?)", [(version_id, n) for n in names]
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO record_files (record_id, name) VALUES (?, ?)", [(record_id, n) for n in names]
+        )
+
+    @staticmethod
+    def _touch(connection, record_id):
+        # Cada cambio del registro incrementa su revisión (sirve de clave de caché)
+        connection.execute(
+            "UPDATE records SET touched_at = ?, revision = revision + 1 WHERE id = ?", (time.time(), record_id)
+        )
+
+    def _evict(self, connection):
+        if self.max_records <= 0:
+            return
+        connection.execute(
+            "DELETE FROM records WHERE id IN "
+            "(SELECT id FROM records ORDER BY touched_at DESC, id DESC LIMIT -1 OFFSET ?)",
+            (self.max_records,),
+        )
+
+    @staticmethod
+    def _version_dict(row, files) -> dict:
+        return {
+            "doi": row["doi"],
+            "meta": json.loads(row["meta"]),
+            "published": bool(row["published"]),
+            "files": files,
+            "created_at": datetime.fromisoformat(row["created_at"]),
+        }
@@ -1,10 +1,87 @@
+import logging
+import math
+import os
+import time
+
 from flask import jsonify, render_template, request, url_for
+from flask_login import current_user
 
-from app.modules.dataset.models import DSMetaData
 from app.modules.fakenodo import fakenodo_bp
+from app.modules.fakenodo.faults import FaultInjector
 from app.modules.fakenodo.services import FakenodoService
+from core.caching.lru_cache import LRUCache
+from core.logging.sampling import SamplingFilter
+
+logger = logging.getLogger(__name__)
+logger.addFilter(SamplingFilter(float(os.getenv("FAKENODO_LOG_SAMPLE_RATE", "0.01"))))
 
 service = FakenodoService()
+faults = FaultInjector.from_env()
+
+# HTML de /records/<id>, por (registro, revisión, usuario, URL); el TTL acota cambios en el dataset de CSVHub
+page_cache = LRUCache(
+    maxsize=int(os.getenv("FAKENODO_PAGE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("FAKENODO_PAGE_CACHE_TTL", "60")),
+)
+
+# Endpoints de la API que simulan a Zenodo (las páginas HTML y el admin no sufren fallos inyectados)
+FAULTY_ENDPOINTS = {
+    "fakenodo.create_record",
+    "fakenodo.get_record",
+    "fakenodo.publish_record",
+    "fakenodo.upload_files",
+    "fakenodo.list_records",
+}
+
+
+@fakenodo_bp.before_request
+def inject_faults():
+    if request.endpoint not in FAULTY_ENDPOINTS:
+        return None
+
+    retry_after = faults.acquire()
+    if retry_after:
+        response = jsonify({"status": 429, "message": "Too Many Requests"})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(math.ceil(retry_after))
+        return response
+
+    delay = faults.sample_latency()
+    if delay:
+        time.sleep(delay)
+
+    if faults.should_fail():
+        return jsonify({"status": faults.error_status, "message": "Injected Fakenodo failure"}), faults.error_status
+
+    if request.endpoint == "fakenodo.upload_files":
+        # El cuerpo todavía no se ha leído: se sustituye por uno con ancho de banda limitado
+        request.environ["wsgi.input"] = faults.throttle(request.environ["wsgi.input"])
+    return None
+
+
+def _check_admin_token():
+    token = os.getenv("FAKENODO_ADMIN_TOKEN")
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return jsonify({"error": "Invalid admin token"}), 401
+    elif os.getenv("FLASK_ENV") == "production":
+        return jsonify({"error": "Set FAKENODO_ADMIN_TOKEN to change faults in production"}), 403
+    return None
+
+
+@fakenodo_bp.route("/api/admin/faults", methods=["GET", "PUT"])
+def admin_faults():
+    error = _check_admin_token()
+    if error:
+        return error
+
+    if request.method == "PUT":
+        try:
+            faults.update(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    return jsonify(faults.to_dict()), 200
 
 
 @fakenodo_bp.route("/", methods=["GET"])
@@ -43,8 +120,6 @@ def publish_record(record_id):
 @fakenodo_bp.route("/api/records/<record_id>/files", methods=["POST"])
 def upload_files(record_id):
     try:
-        record = service.repository.get_or_404(int(record_id))
-
         files = []
 
         # Determinar qué archivos se están subiendo
@@ -56,16 +131,8 @@ def upload_files(record_id):
             data = request.get_json() or {}
             files = data.get("files", [])
 
-        # Guardar los archivos en la última versión del registro
-        if record.versions:
-            latest_version = record.versions[-1]
-            if "files" not in latest_version:
-                latest_version["files"] = []
-
-            # Agregar nuevos archivos (evitar duplicados)
-            for file in files:
-                if file not in latest_version["files"]:
-                    latest_version["files"].append(file)
+        # Guardar los archivos en la última versión del registro (sin duplicados)
+        service.add_files(record_id, files)
 
         return (
             jsonify(
@@ -86,73 +153,50 @@ def upload_files(record_id):
 
 @fakenodo_bp.route("/api/records", methods=["GET"])
 def list_records():
+    doi = request.args.get("doi")
+    if doi:
+        try:
+            return jsonify({"records": [service.get_record_by_doi(doi)]}), 200
+        except KeyError:
+            return jsonify({"records": []}), 200
     return jsonify({"records": service.list_all()}), 200
 
 
 @fakenodo_bp.route("/records/<record_id>", methods=["GET"])
 def view_record_page(record_id):
     try:
-        record = service.get_record(record_id)
+        # La revisión cambia con cada versión o archivo nuevo del registro
+        revision = service.get_revision(record_id)
+        cache_key = (int(record_id), revision, current_user.get_id(), request.url)
+        html = page_cache.get(cache_key)
+        if html is not None:
+            return html
 
-        print(f"=== DEBUG Fakenodo Record {record_id} ===")
-        print(f"Record DOI: {record.get('doi')}")
-        print(f"Record metadata: {record.get('metadata', {})}")
+        record = service.get_record(record_id)
 
-        # INICIALIZAR
+        # Búsqueda indexada del dataset de CSVHub por el DOI del registro
         dataset = None
-        deposition_id = None
-
-        # SOLO ESTRATEGIA: Buscar por DOI del registro
+        files = []
         if record.get("doi"):
-            doi = record["doi"]
-            print(f"Searching for dataset with DOI: {doi}")
-
-            # Buscar en DSMetaData por dataset_doi
-            ds_meta_data = DSMetaData.query.filter_by(dataset_doi=doi).first()
-
-            if ds_meta_data:
-                print(f"Found dataset by DOI: {doi}")
-                print(f"Dataset ID: {ds_meta_data.data_set.id}")
-                print(f"Dataset title: {ds_meta_data.title}")
-                dataset = ds_meta_data.data_set
-            else:
-                print(f"No dataset found with DOI: {doi}")
-
-                # DEBUG: Mostrar todos los DOIs en el sistema
-                all_ds_meta = DSMetaData.query.all()
-                print("All DOIs in CSVHub:")
-                for ds in all_ds_meta:
-                    if ds.dataset_doi:
-                        print(f"  - {ds.dataset_doi} (Dataset ID: {ds.data_set.id})")
+            dataset, hubfiles = service.get_hub_dataset(record["doi"])
+            if dataset is None:
+                logger.info("Fakenodo record %s: no dataset found with DOI %s", record_id, record["doi"])
+            for file in hubfiles:
+                files.append(
+                    {
+                        "name": file.name,
+                        "size": file.get_formatted_size(),
+                        "url": url_for("hubfile.download_file", file_id=file.id, _external=True),
+                        "source": "csvhub",
+                    }
+                )
         else:
-            print("Record has no DOI, cannot search for dataset")
-
-        # Obtener archivos del dataset (SOLO si se encontró por DOI)
-        files = []
-        if dataset:
-            print(f"Processing files for dataset ID: {dataset.id}")
-            for csv_model in dataset.csv_models:
-                for file in csv_model.files:
-                    files.append(
-                        {
-                            "name": file.name,
-                            "size": file.get_formatted_size(),
-                            "url": url_for("hubfile.download_file", file_id=file.id, _external=True),
-                            "source": "csvhub",
-                        }
-                    )
-            print(f"Found {len(files)} files in dataset")
+            logger.info("Fakenodo record %s has no DOI, cannot search for dataset", record_id)
 
         # Archivos de Fakenodo (si los hay)
-        fakenodo_files = []
-        if record.get("files"):
-            for filename in record["files"]:
-                fakenodo_files.append({"name": filename, "size": "Unknown", "source": "fakenodo"})
+        fakenodo_files = [{"name": filename, "size": "Unknown", "source": "fakenodo"} for filename in record["files"]]
 
-        # NO generar placeholders - si no hay archivos, mostrar vacío
-        # (eliminamos la generación automática)
-
-        return render_template(
+        html = render_template(
             "record_view.html",
             record=record,
             record_url=request.url,
@@ -160,14 +204,15 @@ def view_record_page(record_id):
             fakenodo_files=fakenodo_files,
             dataset=dataset,
             found_dataset=dataset is not None,
-            deposition_id=deposition_id,
-            search_method="doi-only",  # Cambiado para reflejar la nueva estrategia
+            deposition_id=None,
+            search_method="doi-only",
         )
+        page_cache.set(cache_key, html)
+        return html
 
     except Exception as e:
-        import traceback
-
-        traceback.print_exc()
+        if not isinstance(e, KeyError):
+            logger.exception("Error rendering Fakenodo record %s", record_id)
         return render_template(
             "record_view.html",
             record={"error": str(e), "id": record_id},
@@ -1,7 +1,9 @@
 import logging
 import os
 
+from app.modules.dataset.repositories import DataSetRepository
 from app.modules.fakenodo.repositories import FakenodoRepository
+from app.modules.hubfile.repositories import HubfileRepository
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
@@ -10,6 +12,8 @@ logger = logging.getLogger(__name__)
 class FakenodoService(BaseService):
     def __init__(self):
         super().__init__(FakenodoRepository())
+        self.dataset_repository = DataSetRepository()
+        self.hubfile_repository = HubfileRepository()
         self.FAKENODO_URL = os.getenv("FAKENODO_URL", "http://localhost:5000/fakenodo/api/records")
 
     def create_record(self, metadata: dict) -> dict:
@@ -17,39 +21,50 @@ class FakenodoService(BaseService):
         return self.get_record(record.id)
 
     def publish_record(self, record_id: int, files: list[str]) -> dict:
-        record = self.repository.get_or_404(record_id)
-
         if not isinstance(files, list):
             files = []
 
-        new_version = record.add_version(meta=record.meta, files=files, published=True)
-        return new_version
+        return self.repository.add_version(record_id, files=files, published=True)
+
+    def add_files(self, record_id: int, files: list[str]) -> None:
+        self.repository.add_files(record_id, files)
 
     def list_versions(self, record_id: int) -> list[dict]:
         record = self.repository.get_or_404(record_id)
         return record.versions
 
     def get_record(self, record_id: int) -> dict:
-        record = self.repository.get_or_404(record_id)
-        latest = record.versions[-1]
+        return self._to_response(self.repository.get_or_404(record_id))
 
-        # Recoger archivos de TODAS las versiones
-        all_files = []
-        for version in record.versions:
-            version_files = version.get("files", [])
-            if isinstance(version_files, list):
-                all_files.extend(version_files)
+    def get_revision(self, record_id: int) -> int:
+        return self.repository.get_revision(record_id)
 
-        # Eliminar duplicados
-        unique_files = list(set([f for f in all_files if f]))
+    def get_hub_dataset(self, doi: str):
+        """
+        The CSVHub dataset published with ``doi`` and its files, or ``(None, [])``.
+
+        One indexed lookup for the dataset and one query for all its files, whatever the number of models.
+        """
+        dataset = self.dataset_repository.get_by_doi(doi)
+        if dataset is None:
+            return None, []
+        return dataset, self.hubfile_repository.get_by_dataset(dataset.id)
+
+    def get_record_by_doi(self, doi: str) -> dict:
+        return self._to_response(self.repository.get_by_doi(doi))
+
+    def _to_response(self, record) -> dict:
+        latest = record.versions[-1]
 
         return {
             "id": record.id,
             "doi": latest["doi"],
             "published": latest["published"],
             "metadata": latest["meta"],
-            "files": unique_files,  # ← ESTO ES IMPORTANTE
+            # Archivos de TODAS las versiones, sin duplicados (el store mantiene la unión)
+            "files": self.repository.get_files(record.id),
             "versions": record.versions,
+            "revision": record.revision,
         }
 
     def list_all(self):
@@ -14,8 +14,38 @@ class DatasetBehavior(TaskSet):
         get_csrf_token(response)
 
 
+class FakenodoApiBehavior(TaskSet):
+    """Publication flow against the Fakenodo API; combine with FAKENODO_LATENCY_MS, FAKENODO_ERROR_RATE, ..."""
+
+    @task
+    def publish(self):
+        response = self.client.post("/fakenodo/api/records", json={"meta": {"title": "Locust"}})
+        if response.status_code != 201:
+            return
+        record_id = response.json()["id"]
+
+        self.client.post(
+            f"/fakenodo/api/records/{record_id}/files",
+            files={"file": ("locust.csv", b"id,name\n" * 1024)},
+            data={"name": "locust.csv"},
+            name="/fakenodo/api/records/[id]/files",
+        )
+        self.client.post(
+            f"/fakenodo/api/records/{record_id}/actions/publish",
+            json={"files": []},
+            name="/fakenodo/api/records/[id]/actions/publish",
+        )
+
+
 class DatasetUser(HttpUser):
     tasks = [DatasetBehavior]
     min_wait = 5000
     max_wait = 9000
     host = get_host_for_locust_testing()
+
+
+class FakenodoApiUser(HttpUser):
+    tasks = [FakenodoApiBehavior]
+    min_wait = 1000
+    max_wait = 3000
+    host = get_host_for_locust_testing()
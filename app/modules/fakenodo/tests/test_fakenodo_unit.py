@@ -9,6 +9,12 @@ from app.modules.fakenodo.repositories import FakenodoRepository
 from app.modules.fakenodo.services import FakenodoService
 
 
+def routes_service():
+    from app.modules.fakenodo import routes as fakenodo_routes
+
+    return fakenodo_routes.service
+
+
 @pytest.fixture(scope="module")
 def client():
     app = create_app()
@@ -46,6 +52,16 @@ def test_to_dict_structure():
     assert isinstance(result["versions"], list)
 
 
+def test_equal_depositions_share_hash():
+    first = Fakenodo(id=1, meta={"title": "Test"})
+    second = Fakenodo(id=1, meta={"title": "Test"})
+    assert first == second and hash(first) == hash(second)
+    assert len({first, second}) == 1
+
+    second.add_version(meta={"title": "v1"})
+    assert first != second
+
+
 # -----------------------------
 # Repository: FakenodoRepository
 # -----------------------------
@@ -80,6 +96,88 @@ def test_list_all_returns_dicts():
     assert "id" in result[0]
 
 
+def test_add_files_is_incremental_and_deduplicated():
+    repo = FakenodoRepository()
+    record = repo.create(meta={"title": "Test"})
+    repo.add_files(record.id, ["a.csv", "b.csv"])
+    repo.add_files(record.id, ["b.csv", "c.csv"])
+    assert repo.get_or_404(record.id).versions[-1]["files"] == ["a.csv", "b.csv", "c.csv"]
+    assert repo.get_files(record.id) == ["a.csv", "b.csv", "c.csv"]
+
+
+def test_add_files_unknown_record():
+    repo = FakenodoRepository()
+    with pytest.raises(KeyError):
+        repo.add_files(999, ["a.csv"])
+
+
+def test_get_by_doi():
+    repo = FakenodoRepository()
+    record = repo.create(meta={"title": "Test"})
+    version = repo.add_version(record.id, files=["a.csv"], published=True)
+    assert repo.get_by_doi(version["doi"]).id == record.id
+    with pytest.raises(KeyError):
+        repo.get_by_doi("10.9999/fakenodo.missing")
+
+
+def test_store_is_shared_between_repositories(tmp_path):
+    path = str(tmp_path / "fakenodo.sqlite3")
+    writer = FakenodoRepository(path=path)
+    reader = FakenodoRepository(path=path)
+
+    record = writer.create(meta={"title": "Shared"})
+    writer.add_files(record.id, ["a.csv"])
+
+    assert reader.get_or_404(record.id).meta == {"title": "Shared"}
+    assert reader.get_files(record.id) == ["a.csv"]
+
+
+def test_store_is_thread_safe(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    repo = FakenodoRepository(path=str(tmp_path / "fakenodo.sqlite3"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda i: repo.create(meta={"title": f"T{i}"}).id, range(40)))
+
+    assert len(set(ids)) == 40
+    assert len(repo.list_all()) == 40
+
+
+def test_eviction_keeps_most_recent_records():
+    repo = FakenodoRepository(max_records=2)
+    first = repo.create(meta={"title": "1"})
+    second = repo.create(meta={"title": "2"})
+    repo.add_files(first.id, ["a.csv"])  # first pasa a ser el más reciente
+    repo.create(meta={"title": "3"})
+
+    with pytest.raises(KeyError):
+        repo.get_or_404(second.id)
+    assert repo.get_or_404(first.id).id == first.id
+    assert len(repo.list_all()) == 2
+
+
+def test_insert_version_only_retries_doi_collisions():
+    import sqlite3
+
+    from app.modules.fakenodo.repositories import DOI_ATTEMPTS
+
+    repo = FakenodoRepository()
+    record = repo.create(meta={"title": "Test"})
+    dois = iter(["10.9999/fakenodo.a", "10.9999/fakenodo.a", "10.9999/fakenodo.b"])
+    with patch("app.modules.fakenodo.repositories.generate_doi", side_effect=lambda: next(dois)):
+        assert repo.add_version(record.id, published=True)["doi"] == "10.9999/fakenodo.a"
+        assert repo.add_version(record.id, published=True)["doi"] == "10.9999/fakenodo.b"
+
+    with patch("app.modules.fakenodo.repositories.generate_doi", return_value="10.9999/fakenodo.a") as mock_doi:
+        with pytest.raises(sqlite3.IntegrityError):
+            repo.add_version(record.id, published=True)
+    assert mock_doi.call_count == DOI_ATTEMPTS
+
+    # Registro inexistente (clave foránea): se propaga sin reintentar
+    with repo._transaction() as connection, pytest.raises(sqlite3.IntegrityError):
+        repo._insert_version(connection, 999, {}, [], published=False)
+
+
 # -----------------------------
 # Service: FakenodoService
 # -----------------------------
@@ -202,6 +300,16 @@ def test_list_records_route(client):
     assert "records" in data
 
 
+def test_list_records_route_by_doi(client):
+    create_resp = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}})
+    record_id = create_resp.get_json()["id"]
+    doi = client.post(f"/fakenodo/api/records/{record_id}/actions/publish", json={"files": []}).get_json()["doi"]
+
+    records = client.get("/fakenodo/api/records", query_string={"doi": doi}).get_json()["records"]
+    assert [r["id"] for r in records] == [record_id]
+    assert client.get("/fakenodo/api/records", query_string={"doi": "nope"}).get_json()["records"] == []
+
+
 def test_view_record_page(client):
     create_resp = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}})
     record_id = create_resp.get_json()["id"]
@@ -238,45 +346,65 @@ def test_upload_files_form_file(client):
 
 
 def test_view_record_page_with_dataset(client):
-    with patch("app.modules.fakenodo.routes.DSMetaData") as MockDSMetaData:
-        mock_file = MagicMock()
-        mock_file.name = "data.csv"
-        mock_file.get_formatted_size.return_value = "1 KB"
-        mock_file.id = 123
-
-        mock_csv_model = MagicMock()
-        mock_csv_model.files = [mock_file]
+    mock_file = MagicMock()
+    mock_file.name = "data.csv"
+    mock_file.get_formatted_size.return_value = "1 KB"
+    mock_file.id = 123
 
-        mock_dataset = MagicMock()
-        mock_dataset.id = 1
-        mock_dataset.csv_models = [mock_csv_model]
-
-        mock_ds_meta = MagicMock()
-        mock_ds_meta.dataset_doi = "10.9999/fakenodo.mockdoi"
-        mock_ds_meta.data_set = mock_dataset
-        mock_ds_meta.title = "Mock Dataset"
-
-        MockDSMetaData.query.filter_by.return_value.first.return_value = mock_ds_meta
+    mock_dataset = MagicMock()
+    mock_dataset.id = 1
+    mock_dataset.ds_meta_data.dataset_doi = "10.9999/fakenodo.mockdoi"
+    mock_dataset.ds_meta_data.title = "Mock Dataset"
 
+    with patch(
+        "app.modules.fakenodo.routes.service.get_hub_dataset", return_value=(mock_dataset, [mock_file])
+    ) as get_hub_dataset:
         create_resp = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}})
         record_id = create_resp.get_json()["id"]
-        client.post(
+        version = client.post(
             f"/fakenodo/api/records/{record_id}/actions/publish",
             json={"files": ["data.csv"]},
-        )
+        ).get_json()
 
         response = client.get(f"/fakenodo/records/{record_id}")
         assert response.status_code == 200
         assert b"data.csv" in response.data
+        get_hub_dataset.assert_called_once_with(version["doi"])
+
+
+def test_view_record_page_is_cached_per_revision(client):
+    record_id = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}}).get_json()["id"]
+
+    with patch("app.modules.fakenodo.routes.service.get_record", wraps=routes_service().get_record) as get_record:
+        first = client.get(f"/fakenodo/records/{record_id}")
+        second = client.get(f"/fakenodo/records/{record_id}")
+        assert first.data == second.data
+        assert get_record.call_count == 1
+
+        # Un archivo nuevo cambia la revisión e invalida la página
+        client.post(f"/fakenodo/api/records/{record_id}/files", json={"files": ["new.csv"]})
+        third = client.get(f"/fakenodo/records/{record_id}")
+        assert get_record.call_count == 2
+        assert b"new.csv" in third.data
+
+
+def test_get_hub_dataset_without_dataset():
+    service = FakenodoService()
+    service.dataset_repository = MagicMock()
+    service.dataset_repository.get_by_doi.return_value = None
+    service.hubfile_repository = MagicMock()
+
+    assert service.get_hub_dataset("10.9999/fakenodo.none") == (None, [])
+    service.hubfile_repository.get_by_dataset.assert_not_called()
 
 
 def test_upload_files_raises_exception(client):
     create_resp = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}})
     record_id = create_resp.get_json()["id"]
 
-    # Parchear el método get_or_404 de la instancia service usada en routes.py
+    # Parchear el método add_files de la instancia service usada en routes.py
     with patch(
-        "app.modules.fakenodo.routes.service.repository.get_or_404",
+        "app.modules.fakenodo.routes.service.add_files",
         side_effect=Exception("Simulated failure"),
     ):
         response = client.post(f"/fakenodo/api/records/{record_id}/files", json={"files": ["broken.txt"]})
@@ -289,3 +417,127 @@ def test_view_record_page_exception(client):
         response = client.get("/fakenodo/records/999")
         assert response.status_code == 200
         assert b"Boom" in response.data or b"error" in response.data
+
+
+# -----------------------------
+# Fault injection
+# -----------------------------
+
+
+def test_fault_injector_defaults_are_off():
+    from app.modules.fakenodo.faults import FaultInjector
+
+    faults = FaultInjector()
+    assert faults.sample_latency() == 0
+    assert faults.should_fail() is False
+    assert faults.acquire() == 0
+    stream = io.BytesIO(b"data")
+    assert faults.throttle(stream) is stream
+
+
+def test_fault_injector_from_env(monkeypatch):
+    from app.modules.fakenodo.faults import FaultInjector
+
+    monkeypatch.setenv("FAKENODO_LATENCY_MS", "250")
+    monkeypatch.setenv("FAKENODO_ERROR_RATE", "1")
+    faults = FaultInjector.from_env()
+    assert faults.sample_latency() == 0.25
+    assert faults.should_fail() is True
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "normal", "exponential", "lognormal"])
+def test_fault_injector_latency_distributions(distribution):
+    import random
+
+    from app.modules.fakenodo.faults import FaultInjector
+
+    faults = FaultInjector(
+        rng=random.Random(1), latency_ms=100, latency_jitter_ms=20, latency_distribution=distribution
+    )
+    samples = [faults.sample_latency() for _ in range(2000)]
+    assert all(s >= 0 for s in samples)
+    assert 0.08 < sum(samples) / len(samples) < 0.12
+
+
+def test_fault_injector_rejects_invalid_settings():
+    from app.modules.fakenodo.faults import FaultInjector
+
+    faults = FaultInjector()
+    for settings in ({"error_rate": 2}, {"latency_distribution": "pareto"}, {"bogus": 1}, {"latency_ms": "x"}):
+        with pytest.raises(ValueError):
+            faults.update(settings)
+
+
+def test_fault_injector_rate_limit():
+    from app.modules.fakenodo.faults import FaultInjector
+
+    faults = FaultInjector(rate_limit_per_second=1, rate_limit_burst=2)
+    assert faults.acquire() == 0
+    assert faults.acquire() == 0
+    assert 0 < faults.acquire() <= 1
+
+
+def test_throttled_stream_limits_bandwidth(monkeypatch):
+    from app.modules.fakenodo import faults as faults_module
+
+    clock = [0.0]
+    monkeypatch.setattr(faults_module.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(faults_module.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+
+    stream = faults_module.ThrottledStream(io.BytesIO(b"x" * 4096), bytes_per_second=1024)
+    assert stream.read() == b"x" * 4096
+    assert clock[0] == pytest.approx(4)
+
+
+def test_injected_error_and_rate_limit_routes(client, monkeypatch):
+    from app.modules.fakenodo import routes as fakenodo_routes
+    from app.modules.fakenodo.faults import FaultInjector
+
+    monkeypatch.setattr(fakenodo_routes, "faults", FaultInjector(error_rate=1, error_status=502))
+    assert client.get("/fakenodo/api/records").status_code == 502
+    # Las páginas que no son de la API no se ven afectadas
+    assert client.get("/fakenodo/").status_code == 200
+
+    monkeypatch.setattr(fakenodo_routes, "faults", FaultInjector(rate_limit_per_second=0.5, rate_limit_burst=1))
+    assert client.get("/fakenodo/api/records").status_code == 200
+    response = client.get("/fakenodo/api/records")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_admin_faults_route(client, monkeypatch):
+    from app.modules.fakenodo import routes as fakenodo_routes
+    from app.modules.fakenodo.faults import FaultInjector
+
+    monkeypatch.setattr(fakenodo_routes, "faults", FaultInjector())
+    monkeypatch.setenv("FAKENODO_ADMIN_TOKEN", "secret")
+
+    assert client.put("/fakenodo/api/admin/faults", json={"latency_ms": 5}).status_code == 401
+
+    headers = {"Authorization": "Bearer secret"}
+    response = client.put("/fakenodo/api/admin/faults", json={"latency_ms": 5, "error_rate": 0.5}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["latency_ms"] == 5
+    assert fakenodo_routes.faults.error_rate == 0.5
+
+    response = client.put("/fakenodo/api/admin/faults", json={"error_rate": 3}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_upload_files_route_with_bandwidth_limit(client, monkeypatch):
+    from app.modules.fakenodo import faults as faults_module
+    from app.modules.fakenodo import routes as fakenodo_routes
+
+    sleeps = []
+    monkeypatch.setattr(faults_module.time, "sleep", sleeps.append)
+    monkeypatch.setattr(fakenodo_routes, "faults", faults_module.FaultInjector(bandwidth_kbps=1))
+
+    record_id = client.post("/fakenodo/api/records", json={"meta": {"title": "Test"}}).get_json()["id"]
+    response = client.post(
+        f"/fakenodo/api/records/{record_id}/files",
+        data={"name": "slow.csv", "file": (io.BytesIO(b"x" * 4096), "slow.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 201
+    assert response.get_json()["files"] == ["slow.csv"]
+    assert sleeps
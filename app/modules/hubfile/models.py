@@ -1,10 +1,12 @@
 from datetime import datetime, timezone
 
 from flask import request
+from sqlalchemy import event, select, update
 
 from app import db
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
+from core.services.registry import get_service, request_memoize
 
 
 class Hubfile(db.Model):
@@ -18,22 +20,26 @@ class Hubfile(db.Model):
     def get_formatted_size(self):
         from app.modules.dataset.services import SizeService
 
-        return SizeService().get_human_readable_size(self.size)
+        return get_service(SizeService).get_human_readable_size(self.size)
 
     def get_owner_user(self) -> User:
         from app.modules.hubfile.services import HubfileService
 
-        return HubfileService().get_owner_user_by_hubfile(self)
+        return request_memoize(
+            "hubfile_owner", self.id, lambda: get_service(HubfileService).get_owner_user_by_hubfile(self)
+        )
 
     def get_dataset(self) -> DataSet:
         from app.modules.hubfile.services import HubfileService
 
-        return HubfileService().get_dataset_by_hubfile(self)
+        return request_memoize(
+            "hubfile_dataset", self.id, lambda: get_service(HubfileService).get_dataset_by_hubfile(self)
+        )
 
-    def get_path(self) -> DataSet:
+    def get_path(self) -> str:
         from app.modules.hubfile.services import HubfileService
 
-        return HubfileService().get_path_by_hubfile(self)
+        return request_memoize("hubfile_path", self.id, lambda: get_service(HubfileService).get_path_by_hubfile(self))
 
     def to_dict(self):
         return {
@@ -49,6 +55,33 @@ class Hubfile(db.Model):
         return f"File<{self.id}>"
 
 
+def _adjust_dataset_aggregates(connection, hubfile: Hubfile, sign: int):
+    # UPDATE en la misma transacción del flush; las inserciones en bloque (bulk_create) no disparan estos
+    # eventos y recalculan los agregados con DataSetRepository.refresh_file_aggregates
+    from app.modules.csvmodel.models import CSVModel
+
+    data_set = DataSet.__table__
+    dataset_id = select(CSVModel.data_set_id).where(CSVModel.id == hubfile.csv_model_id).scalar_subquery()
+    connection.execute(
+        update(data_set)
+        .where(data_set.c.id == dataset_id)
+        .values(
+            files_count=data_set.c.files_count + sign,
+            total_size_bytes=data_set.c.total_size_bytes + sign * (hubfile.size or 0),
+        )
+    )
+
+
+@event.listens_for(Hubfile, "after_insert")
+def _count_inserted_file(mapper, connection, target):
+    _adjust_dataset_aggregates(connection, target, 1)
+
+
+@event.listens_for(Hubfile, "after_delete")
+def _count_deleted_file(mapper, connection, target):
+    _adjust_dataset_aggregates(connection, target, -1)
+
+
 class HubfileViewRecord(db.Model):
     __tablename__ = "file_view_record"
     id = db.Column(db.Integer, primary_key=True)
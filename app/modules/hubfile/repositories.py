@@ -6,6 +6,7 @@ from app.modules.csvmodel.models import CSVModel
 from app.modules.dataset.models import DataSet
 from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
 from core.repositories.BaseRepository import BaseRepository
+from core.repositories.routing import read_only
 
 
 class HubfileRepository(BaseRepository):
@@ -20,11 +21,36 @@ class HubfileRepository(BaseRepository):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return db.session.query(DataSet).join(CSVModel).join(Hubfile).filter(Hubfile.id == hubfile.id).first()
 
+    def _with_owner(self):
+        return (
+            db.session.query(Hubfile, DataSet.user_id, DataSet.id)
+            .join(CSVModel, Hubfile.csv_model_id == CSVModel.id)
+            .join(DataSet, CSVModel.data_set_id == DataSet.id)
+        )
+
+    def get_download_target(self, file_id: int):
+        """``(hubfile, user_id, dataset_id)`` of a file in a single query (``None`` if it does not exist)."""
+        return self._with_owner().filter(Hubfile.id == file_id).first()
+
+    def get_all_download_targets(self) -> list:
+        """``(hubfile, user_id, dataset_id)`` of every file."""
+        return self._with_owner().order_by(DataSet.id, Hubfile.id).all()
+
+    def get_by_dataset(self, dataset_id: int) -> list[Hubfile]:
+        """All files of a dataset in a single query."""
+        return (
+            self.model.query.join(CSVModel)
+            .filter(CSVModel.data_set_id == dataset_id)
+            .order_by(CSVModel.id, self.model.id)
+            .all()
+        )
+
 
 class HubfileViewRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(HubfileViewRecord)
 
+    @read_only
     def total_hubfile_views(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -34,6 +60,11 @@ class HubfileDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(HubfileDownloadRecord)
 
+    def exists_for(self, file_id: int, user_id: int, download_cookie: str) -> bool:
+        query = self.model.query.filter_by(file_id=file_id, user_id=user_id, download_cookie=download_cookie)
+        return db.session.query(query.exists()).scalar()
+
+    @read_only
     def total_hubfile_downloads(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
@@ -1,46 +1,37 @@
 import os
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime
 
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import jsonify, make_response, request
 from flask_login import current_user
 
 from app import db
 from app.modules.hubfile import hubfile_bp
-from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
+from app.modules.hubfile.models import HubfileViewRecord
 from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from core.files.csv_preview import DEFAULT_PAGE_ROWS, DEFAULT_WINDOW_BYTES, csv_preview
+from core.files.file_serving import send_upload, uploads_root
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
 def download_file(file_id):
-    file = HubfileService().get_or_404(file_id)
-    filename = file.name
-
-    directory_path = f"uploads/user_{file.csv_model.data_set.user_id}/dataset_{file.csv_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path)
+    file, relative_path = HubfileService().get_download_target_or_404(file_id)
 
     # Get the cookie from the request or generate a new one if it does not exist
     user_cookie = request.cookies.get("file_download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    # Check if the download record already exists for this cookie
-    existing_record = HubfileDownloadRecord.query.filter_by(
-        user_id=current_user.id if current_user.is_authenticated else None, file_id=file_id, download_cookie=user_cookie
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        HubfileDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            file_id=file_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
+    # nginx (X-Accel-Redirect) o Werkzeug envían el fichero; Range y 304 según el checksum guardado
+    resp = send_upload(relative_path, download_name=file.name, etag=file.checksum)
+
+    if resp.status_code != 304:
+        # Record the download in the background; the job skips cookies that already downloaded the file
+        HubfileDownloadRecordService().enqueue_record(
+            file_id, current_user.id if current_user.is_authenticated else None, user_cookie
         )
 
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
     resp.set_cookie("file_download_cookie", user_cookie)
 
     return resp
@@ -48,17 +39,27 @@ def download_file(file_id):
 
 @hubfile_bp.route("/file/view/<int:file_id>", methods=["GET"])
 def view_file(file_id):
-    file = HubfileService().get_or_404(file_id)
-    filename = file.name
-
-    directory_path = f"uploads/user_{file.csv_model.data_set.user_id}/dataset_{file.csv_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path, filename)
+    """
+    Preview of a file as parsed CSV rows, one page at a time: ``?row=<n>&rows=<limit>`` or, to go on
+    from a previous page's ``next_offset``, ``?offset=<byte>&bytes=<max>``.
+    """
+    file, relative_path = HubfileService().get_download_target_or_404(file_id)
+    file_path = os.path.join(uploads_root(), relative_path)
 
     try:
         if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                content = f.read()
+            if "offset" in request.args:
+                page = csv_preview.read_window(
+                    file_path,
+                    offset=request.args.get("offset", 0, type=int),
+                    max_bytes=request.args.get("bytes", DEFAULT_WINDOW_BYTES, type=int),
+                )
+            else:
+                page = csv_preview.read_rows(
+                    file_path,
+                    start_row=request.args.get("row", 0, type=int),
+                    limit=request.args.get("rows", DEFAULT_PAGE_ROWS, type=int),
+                )
 
             user_cookie = request.cookies.get("view_cookie")
             if not user_cookie:
@@ -83,7 +84,7 @@ def view_file(file_id):
                 db.session.commit()
 
             # Prepare response
-            response = jsonify({"success": True, "content": content})
+            response = jsonify({"success": True, "name": file.name, **page})
             if not request.cookies.get("view_cookie"):
                 response = make_response(response)
                 response.set_cookie("view_cookie", user_cookie, max_age=60 * 60 * 24 * 365 * 2)
@@ -1,4 +1,7 @@
 import os
+from datetime import datetime, timezone
+
+from flask import abort, has_app_context
 
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
@@ -8,6 +11,7 @@ from app.modules.hubfile.repositories import (
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from core.jobs.job_queue import JobQueue
 from core.services.BaseService import BaseService
 
 
@@ -18,19 +22,32 @@ class HubfileService(BaseService):
         self.hubfile_download_record_repository = HubfileDownloadRecordRepository()
 
     def get_owner_user_by_hubfile(self, hubfile: Hubfile) -> User:
-        return self.repository.get_owner_user_by_hubfile(hubfile)
+        dataset = self.get_dataset_by_hubfile(hubfile)
+        if dataset is None:
+            return self.repository.get_owner_user_by_hubfile(hubfile)
+        return dataset.user
 
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
+        # Las relaciones many-to-one se resuelven desde el identity map de la sesión si ya están cargadas
+        if hubfile.csv_model is not None and hubfile.csv_model.data_set is not None:
+            return hubfile.csv_model.data_set
         return self.repository.get_dataset_by_hubfile(hubfile)
 
+    def get_download_target_or_404(self, file_id: int):
+        """``(hubfile, path relative to uploads/)`` of a file to download, without lazy-loading its dataset."""
+        target = self.repository.get_download_target(file_id)
+        if target is None:
+            abort(404)
+        hubfile, user_id, dataset_id = target
+        return hubfile, f"user_{user_id}/dataset_{dataset_id}/{hubfile.name}"
+
     def get_path_by_hubfile(self, hubfile: Hubfile) -> str:
 
-        hubfile_user = self.get_owner_user_by_hubfile(hubfile)
         hubfile_dataset = self.get_dataset_by_hubfile(hubfile)
         working_dir = os.getenv("WORKING_DIR")
 
         path = os.path.join(
-            working_dir, "uploads", f"user_{hubfile_user.id}", f"dataset_{hubfile_dataset.id}", hubfile.name
+            working_dir, "uploads", f"user_{hubfile_dataset.user_id}", f"dataset_{hubfile_dataset.id}", hubfile.name
         )
 
         return path
@@ -46,3 +63,33 @@ class HubfileService(BaseService):
 class HubfileDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(HubfileDownloadRecordRepository())
+
+    def record_download(self, file_id: int, user_id: int, download_cookie: str):
+        """Record a download unless this cookie (and user) already downloaded the file."""
+        if self.repository.exists_for(file_id, user_id, download_cookie):
+            return None
+        return self.create(
+            user_id=user_id,
+            file_id=file_id,
+            download_date=datetime.now(timezone.utc),
+            download_cookie=download_cookie,
+        )
+
+    def enqueue_record(self, file_id: int, user_id: int, download_cookie: str) -> str:
+        return download_record_queue.enqueue(record_download_job, file_id, user_id, download_cookie, retries=2)
+
+
+# --- Registro asíncrono de descargas ---
+
+download_record_queue = JobQueue("downloads")
+
+
+def record_download_job(file_id: int, user_id: int, download_cookie: str):
+    """Entry point of the background job that records a file download (importable by RQ workers)."""
+    if has_app_context():
+        return HubfileDownloadRecordService().record_download(file_id, user_id, download_cookie)
+
+    from app import app as flask_app_instance
+
+    with flask_app_instance.app_context():
+        return HubfileDownloadRecordService().record_download(file_id, user_id, download_cookie)
@@ -22,3 +22,174 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+def create_hubfile():
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.csvmodel.models import CSVModel, FMMetaData
+    from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+    from app.modules.hubfile.models import Hubfile
+
+    user = User.query.first()
+    meta = DSMetaData(title="t", description="d", publication_type=PublicationType.NONE, dataset_doi="10.1/hub")
+    dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+    fm_meta = FMMetaData(csv_filename="f.csv", title="t", description="d", publication_type=PublicationType.NONE)
+    csv_model = CSVModel(data_set=dataset, fm_meta_data=fm_meta)
+    hubfile = Hubfile(name="f.csv", checksum="c", size=10, csv_model=csv_model)
+    db.session.add_all([dataset, hubfile])
+    db.session.commit()
+    return user.id, dataset.id, hubfile.id
+
+
+def test_hubfile_lookups_are_memoized_per_request(test_client, monkeypatch):
+    from sqlalchemy import event
+
+    from app import db
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.hubfile.services import HubfileService
+    from core.services.registry import get_service
+
+    monkeypatch.setenv("WORKING_DIR", "/app")
+    user_id, dataset_id, hubfile_id = create_hubfile()
+    db.session.expunge_all()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with test_client.application.test_request_context():
+        hubfile = db.session.get(Hubfile, hubfile_id)
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            paths = {hubfile.get_path() for _ in range(3)}
+            owners = {hubfile.get_owner_user().id for _ in range(3)}
+            datasets = {hubfile.get_dataset().id for _ in range(3)}
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+        assert get_service(HubfileService) is get_service(HubfileService)
+
+    assert paths == {f"/app/uploads/user_{user_id}/dataset_{dataset_id}/f.csv"}
+    assert owners == {user_id} and datasets == {dataset_id}
+    # modelo CSV, dataset y usuario, una vez cada uno
+    assert len(statements) <= 3
+    assert get_service(HubfileService) is not get_service(HubfileService)
+
+
+def test_download_file_serving_modes_conditional_get_and_async_record(test_client, monkeypatch):
+    import os
+    import shutil
+
+    from werkzeug.exceptions import NotFound
+
+    from app.modules.hubfile.models import HubfileDownloadRecord
+    from core.files.file_serving import send_upload, uploads_root
+
+    app = test_client.application
+    with app.app_context():
+        user_id, dataset_id, hubfile_id = create_hubfile()
+        directory = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset_id}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "f.csv"), "w") as f:
+        f.write("a,b\n1,2\n")
+
+    try:
+        monkeypatch.setitem(app.config, "FILE_SERVING_MODE", "sendfile")
+        response = test_client.get(f"/file/download/{hubfile_id}")
+        assert response.status_code == 200 and response.data == b"a,b\n1,2\n"
+        assert response.headers["ETag"] == '"c"'
+        assert "attachment" in response.headers["Content-Disposition"]
+        cookie = test_client.get_cookie("file_download_cookie").value
+
+        response = test_client.get(f"/file/download/{hubfile_id}", headers={"Range": "bytes=0-2"})
+        assert response.status_code == 206 and response.data == b"a,b"
+
+        response = test_client.get(f"/file/download/{hubfile_id}", headers={"If-None-Match": '"c"'})
+        assert response.status_code == 304 and response.data == b""
+
+        monkeypatch.setitem(app.config, "FILE_SERVING_MODE", "x-accel")
+        response = test_client.get(f"/file/download/{hubfile_id}")
+        assert response.status_code == 200 and response.data == b""
+        assert response.headers["X-Accel-Redirect"] == f"/protected-uploads/user_{user_id}/dataset_{dataset_id}/f.csv"
+        assert response.headers["ETag"] == '"c"' and response.headers["Accept-Ranges"] == "bytes"
+        assert response.mimetype == "text/csv"
+
+        with app.app_context():
+            # Una sola descarga registrada por cookie, aunque se pidiera varias veces
+            records = HubfileDownloadRecord.query.filter_by(file_id=hubfile_id).all()
+            assert [record.download_cookie for record in records] == [cookie]
+
+        assert test_client.get("/file/download/999999").status_code == 404
+
+        # Fichero borrado del disco o ruta fuera de uploads/: 404 en ambos modos y ninguna descarga nueva
+        os.remove(os.path.join(directory, "f.csv"))
+        for mode in ("sendfile", "x-accel"):
+            monkeypatch.setitem(app.config, "FILE_SERVING_MODE", mode)
+            test_client.delete_cookie("file_download_cookie")
+            assert test_client.get(f"/file/download/{hubfile_id}").status_code == 404
+            with app.test_request_context(), pytest.raises(NotFound):
+                send_upload("../app/__init__.py", download_name="x.py")
+        with app.app_context():
+            assert HubfileDownloadRecord.query.filter_by(file_id=hubfile_id).count() == 1
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_csv_preview_pages_by_row_and_byte_window(tmp_path):
+    from core.files.csv_preview import CSVPreview
+
+    path = tmp_path / "big.csv"
+    lines = ["id,text"] + [f'{i},"line {i}\nwith ""quotes"""' if i % 7 == 0 else f"{i},plain {i}" for i in range(1, 50)]
+    path.write_text("\n".join(lines) + "\n")
+    expected = [["id", "text"]] + [
+        [str(i), f'line {i}\nwith "quotes"' if i % 7 == 0 else f"plain {i}"] for i in range(1, 50)
+    ]
+
+    preview = CSVPreview(stride=10)
+    first = preview.read_rows(str(path), start_row=0, limit=15)
+    assert first["rows"] == expected[:15] and first["next_row"] == 15 and not first["eof"]
+    index = preview.index_for(str(path))
+    assert index.indexed_rows == 10
+
+    # La página siguiente por offset de bytes continúa exactamente donde acabó la anterior
+    window = preview.read_window(str(path), offset=first["next_offset"], max_bytes=40)
+    assert window["rows"] == expected[15 : 15 + len(window["rows"])] and 1 <= len(window["rows"]) < 5
+
+    # Una página lejana parte del checkpoint más cercano del índice y lo amplía
+    last = preview.read_rows(str(path), start_row=45, limit=100)
+    assert last["rows"] == expected[45:] and last["eof"] and last["next_row"] is None
+    assert index.indexed_rows == 50
+    middle = preview.read_rows(str(path), start_row=21, limit=3)
+    assert middle["rows"] == expected[21:24]
+    with open(path, "rb") as f:
+        f.seek(middle["offset"])
+        assert f.readline().startswith(b"21,")
+
+    tail = preview.read_window(str(path), offset=last["offset"], max_bytes=1024 * 1024)
+    assert tail["rows"] == expected[45:] and tail["eof"]
+
+
+def test_view_file_returns_a_page_of_rows(test_client):
+    import os
+    import shutil
+
+    from core.files.file_serving import uploads_root
+
+    app = test_client.application
+    with app.app_context():
+        user_id, dataset_id, hubfile_id = create_hubfile()
+        directory = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset_id}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "f.csv"), "w") as f:
+        f.write("a,b\n" + "".join(f"{i},{i * 2}\n" for i in range(10)))
+
+    try:
+        data = test_client.get(f"/file/view/{hubfile_id}?row=2&rows=3").get_json()
+        assert data["success"] and data["rows"] == [["1", "2"], ["2", "4"], ["3", "6"]]
+        assert data["next_row"] == 5 and not data["eof"]
+
+        data = test_client.get(f"/file/view/{hubfile_id}?offset={data['next_offset']}&bytes=1000").get_json()
+        assert data["rows"][0] == ["4", "8"] and data["rows"][-1] == ["9", "18"] and data["eof"]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
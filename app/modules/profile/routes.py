@@ -1,5 +1,6 @@
 import base64
 import io
+import logging
 
 # Para 2FA
 import pyotp
@@ -14,6 +15,9 @@ from app.modules.dataset.models import DataSet
 from app.modules.profile import profile_bp
 from app.modules.profile.forms import UserProfileForm
 from app.modules.profile.services import UserProfileService
+from core.caching.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
 
 
 @profile_bp.route("/profile/edit", methods=["GET", "POST"])
@@ -28,6 +32,8 @@ def edit_profile():
     if request.method == "POST":
         service = UserProfileService()
         result, errors = service.update_profile(profile.id, form)
+        if result:
+            response_cache.invalidate(f"user:{current_user.id}")
         return service.handle_service_response(
             result, errors, "profile.edit_profile", "Profile updated successfully", "profile/edit.html", form
         )
@@ -50,7 +56,7 @@ def my_profile():
 
     total_datasets_count = db.session.query(DataSet).filter(DataSet.user_id == current_user.id).count()
 
-    print(user_datasets_pagination.items)
+    logger.debug("Datasets of user %s: %s", current_user.id, user_datasets_pagination.items)
 
     return render_template(
         "profile/summary.html",
@@ -126,6 +132,7 @@ def disable_2fa():
 
 
 @profile_bp.route("/profile/<int:user_id>")
+@response_cache.cached(tags=lambda user_id: ["datasets", f"user:{user_id}"])
 def public_profile(user_id):
     page = request.args.get("page", 1, type=int)
     per_page = 5
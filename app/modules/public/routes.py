@@ -5,11 +5,13 @@ from flask import render_template
 from app.modules.csvmodel.services import CSVModelService
 from app.modules.dataset.services import DataSetService
 from app.modules.public import public_bp
+from core.caching.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
 
 @public_bp.route("/")
+@response_cache.cached(tags=["datasets", "counters"])
 def index():
     logger.info("Access index")
     dataset_service = DataSetService()
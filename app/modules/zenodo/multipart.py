@@ -0,0 +1,82 @@
+import io
+import os
+import uuid
+
+
+class MultipartFileStream:
+    """
+    File-like ``multipart/form-data`` body that streams a file from disk.
+
+    The preamble (form fields and the file part header) and the epilogue are small in-memory buffers;
+    the file itself is read lazily in chunks while ``requests`` sends the body, so memory use does not
+    depend on the file size. ``__len__`` lets ``requests`` send a ``Content-Length`` instead of using
+    chunked encoding, and ``tell``/``seek`` let urllib3 rewind the body when it retries a request.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, fields: dict, file_field: str, filename: str, file_obj, file_size: int):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        preamble = b""
+        for name, value in fields.items():
+            preamble += (
+                f"--{self.boundary}\r\n" f'Content-Disposition: form-data; name="{name}"\r\n\r\n' f"{value}\r\n"
+            ).encode()
+        preamble += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+
+        # (stream, offset of the segment inside the stream, segment length)
+        self._segments = [
+            (io.BytesIO(preamble), 0, len(preamble)),
+            (file_obj, file_obj.tell(), file_size),
+            (io.BytesIO(epilogue), 0, len(epilogue)),
+        ]
+        self._length = len(preamble) + file_size + len(epilogue)
+        self._position = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._length
+        self._position = max(0, min(offset, self._length))
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length - self._position
+
+        chunks = []
+        segment_start = 0
+        for stream, stream_offset, segment_length in self._segments:
+            segment_end = segment_start + segment_length
+            if size > 0 and segment_start <= self._position < segment_end:
+                stream.seek(stream_offset + self._position - segment_start)
+                chunk = stream.read(min(size, segment_end - self._position))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                self._position += len(chunk)
+                size -= len(chunk)
+            segment_start = segment_end
+
+        return b"".join(chunks)
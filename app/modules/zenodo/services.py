@@ -1,21 +1,80 @@
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 import requests
 from dotenv import load_dotenv
 from flask import Response, jsonify
 from flask_login import current_user
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.modules.csvmodel.models import CSVModel
 from app.modules.dataset.models import DataSet
+from app.modules.zenodo.multipart import MultipartFileStream
 from app.modules.zenodo.repositories import ZenodoRepository
+from core.caching.lru_cache import LRUCache
 from core.configuration.configuration import uploads_folder_name
+from core.metrics.metrics import EXTERNAL_API_LATENCY
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Depositions cuyo bucket se recuerda a la vez (creadas o leídas y aún sin subir/publicar)
+BUCKET_URLS_MAXSIZE = 256
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_upload_workers() -> int:
+    return max(1, int(os.getenv("ZENODO_UPLOAD_WORKERS", "4")))
+
+
+def observe_api_call(response: requests.Response, *args, **kwargs):
+    # elapsed mide hasta recibir las cabeceras de la última respuesta (tras los reintentos)
+    service = "fakenodo" if "fakenodo" in response.url else "zenodo"
+    EXTERNAL_API_LATENCY.labels(service=service, method=response.request.method, status=response.status_code).observe(
+        response.elapsed.total_seconds()
+    )
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session used to talk to Zenodo/Fakenodo.
+
+    The session keeps connections alive between calls and retries transient failures
+    (connection errors and 429/5xx answers on idempotent methods) with exponential backoff.
+    """
+    global _http_session
+
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                retry = Retry(
+                    total=int(os.getenv("ZENODO_MAX_RETRIES", "3")),
+                    backoff_factor=float(os.getenv("ZENODO_RETRY_BACKOFF", "0.5")),
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                # The pool must be able to hold one connection per concurrent upload
+                pool_size = max(10, get_upload_workers())
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.hooks["response"].append(observe_api_call)
+                _http_session = session
+
+    return _http_session
+
 
 class ZenodoService(BaseService):
     def get_zenodo_url(self):
@@ -44,6 +103,14 @@ class ZenodoService(BaseService):
         self.is_fakenodo = "FAKENODO_URL" in os.environ
         self.headers = {"Content-Type": "application/json"}
         self.params = {} if self.is_fakenodo else {"access_token": self.get_zenodo_access_token()}
+        self.session = get_http_session()
+        self.timeout = (
+            float(os.getenv("ZENODO_CONNECT_TIMEOUT", "5")),
+            float(os.getenv("ZENODO_READ_TIMEOUT", "60")),
+        )
+        # deposition id -> bucket URL, used to PUT files straight into the deposition bucket. Se olvida
+        # al terminar de subir o publicar; el LRU acota las depositions que nunca llegan a ese punto
+        self._bucket_urls = LRUCache(maxsize=BUCKET_URLS_MAXSIZE)
 
     def test_connection(self) -> bool:
         """
@@ -52,7 +119,7 @@ class ZenodoService(BaseService):
         Returns:
             bool: True if the connection is successful, False otherwise.
         """
-        response = requests.get(self.ZENODO_API_URL, params=self.params, headers=self.headers)
+        response = self.session.get(self.ZENODO_API_URL, params=self.params, headers=self.headers, timeout=self.timeout)
         return response.status_code == 200
 
     def test_full_connection(self) -> Response:
@@ -84,7 +151,9 @@ class ZenodoService(BaseService):
             }
         }
 
-        response = requests.post(self.ZENODO_API_URL, json=data, params=self.params, headers=self.headers)
+        response = self.session.post(
+            self.ZENODO_API_URL, json=data, params=self.params, headers=self.headers, timeout=self.timeout
+        )
 
         if response.status_code != 201:
             return jsonify(
@@ -95,30 +164,27 @@ class ZenodoService(BaseService):
             )
 
         deposition_id = response.json()["id"]
+        self._remember_bucket(response.json())
 
-        # Step 2: Upload an empty file to the deposition
-        data = {"name": "test_file.txt"}
-        files = {"file": open(file_path, "rb")}
-        publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
-        response = requests.post(publish_url, params=self.params, data=data, files=files)
-        files["file"].close()  # Close the file after uploading
-
-        logger.info(f"Publish URL: {publish_url}")
-        logger.info(f"Params: {self.params}")
-        logger.info(f"Data: {data}")
-        logger.info(f"Files: {files}")
-        logger.info(f"Response Status Code: {response.status_code}")
-        logger.info(f"Response Content: {response.content}")
+        try:
+            # Step 2: Upload the test file to the deposition, streamed from disk
+            response = self._send_file(deposition_id, "test_file.txt", file_path)
 
-        if response.status_code != 201:
-            messages.append(f"Failed to upload test file to Zenodo. Response code: {response.status_code}")
-            success = False
+            logger.info("Response Status Code: %s", response.status_code)
+            logger.debug("Response Content: %s", response.content)
 
-        # Step 3: Delete the deposition
-        response = requests.delete(f"{self.ZENODO_API_URL}/{deposition_id}", params=self.params)
+            if response.status_code not in (200, 201):
+                messages.append(f"Failed to upload test file to Zenodo. Response code: {response.status_code}")
+                success = False
 
-        if os.path.exists(file_path):
-            os.remove(file_path)
+            # Step 3: Delete the deposition
+            response = self.session.delete(
+                f"{self.ZENODO_API_URL}/{deposition_id}", params=self.params, timeout=self.timeout
+            )
+        finally:
+            self._bucket_urls.delete(deposition_id)
+            if os.path.exists(file_path):
+                os.remove(file_path)
 
         return jsonify({"success": success, "messages": messages})
 
@@ -129,7 +195,7 @@ class ZenodoService(BaseService):
         Returns:
             dict: The response in JSON format with the depositions.
         """
-        response = requests.get(self.ZENODO_API_URL, params=self.params, headers=self.headers)
+        response = self.session.get(self.ZENODO_API_URL, params=self.params, headers=self.headers, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception("Failed to get depositions")
         return response.json()
@@ -148,37 +214,76 @@ class ZenodoService(BaseService):
         }
 
         if self.is_fakenodo:
-            response = requests.post(self.ZENODO_API_URL, json={"meta": metadata})
+            response = self.session.post(self.ZENODO_API_URL, json={"meta": metadata}, timeout=self.timeout)
         else:
-            response = requests.post(self.ZENODO_API_URL, json={"metadata": metadata}, params=self.params)
+            response = self.session.post(
+                self.ZENODO_API_URL, json={"metadata": metadata}, params=self.params, timeout=self.timeout
+            )
 
         if response.status_code not in (200, 201):
             raise Exception(f"Error creating deposition: {response.text}")
 
+        self._remember_bucket(response.json())
         return response.json()
 
-    def upload_file(self, dataset: DataSet, deposition_id: int, csv_model: CSVModel, user=None) -> dict:
-        """
-        Upload a file to a deposition in Zenodo or simulate it in Fakenodo.
-        """
-        csv_filename = csv_model.fm_meta_data.csv_filename
+    def get_file_path(self, dataset: DataSet, csv_model: CSVModel, user=None) -> str:
         user_id = current_user.id if user is None else user.id
-        file_path = os.path.join(
+        return os.path.join(
             uploads_folder_name(),
             f"user_{str(user_id)}",
             f"dataset_{dataset.id}/",
-            csv_filename,
+            csv_model.fm_meta_data.csv_filename,
         )
-        print("deposition_id and csv_filename:")
-        print(deposition_id)
-        print(csv_filename)
+
+    def upload_file(self, dataset: DataSet, deposition_id: int, csv_model: CSVModel, user=None) -> dict:
+        """
+        Upload a file to a deposition in Zenodo or simulate it in Fakenodo.
+        """
+        csv_filename = csv_model.fm_meta_data.csv_filename
+        file_path = self.get_file_path(dataset, csv_model, user)
+        return self._upload_to_deposition(deposition_id, csv_filename, file_path)
+
+    def upload_files(self, dataset: DataSet, deposition_id: int, csv_models: list[CSVModel], user=None) -> list[dict]:
+        """
+        Upload every CSV model of a dataset to the same deposition concurrently.
+
+        File names and paths are resolved up front in the calling thread (they need the DB session
+        and the request's current user); the worker threads only perform the HTTP uploads.
+
+        Returns:
+            list[dict]: The JSON responses, in the same order as ``csv_models``.
+        """
+        if user is None:
+            user = current_user
+        uploads = [
+            (csv_model.fm_meta_data.csv_filename, self.get_file_path(dataset, csv_model, user))
+            for csv_model in csv_models
+        ]
+        if not uploads:
+            return []
+
+        max_workers = min(get_upload_workers(), len(uploads))
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zenodo-upload") as executor:
+                futures = [
+                    executor.submit(self._upload_to_deposition, deposition_id, csv_filename, file_path)
+                    for csv_filename, file_path in uploads
+                ]
+                # result() re-raises the first failed upload in the caller
+                return [future.result() for future in futures]
+        finally:
+            # Un reintento vuelve a leer el bucket con get_deposition
+            self._bucket_urls.delete(deposition_id)
+
+    def _upload_to_deposition(self, deposition_id: int, csv_filename: str, file_path: str) -> dict:
+        logger.debug("Uploading %s to deposition %s", csv_filename, deposition_id)
 
         if self.is_fakenodo:
             # Para Fakenodo, enviar los archivos correctamente
             url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
 
             # IMPORTANTE: Enviar como JSON con la lista de archivos
-            response = requests.post(url, json={"files": [csv_filename]})
+            response = self.session.post(url, json={"files": [csv_filename]}, timeout=self.timeout)
 
             if response.status_code in (200, 201):
                 return response.json()
@@ -192,30 +297,72 @@ class ZenodoService(BaseService):
                 }
 
         # --- Zenodo real ---
-        data = {"name": csv_filename}
-        files = {"file": open(file_path, "rb")}
-        publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
-
-        response = requests.post(publish_url, params=self.params, data=data, files=files)
-        files["file"].close()
+        response = self._send_file(deposition_id, csv_filename, file_path)
 
-        if response.status_code != 201:
+        if response.status_code not in (200, 201):
             error_message = f"Failed to upload files. Error details: {response.json()}"
             raise Exception(error_message)
         return response.json()
 
+    def _remember_bucket(self, deposition: dict):
+        bucket_url = (deposition.get("links") or {}).get("bucket") if isinstance(deposition, dict) else None
+        if bucket_url and "id" in deposition:
+            self._bucket_urls.set(deposition["id"], bucket_url)
+
+    def _send_file(self, deposition_id: int, filename: str, file_path: str) -> requests.Response:
+        """
+        Send a file to a deposition streaming it from disk, so memory use does not grow with the file size.
+
+        When the deposition bucket is known the file is PUT directly as the raw request body (Zenodo's
+        bucket API); otherwise it is POSTed to the legacy files endpoint as a streamed multipart body.
+        """
+        file_size = os.path.getsize(file_path)
+        start = time.perf_counter()
+
+        with open(file_path, "rb") as file:
+            bucket_url = self._bucket_urls.get(deposition_id)
+            if bucket_url:
+                response = self.session.put(
+                    f"{bucket_url}/{quote(filename)}",
+                    data=file,
+                    params=self.params,
+                    headers={"Content-Type": "application/octet-stream"},
+                    timeout=self.timeout,
+                )
+            else:
+                body = MultipartFileStream({"name": filename}, "file", filename, file, file_size)
+                response = self.session.post(
+                    f"{self.ZENODO_API_URL}/{deposition_id}/files",
+                    data=body,
+                    params=self.params,
+                    headers={"Content-Type": body.content_type},
+                    timeout=self.timeout,
+                )
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "Uploaded %s (%d bytes) to deposition %s in %.2fs (%.2f MB/s)",
+            filename,
+            file_size,
+            deposition_id,
+            elapsed,
+            file_size / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+        )
+        return response
+
     def publish_deposition(self, deposition_id: int) -> dict:
         """
         Publish a deposition in Zenodo or Fakenodo.
         """
+        self._bucket_urls.delete(deposition_id)
         if self.is_fakenodo:
             url = f"{self.ZENODO_API_URL}/{deposition_id}/actions/publish"
-            response = requests.post(url, json={"files": []})
+            response = self.session.post(url, json={"files": []}, timeout=self.timeout)
             return response.json()
 
         # --- Zenodo real ---
         publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/actions/publish"
-        response = requests.post(publish_url, params=self.params, headers=self.headers)
+        response = self.session.post(publish_url, params=self.params, headers=self.headers, timeout=self.timeout)
 
         if response.status_code not in (200, 202):
             raise Exception(f"Failed to publish deposition. Error: {response.text}")
@@ -233,13 +380,14 @@ class ZenodoService(BaseService):
         """
         if self.is_fakenodo:
             url = f"{self.ZENODO_API_URL}/{deposition_id}"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             return response.json()
 
         deposition_url = f"{self.ZENODO_API_URL}/{deposition_id}"
-        response = requests.get(deposition_url, params=self.params, headers=self.headers)
+        response = self.session.get(deposition_url, params=self.params, headers=self.headers, timeout=self.timeout)
         if response.status_code != 200:
             raise Exception("Failed to get deposition")
+        self._remember_bucket(response.json())
         return response.json()
 
     def get_doi(self, deposition_id: int) -> str:
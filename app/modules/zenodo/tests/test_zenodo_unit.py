@@ -57,13 +57,13 @@ def test_get_zenodo_access_token(monkeypatch):
 
 
 def test_test_connection_success(service):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 200
         assert service.test_connection() is True
 
 
 def test_test_connection_failure(service):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 500
         assert service.test_connection() is False
 
@@ -72,7 +72,7 @@ def test_test_full_connection_success(service, tmp_path, app_context):
     monkey_file = tmp_path / "test_file.txt"
     monkey_file.write_text("dummy")
 
-    with patch("requests.post") as mock_post, patch("requests.delete") as mock_delete:
+    with patch("requests.Session.post") as mock_post, patch("requests.Session.delete") as mock_delete:
         mock_post.side_effect = [
             MagicMock(status_code=201, json=lambda: {"id": 1}),
             MagicMock(status_code=201, json=lambda: {"ok": True}),
@@ -86,7 +86,7 @@ def test_test_full_connection_success(service, tmp_path, app_context):
 
 
 def test_test_full_connection_create_fail(service, app_context):
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 400
         resp = service.test_full_connection()
         data = resp.get_json()
@@ -94,7 +94,7 @@ def test_test_full_connection_create_fail(service, app_context):
 
 
 def test_get_all_depositions_success(service):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {"records": []}
         result = service.get_all_depositions()
@@ -102,7 +102,7 @@ def test_get_all_depositions_success(service):
 
 
 def test_get_all_depositions_failure(service):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 500
         with pytest.raises(Exception):
             service.get_all_depositions()
@@ -122,7 +122,7 @@ def make_dataset():
 
 def test_create_new_deposition_success(service):
     dataset = make_dataset()
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 201
         mock_post.return_value.json.return_value = {"id": 1}
         result = service.create_new_deposition(dataset)
@@ -131,7 +131,7 @@ def test_create_new_deposition_success(service):
 
 def test_create_new_deposition_failure(service):
     dataset = make_dataset()
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 400
         mock_post.return_value.text = "error"
         with pytest.raises(Exception):
@@ -149,7 +149,7 @@ def make_csvmodel():
 def test_upload_file_fakenodo_success(service):
     dataset = make_dataset()
     csv_model = make_csvmodel()
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {"ok": True}
         result = service.upload_file(dataset, 1, csv_model, user=MagicMock(id=1))
@@ -162,7 +162,7 @@ def test_upload_file_fakenodo_fallback(service, tmp_path):
     file_path = tmp_path / "file.csv"
     file_path.write_text("dummy")
     with (
-        patch("requests.post") as mock_post,
+        patch("requests.Session.post") as mock_post,
         patch(
             "core.configuration.configuration.uploads_folder_name",
             return_value=str(tmp_path),
@@ -174,7 +174,7 @@ def test_upload_file_fakenodo_fallback(service, tmp_path):
 
 
 def test_publish_deposition_fakenodo(service):
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.json.return_value = {"published": True}
         result = service.publish_deposition(1)
         assert result["published"] is True
@@ -183,7 +183,7 @@ def test_publish_deposition_fakenodo(service):
 def test_publish_deposition_real_failure(monkeypatch):
     monkeypatch.delenv("FAKENODO_URL", raising=False)
     s = ZenodoService()
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 400
         mock_post.return_value.text = "error"
         with pytest.raises(Exception):
@@ -191,7 +191,7 @@ def test_publish_deposition_real_failure(monkeypatch):
 
 
 def test_get_deposition_fakenodo(service):
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.json.return_value = {"id": 1}
         result = service.get_deposition(1)
         assert result["id"] == 1
@@ -200,7 +200,7 @@ def test_get_deposition_fakenodo(service):
 def test_get_deposition_real_failure(monkeypatch):
     monkeypatch.delenv("FAKENODO_URL", raising=False)
     s = ZenodoService()
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 400
         with pytest.raises(Exception):
             s.get_deposition(1)
@@ -262,7 +262,7 @@ def test_test_full_connection_logs_and_cleanup(service, tmp_path, app_context):
     test_file = tmp_path / "test_file.txt"
     test_file.write_text("dummy")
 
-    with patch("requests.post") as mock_post, patch("requests.delete") as mock_delete:
+    with patch("requests.Session.post") as mock_post, patch("requests.Session.delete") as mock_delete:
         mock_post.side_effect = [
             MagicMock(status_code=201, json=lambda: {"id": 1}),
             MagicMock(status_code=201, json=lambda: {"ok": True}),
@@ -275,7 +275,7 @@ def test_test_full_connection_logs_and_cleanup(service, tmp_path, app_context):
 
 
 def test_test_full_connection_file_missing(service, tmp_path, app_context):
-    with patch("requests.post") as mock_post, patch("requests.delete") as mock_delete:
+    with patch("requests.Session.post") as mock_post, patch("requests.Session.delete") as mock_delete:
         mock_post.side_effect = [
             MagicMock(status_code=201, json=lambda: {"id": 1}),
             MagicMock(status_code=201, json=lambda: {"ok": True}),
@@ -327,7 +327,7 @@ def test_upload_file_zenodo_real_success(monkeypatch, tmp_path):
 
     dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
 
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 201
         mock_post.return_value.json.return_value = {"uploaded": True}
 
@@ -342,10 +342,132 @@ def test_upload_file_zenodo_real_failure(monkeypatch, tmp_path):
 
     dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
 
-    with patch("requests.post") as mock_post:
+    with patch("requests.Session.post") as mock_post:
         mock_post.return_value.status_code = 400
         mock_post.return_value.json.return_value = {"error": "bad request"}
 
         with pytest.raises(Exception) as excinfo:
             service.upload_file(dataset, 123, csv_model, user=MagicMock(id=user_id))
         assert "Failed to upload files" in str(excinfo.value)
+
+
+def test_get_http_session_is_shared(service):
+    assert ZenodoService().session is service.session
+    assert service.session.get_adapter("https://zenodo.org").max_retries.total >= 0
+
+
+def test_upload_files_uploads_every_csv_model(service):
+    dataset = make_dataset()
+    csv_models = [make_csvmodel(), make_csvmodel()]
+    csv_models[1].fm_meta_data.csv_filename = "other.csv"
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value.status_code = 201
+        mock_post.return_value.json.return_value = {"ok": True}
+        results = service.upload_files(dataset, 1, csv_models, user=MagicMock(id=1))
+
+    assert results == [{"ok": True}, {"ok": True}]
+    uploaded = sorted(call.kwargs["json"]["files"][0] for call in mock_post.call_args_list)
+    assert uploaded == ["file.csv", "other.csv"]
+
+
+def test_upload_files_empty(service):
+    assert service.upload_files(make_dataset(), 1, [], user=MagicMock(id=1)) == []
+
+
+def test_upload_files_propagates_failure(monkeypatch, tmp_path):
+    monkeypatch.delenv("FAKENODO_URL", raising=False)
+    service = ZenodoService()
+
+    dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value.status_code = 400
+        mock_post.return_value.json.return_value = {"error": "bad request"}
+
+        with pytest.raises(Exception) as excinfo:
+            service.upload_files(dataset, 123, [csv_model], user=MagicMock(id=user_id))
+        assert "Failed to upload files" in str(excinfo.value)
+
+
+def test_multipart_file_stream_matches_file(tmp_path):
+    from app.modules.zenodo.multipart import MultipartFileStream
+
+    source = tmp_path / "data.csv"
+    source.write_bytes(b"id,name\n" * 10000)
+
+    with open(source, "rb") as f:
+        body = MultipartFileStream({"name": "data.csv"}, "file", "data.csv", f, source.stat().st_size)
+        content = b"".join(body)
+
+        assert len(content) == len(body)
+        assert b'name="name"\r\n\r\ndata.csv\r\n' in content
+        assert b"id,name\n" * 10000 in content
+        assert content.endswith(f"--{body.boundary}--\r\n".encode())
+
+        # urllib3 rewinds the body before retrying a request
+        body.seek(0)
+        assert body.read(5) == content[:5]
+        assert body.tell() == 5
+        assert body.read() == content[5:]
+
+
+def test_upload_file_zenodo_real_streams_multipart(monkeypatch, tmp_path):
+    monkeypatch.delenv("FAKENODO_URL", raising=False)
+    service = ZenodoService()
+
+    dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
+
+    with patch("requests.Session.post") as mock_post:
+        mock_post.return_value.status_code = 201
+        mock_post.return_value.json.return_value = {"uploaded": True}
+        service.upload_file(dataset, 123, csv_model, user=MagicMock(id=user_id))
+
+    kwargs = mock_post.call_args.kwargs
+    assert "files" not in kwargs
+    assert kwargs["headers"]["Content-Type"].startswith("multipart/form-data; boundary=")
+    assert len(kwargs["data"]) > os.path.getsize(file_path)
+
+
+def test_upload_file_zenodo_real_uses_bucket(monkeypatch, tmp_path):
+    monkeypatch.delenv("FAKENODO_URL", raising=False)
+    service = ZenodoService()
+
+    dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
+
+    with patch("requests.Session.post") as mock_post, patch("requests.Session.put") as mock_put:
+        mock_post.return_value.status_code = 201
+        mock_post.return_value.json.return_value = {"id": 123, "links": {"bucket": "https://zenodo.org/api/files/b"}}
+        mock_put.return_value.status_code = 201
+        mock_put.return_value.json.return_value = {"key": "file.csv"}
+
+        service.create_new_deposition(dataset)
+        result = service.upload_file(dataset, 123, csv_model, user=MagicMock(id=user_id))
+
+    assert result == {"key": "file.csv"}
+    assert mock_post.call_count == 1
+    assert mock_put.call_args.args[0] == "https://zenodo.org/api/files/b/file.csv"
+
+
+def test_bucket_url_is_forgotten_after_uploading_and_publishing(monkeypatch, tmp_path):
+    monkeypatch.delenv("FAKENODO_URL", raising=False)
+    service = ZenodoService()
+
+    dataset, csv_model, user_id, file_path = make_dataset_and_csv(tmp_path)
+
+    with patch("requests.Session.post") as mock_post, patch("requests.Session.put") as mock_put:
+        mock_post.return_value.status_code = 201
+        mock_post.return_value.json.return_value = {"id": 123, "links": {"bucket": "https://zenodo.org/api/files/b"}}
+        mock_put.return_value.status_code = 201
+        mock_put.return_value.json.return_value = {"key": "file.csv"}
+
+        service.create_new_deposition(dataset)
+        service.upload_files(dataset, 123, [csv_model], user=MagicMock(id=user_id))
+        assert 123 not in service._bucket_urls
+
+        service.create_new_deposition(dataset)
+        mock_post.return_value.status_code = 202
+        service.publish_deposition(123)
+        assert len(service._bucket_urls) == 0
+
+    assert mock_put.call_args.args[0] == "https://zenodo.org/api/files/b/file.csv"
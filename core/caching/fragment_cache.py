@@ -0,0 +1,75 @@
+import logging
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from core.caching.response_cache import build_backend
+
+logger = logging.getLogger(__name__)
+
+
+def fragment_key(key) -> str:
+    """Cache key of a fragment: lists and tuples (``["dataset", id, "files", version]``) are joined with ``:``."""
+    if isinstance(key, (list, tuple)):
+        return ":".join(str(part) for part in key)
+    return str(key)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    ``{% cache key, ttl %}...{% endcache %}``: cache the rendered HTML of a template section.
+
+    ``key`` should carry a version of whatever the section renders (e.g. ``dataset.get_cache_version()``),
+    so a change produces a new key instead of having to purge the old one; ``ttl`` is optional
+    (``FRAGMENT_CACHE_TTL`` by default). Without a backend (``FRAGMENT_CACHE_BACKEND=none``) the
+    section is rendered every time. Nothing that depends on the current user belongs inside.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_cache_ttl=3600)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        args.append(parser.parse_expression() if parser.stream.skip_if("comma") else nodes.Const(None))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render_fragment", args), [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, key, ttl, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+
+        cache_key = f"fragment:{fragment_key(key)}"
+        try:
+            html = cache.get(cache_key)
+        except Exception as exc:
+            logger.warning("Fragment cache unavailable: %s", exc)
+            return caller()
+        if html is None:
+            html = str(caller())
+            try:
+                cache.set(cache_key, html, ttl if ttl is not None else self.environment.fragment_cache_ttl)
+            except Exception as exc:
+                logger.warning("Fragment cache unavailable: %s", exc)
+        # Ya se escapó al renderizarlo la primera vez
+        return Markup(html)
+
+
+def init_app(app):
+    """Register ``{% cache %}`` in the app's Jinja environment, backed by ``FRAGMENT_CACHE_BACKEND``."""
+    config = app.config
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = build_backend(
+        config.get("FRAGMENT_CACHE_BACKEND", "lru"),
+        maxsize=int(config.get("FRAGMENT_CACHE_MAXSIZE", 1024)),
+        directory=config.get("FRAGMENT_CACHE_DIR"),
+        redis_url=config.get("RESPONSE_CACHE_REDIS_URL"),
+        namespace="fragment_cache",
+        setting="FRAGMENT_CACHE_BACKEND",
+    )
+    app.jinja_env.fragment_cache_ttl = int(config.get("FRAGMENT_CACHE_TTL", 3600))
@@ -0,0 +1,303 @@
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from cachelib import BaseCache, FileSystemCache, RedisCache
+from flask import Response, current_app, has_app_context, request, session
+from flask_login import current_user
+
+from core.caching.lru_cache import LRUCache
+from core.metrics.metrics import RESPONSE_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("none", "lru", "filesystem", "redis")
+
+# Cabeceras que nunca se guardan: las de cada cliente o las que Flask recalcula al servir la copia
+_PRIVATE_HEADERS = ("set-cookie", "content-length", "vary")
+
+
+class LRUBackend(BaseCache):
+    """``cachelib`` adapter over the in-process ``LRUCache`` (one cache per worker process)."""
+
+    def __init__(self, maxsize: int = 512, default_timeout: int = 300):
+        super().__init__(default_timeout)
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        self._cache.set(key, value, self._normalize_timeout(timeout))
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if key in self._cache:
+                return False
+            return self.set(key, value, timeout)
+
+    def delete(self, key):
+        self._cache.delete(key)
+        return True
+
+    def has(self, key):
+        return key in self._cache
+
+    def clear(self):
+        self._cache.clear()
+        return True
+
+
+def build_backend(
+    name: str,
+    maxsize: int = 512,
+    directory: str = None,
+    redis_url: str = None,
+    namespace: str = "response_cache",
+    setting: str = "RESPONSE_CACHE_BACKEND",
+) -> BaseCache:
+    """The ``cachelib`` cache for a ``*_CACHE_BACKEND`` setting (``None`` for ``none``)."""
+    if name not in BACKENDS:
+        raise ValueError(f"{setting} must be one of {', '.join(BACKENDS)}")
+    if name == "lru":
+        return LRUBackend(maxsize=maxsize)
+    if name == "filesystem":
+        return FileSystemCache(directory or os.path.join(tempfile.gettempdir(), namespace), threshold=maxsize)
+    if name == "redis":
+        from redis import Redis
+
+        client = Redis.from_url(redis_url or "redis://localhost:6379", socket_timeout=0.5, socket_connect_timeout=0.5)
+        return RedisCache(client, key_prefix=f"{namespace}:")
+    return None
+
+
+class ResponseCacheStore:
+    """
+    Cache of the pages anonymous visitors see, on top of a ``cachelib`` backend.
+
+    Each entry records the version of the tags it depends on (``"datasets"``, ``"dataset:<id>"``...);
+    ``invalidate`` gives those tags a new version, which turns every entry built from an older one stale.
+    A stale entry (expired or invalidated) is still served for ``stale_ttl`` seconds while a single
+    request, the one that takes the entry's lock, renders it again (stale-while-revalidate). On a plain
+    miss the other requests wait up to ``lock_wait`` seconds for that render instead of all hitting the
+    database at once. Backend errors degrade to rendering without cache.
+    """
+
+    def __init__(self, backend: BaseCache, ttl: int = 60, stale_ttl: int = 300, lock_wait: float = 2.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = 30
+        self.lock_wait = lock_wait
+
+    def fetch(self, key: str, tags, produce, ttl: int = None):
+        """Return ``(payload, result)`` with ``result`` one of ``HIT``, ``STALE`` or ``MISS``."""
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._call("get", key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time() and self._versions(entry["tags"]) == entry["tags"]:
+                return self._result(entry["value"], "HIT")
+            # Caducada o invalidada: se sirve tal cual mientras otra petición la regenera
+            if not self._acquire(key):
+                return self._result(entry["value"], "STALE")
+        elif not self._acquire(key):
+            entry = self._wait_for(key)
+            if entry is not None:
+                return self._result(entry["value"], "HIT")
+            # El render de la otra petición tarda demasiado: se renderiza sin esperar más
+            return self._result(produce(), "MISS")
+
+        try:
+            # Versiones leídas antes de renderizar: una invalidación durante el render deja la entrada obsoleta
+            versions = self._versions(tags)
+            payload = produce()
+            if payload["cacheable"] and versions is not None:
+                entry = {"value": payload, "tags": versions, "fresh_until": time.time() + ttl}
+                self._call("set", key, entry, ttl + self.stale_ttl)
+        finally:
+            self._call("delete", _lock_key(key))
+        return self._result(payload, "MISS")
+
+    def invalidate(self, *tags, interval: int = None):
+        for tag in tags:
+            # Con interval, solo la primera invalidación de cada ventana (compartida vía backend) cuenta
+            if interval and not self._call("add", _throttle_key(tag), 1, interval):
+                continue
+            self._call("set", _tag_key(tag), uuid.uuid4().hex, 0)
+
+    def clear(self):
+        self._call("clear")
+
+    @staticmethod
+    def _result(payload, result: str):
+        RESPONSE_CACHE_REQUESTS.labels(result=result.lower()).inc()
+        return payload, result
+
+    def _versions(self, tags):
+        keys = [_tag_key(tag) for tag in tags]
+        values = self._call("get_many", *keys) if keys else []
+        if values is None:
+            return None
+        versions = {}
+        for tag, key, value in zip(tags, keys, values):
+            if value is None:
+                # Etiqueta nueva (o expulsada de la caché): versión nueva, así nada anterior vuelve a ser válido
+                self._call("add", key, uuid.uuid4().hex, 0)
+                value = self._call("get", key)
+            versions[tag] = value
+        return versions
+
+    def _acquire(self, key: str) -> bool:
+        return bool(self._call("add", _lock_key(key), 1, self.lock_timeout))
+
+    def _wait_for(self, key: str):
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self._call("get", key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as exc:
+            logger.warning("Response cache backend unavailable (%s): %s", method, exc)
+            return None
+
+
+class ResponseCache:
+    """
+    Response cache for the public pages, keyed on path, query string and auth state.
+
+    Only anonymous ``GET`` requests without pending flash messages go through the cache; the
+    ``ResponseCacheStore`` of each app is configured from ``RESPONSE_CACHE_*`` by ``init_app``.
+    """
+
+    def init_app(self, app):
+        config = app.config
+        backend = build_backend(
+            config.get("RESPONSE_CACHE_BACKEND", "lru"),
+            maxsize=int(config.get("RESPONSE_CACHE_MAXSIZE", 512)),
+            directory=config.get("RESPONSE_CACHE_DIR"),
+            redis_url=config.get("RESPONSE_CACHE_REDIS_URL"),
+        )
+        app.extensions["response_cache"] = (
+            ResponseCacheStore(
+                backend,
+                ttl=int(config.get("RESPONSE_CACHE_TTL", 60)),
+                stale_ttl=int(config.get("RESPONSE_CACHE_STALE_TTL", 300)),
+                lock_wait=float(config.get("RESPONSE_CACHE_LOCK_WAIT", 2.0)),
+            )
+            if backend is not None
+            else None
+        )
+
+    @property
+    def store(self):
+        return current_app.extensions.get("response_cache") if has_app_context() else None
+
+    def cached(self, tags, ttl: int = None):
+        """
+        Cache the response of a view.
+
+        ``tags`` is a list of tags or a callable that receives the view arguments and returns them.
+        Only ``200`` responses without cookies are stored.
+        """
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.can_cache_request():
+                    return view(*args, **kwargs)
+                page_tags = tags(**kwargs) if callable(tags) else tags
+                payload, result = self.store.fetch(
+                    self._request_key("view"),
+                    page_tags,
+                    lambda: _freeze(current_app.make_response(view(*args, **kwargs))),
+                    ttl,
+                )
+                response = _thaw(payload)
+                response.headers["X-Cache"] = result
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def render(self, tags, render, ttl: int = None) -> str:
+        """
+        Cached ``render()`` (usually a ``render_template`` call).
+
+        For views with per-visitor side effects (cookies, view counters) that must run on every
+        request: only the expensive part of the page is cached.
+        """
+        if not self.can_cache_request():
+            return render()
+        payload, _ = self.store.fetch(
+            self._request_key("page"), tags, lambda: {"body": render(), "cacheable": True}, ttl
+        )
+        return payload["body"]
+
+    def can_cache_request(self) -> bool:
+        if self.store is None or request.method not in ("GET", "HEAD"):
+            return False
+        # Las páginas de usuarios con sesión iniciada o con mensajes flash pendientes son personales
+        return not current_user.is_authenticated and not session.get("_flashes")
+
+    def invalidate(self, *tags, interval: int = None):
+        """
+        Turn stale every cached page that depends on any of ``tags``.
+
+        With ``interval`` each tag is invalidated at most once every ``interval`` seconds, for
+        events frequent enough (visits, downloads) that invalidating on each one would defeat the cache.
+        """
+        if self.store is not None:
+            self.store.invalidate(*tags, interval=interval)
+
+    @staticmethod
+    def _request_key(kind: str) -> str:
+        query = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+        auth = "user" if current_user.is_authenticated else "anonymous"
+        digest = hashlib.sha256(f"{request.path}?{query}|{auth}".encode()).hexdigest()
+        return f"{kind}:{digest}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def _throttle_key(tag: str) -> str:
+    return f"throttle:{tag}"
+
+
+def _freeze(response: Response) -> dict:
+    cacheable = response.status_code == 200 and not response.direct_passthrough and "Set-Cookie" not in response.headers
+    return {
+        "body": response.get_data() if not response.direct_passthrough else None,
+        "status": response.status_code,
+        "headers": [(name, value) for name, value in response.headers if name.lower() not in _PRIVATE_HEADERS],
+        "cacheable": cacheable,
+        "response": None if cacheable else response,
+    }
+
+
+def _thaw(payload: dict) -> Response:
+    if payload.get("response") is not None:
+        return payload["response"]
+    return Response(payload["body"], status=payload["status"], headers=payload["headers"])
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+
+from core.caching.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    Two-tier cache of ``bytes`` values with per-key invalidation.
+
+    Every key has a generation number that ``invalidate`` bumps; entries are stored under
+    ``(key, generation)`` so an invalidation makes every older entry unreachable at once.
+    Values live in an in-process LRU and, when ``REDIS_URL`` is set, also in Redis. The generation
+    counters then live in Redis too, so an invalidation in one worker is seen by all of them.
+    Without Redis the counters (and therefore invalidation) are per process and ``ttl`` bounds
+    how stale another worker's copy can get. Redis errors degrade to the local tier.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 512, ttl: float = 300, redis_url: str = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._redis_url = redis_url if redis_url is not None else os.getenv("REDIS_URL")
+        self._redis = None
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _get_redis(self):
+        if self._redis is None and self._redis_url:
+            from redis import Redis
+
+            self._redis = Redis.from_url(self._redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_call(self, method: str, *args):
+        try:
+            redis = self._get_redis()
+            if redis is None:
+                return None
+            return getattr(redis, method)(*args)
+        except Exception as exc:
+            logger.warning("Redis tier of cache '%s' unavailable: %s", self.namespace, exc)
+            return None
+
+    def generation(self, key) -> int:
+        if self._redis_url:
+            value = self._redis_call("get", f"{self.namespace}:gen:{key}")
+            if value is not None:
+                return int(value)
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def get(self, key):
+        """Return ``(value, generation)``; ``value`` is ``None`` on a miss."""
+        generation = self.generation(key)
+        value = self._local.get((key, generation))
+        if value is None and self._redis_url:
+            value = self._redis_call("get", f"{self.namespace}:{key}:{generation}")
+            if value is not None:
+                self._local.set((key, generation), value)
+        return value, generation
+
+    def set(self, key, generation: int, value: bytes):
+        """Store ``value`` for the generation it was computed from (as returned by ``get``)."""
+        self._local.set((key, generation), value)
+        if self._redis_url:
+            self._redis_call("set", f"{self.namespace}:{key}:{generation}", value, int(self.ttl) or None)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        if self._redis_url:
+            self._redis_call("incr", f"{self.namespace}:gen:{key}")
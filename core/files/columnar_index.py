@@ -0,0 +1,168 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(value: str) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def tokenize(value: str) -> set:
+    return set(TOKEN_PATTERN.findall(str(value).lower()))
+
+
+class ColumnarIndex:
+    """
+    In-memory inverted index over the text columns of the tables of a ``ColumnarStore``.
+
+    Maps every (normalized) value and every word of those columns to the tables containing it and
+    the dictionary codes it has there; the row lists behind each code and the sorted numeric
+    arrays are read from the tables themselves (see ``ColumnarStore.write``). A table enters the
+    index with ``add`` as soon as it is written, and ``refresh`` (at most every
+    ``refresh_interval`` seconds) picks up tables written or removed by other processes, so the
+    index is never rebuilt from scratch.
+    """
+
+    def __init__(self, store, text_columns, refresh_interval: float = 1.0):
+        self.store = store
+        self.text_columns = tuple(text_columns)
+        self.refresh_interval = refresh_interval
+        self._versions = {}
+        self._values = {column: defaultdict(dict) for column in self.text_columns}
+        self._tokens = defaultdict(dict)
+        self._entries = {}
+        self._refreshed_at = None
+        self._lock = threading.RLock()
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        with self._lock:
+            keys = set(self.store.keys())
+            for key in list(self._versions):
+                if key not in keys:
+                    self._remove(key)
+            for key in keys:
+                table = self.store.open(key)
+                if table is not None and self._versions.get(key) != table.version:
+                    self._remove(key)
+                    self._add(key, table)
+            self._refreshed_at = now
+
+    def add(self, key: str):
+        with self._lock:
+            self._remove(key)
+            table = self.store.open(key)
+            if table is not None:
+                self._add(key, table)
+
+    def _add(self, key: str, table):
+        self._versions[key] = table.version
+        if not table.indexed:
+            return
+        entries = []
+        for column in self.text_columns:
+            if column not in table.kinds:
+                continue
+            for code, value in enumerate(table.dictionary(column).tolist()):
+                term = normalize(value)
+                self._values[column][term].setdefault(key, []).append(code)
+                entries.append((column, term))
+                for token in tokenize(term):
+                    self._tokens[token].setdefault(key, {}).setdefault(column, []).append(code)
+                    entries.append((None, token))
+        self._entries[key] = entries
+
+    def _remove(self, key: str):
+        self._versions.pop(key, None)
+        for column, term in self._entries.pop(key, []):
+            postings = self._values[column].get(term) if column is not None else self._tokens.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    (self._values[column] if column is not None else self._tokens).pop(term, None)
+
+    def search(self, values=None, tokens=(), ranges=(), keys=None) -> dict:
+        """
+        Number of matching rows of each table (only tables with at least one).
+
+        ``values`` maps a text column to the values accepted there (any of them), ``tokens`` are
+        words that must appear in any text column of the row and ``ranges`` are
+        ``(column, op, value)`` bounds on numeric columns (``gt``, ``ge``, ``lt``, ``le``).
+        All conditions must hold; ``keys`` restricts the search to those tables.
+        """
+        self.refresh()
+        # Valores que normalizan al mismo término no deben contar dos veces las mismas filas
+        values = {column: {normalize(value) for value in accepted} for column, accepted in (values or {}).items()}
+        tokens = {token for word in tokens for token in tokenize(word)}
+        ranges_by_column = defaultdict(list)
+        for column, op, value in ranges:
+            ranges_by_column[column].append((op, value))
+
+        with self._lock:
+            candidates = None
+            conditions = {}
+            for column, accepted in values.items():
+                postings = self._values.get(column, {})
+                codes = defaultdict(set)
+                for term in accepted:
+                    for key, term_codes in postings.get(term, {}).items():
+                        codes[key].update(term_codes)
+                conditions[("value", column)] = codes
+                candidates = set(codes) if candidates is None else candidates & set(codes)
+            for token in tokens:
+                codes = dict(self._tokens.get(token, {}))
+                conditions[("token", token)] = codes
+                candidates = set(codes) if candidates is None else candidates & set(codes)
+            if candidates is None:
+                candidates = {key for key in self._versions if key in self._entries}
+        if keys is not None:
+            candidates &= set(keys)
+
+        hits = {}
+        for key in sorted(candidates):
+            table = self.store.open(key)
+            if table is None or not table.indexed:
+                continue
+            if any(column not in table.kinds for column in ranges_by_column):
+                continue
+            count = self._count(table, key, conditions, ranges_by_column)
+            if count:
+                hits[key] = count
+        return hits
+
+    @staticmethod
+    def _count(table, key: str, conditions: dict, ranges_by_column: dict) -> int:
+        # Una sola condición: el recuento sale de los offsets o de la búsqueda binaria, sin tocar filas
+        if len(conditions) + len(ranges_by_column) == 1:
+            if ranges_by_column:
+                column, ranges = next(iter(ranges_by_column.items()))
+                start, stop = table.range_bounds(column, ranges)
+                return stop - start
+            (kind, name), codes = next(iter(conditions.items()))
+            if kind == "value":
+                return table.count_codes(name, sorted(codes[key]))
+
+        rows = None
+        for (kind, name), codes in conditions.items():
+            if kind == "value":
+                matched = table.rows_with_codes(name, sorted(codes[key]))
+            else:
+                matched = np.zeros(0, dtype=np.int64)
+                for column, column_codes in codes[key].items():
+                    matched = np.union1d(matched, table.rows_with_codes(column, column_codes))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if not len(rows):
+                return 0
+        for column, ranges in ranges_by_column.items():
+            matched = table.rows_in_range(column, ranges)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if not len(rows):
+                return 0
+        return 0 if rows is None else len(rows)
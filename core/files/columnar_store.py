@@ -0,0 +1,279 @@
+import json
+import math
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from core.caching.lru_cache import LRUCache
+
+COLUMN_KINDS = {"float": np.float64, "int": np.int64, "str": None}
+FILTER_OPS = ("eq", "in", "contains", "gt", "ge", "lt", "le")
+META_FILE = "meta.json"
+_COMPARISONS = {
+    "eq": np.equal,
+    "gt": np.greater,
+    "ge": np.greater_equal,
+    "lt": np.less,
+    "le": np.less_equal,
+}
+
+
+class ColumnarTable:
+    """
+    One table of a ``ColumnarStore``, its columns memory-mapped from ``.npy`` files.
+
+    Numeric columns are typed arrays (``0`` where a value did not parse, see ``valid``).
+    String columns are dictionary-encoded: ``<name>.codes.npy`` holds an ``int32`` code per row and
+    ``<name>.values.npy`` the distinct values, so filters compare against the (small) dictionary
+    and select rows with one array lookup.
+    """
+
+    def __init__(self, path: str, meta: dict, version: int = None):
+        self.path = path
+        self.version = version
+        self.rows = meta["rows"]
+        self.kinds = meta["columns"]
+        self.attrs = meta.get("attrs", {})
+        # Tablas escritas con las listas de filas por valor y los valores ordenados (ColumnarIndex)
+        self.indexed = meta.get("indexed", False)
+        self._arrays = {}
+
+    def _load(self, filename: str) -> np.ndarray:
+        array = self._arrays.get(filename)
+        if array is None:
+            array = np.load(os.path.join(self.path, filename), mmap_mode="r")
+            self._arrays[filename] = array
+        return array
+
+    def numbers(self, column: str) -> np.ndarray:
+        return self._load(f"{column}.npy")
+
+    def valid(self, column: str) -> np.ndarray:
+        return self._load(f"{column}.valid.npy")
+
+    def codes(self, column: str) -> np.ndarray:
+        return self._load(f"{column}.codes.npy")
+
+    def dictionary(self, column: str) -> np.ndarray:
+        return self._load(f"{column}.values.npy")
+
+    def mask(self, filters) -> np.ndarray:
+        """Boolean row mask of ``filters``: ``(column, op, value)`` tuples combined with AND."""
+        mask = np.ones(self.rows, dtype=bool)
+        for column, op, value in filters:
+            if column not in self.kinds:
+                return np.zeros(self.rows, dtype=bool)
+            if self.kinds[column] == "str":
+                mask &= self._string_mask(column, op, value)
+            else:
+                mask &= self._number_mask(column, op, value)
+        return mask
+
+    def _string_mask(self, column: str, op: str, value) -> np.ndarray:
+        dictionary = np.char.lower(self.dictionary(column))
+        if op == "eq":
+            matches = dictionary == str(value).lower()
+        elif op == "in":
+            matches = np.isin(dictionary, [str(item).lower() for item in value])
+        elif op == "contains":
+            matches = np.char.find(dictionary, str(value).lower()) >= 0
+        else:
+            raise ValueError(f"Operator '{op}' is not supported on text column '{column}'")
+        # Se evalúa sobre el diccionario y se expande a las filas con sus códigos
+        return matches[self.codes(column)] if len(matches) else np.zeros(self.rows, dtype=bool)
+
+    def _number_mask(self, column: str, op: str, value) -> np.ndarray:
+        numbers = self.numbers(column)
+        if op == "in":
+            result = np.isin(numbers, np.asarray(value, dtype=numbers.dtype))
+        elif op in _COMPARISONS:
+            result = _COMPARISONS[op](numbers, value)
+        else:
+            raise ValueError(f"Operator '{op}' is not supported on numeric column '{column}'")
+        return result & self.valid(column)
+
+    def rows_with_codes(self, column: str, codes) -> np.ndarray:
+        """Sorted ids of the rows whose ``column`` has any of the dictionary ``codes``."""
+        postings = self._load(f"{column}.postings.npy")
+        offsets = self._load(f"{column}.offsets.npy")
+        parts = [postings[offsets[code] : offsets[code + 1]] for code in codes]
+        if len(parts) == 1:
+            return np.asarray(parts[0])
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def count_codes(self, column: str, codes) -> int:
+        offsets = self._load(f"{column}.offsets.npy")
+        return int(sum(offsets[code + 1] - offsets[code] for code in codes))
+
+    def range_bounds(self, column: str, ranges) -> tuple:
+        """``(start, stop)`` in the sorted values of ``column`` of the values within all ``(op, value)`` ranges."""
+        values = self._load(f"{column}.sorted.npy")
+        # Los NaN van al final del orden: tablas escritas antes de tratarlos como inválidos no los cuentan
+        start, stop = 0, int(np.searchsorted(values, np.inf, side="right"))
+        for op, value in ranges:
+            if op == "gt":
+                start = max(start, int(np.searchsorted(values, value, side="right")))
+            elif op == "ge":
+                start = max(start, int(np.searchsorted(values, value, side="left")))
+            elif op == "lt":
+                stop = min(stop, int(np.searchsorted(values, value, side="left")))
+            elif op == "le":
+                stop = min(stop, int(np.searchsorted(values, value, side="right")))
+            else:
+                raise ValueError(f"Operator '{op}' is not a range operator")
+        return start, max(start, stop)
+
+    def rows_in_range(self, column: str, ranges) -> np.ndarray:
+        """Sorted ids of the rows whose ``column`` is within all ``ranges``."""
+        start, stop = self.range_bounds(column, ranges)
+        return np.sort(self._load(f"{column}.order.npy")[start:stop])
+
+    def take(self, mask: np.ndarray, columns=None, limit: int = None) -> list:
+        """Rows selected by ``mask`` as dicts (only the first ``limit``)."""
+        indexes = np.flatnonzero(mask)
+        if limit is not None:
+            indexes = indexes[:limit]
+        values = {}
+        for column in columns or self.kinds:
+            if self.kinds[column] == "str":
+                values[column] = self.dictionary(column)[self.codes(column)[indexes]].tolist()
+            else:
+                column_values = self.numbers(column)[indexes].tolist()
+                valid = self.valid(column)[indexes].tolist()
+                values[column] = [value if ok else None for value, ok in zip(column_values, valid)]
+        return [{column: values[column][i] for column in values} for i in range(len(indexes))]
+
+
+class ColumnarStore:
+    """
+    Directory of columnar tables, one subdirectory per key (e.g. ``dataset_3/file_12``).
+
+    Tables are written once to a temporary directory and swapped in, so readers never see half
+    a table. Opened tables are kept in an in-process LRU keyed by the ``meta.json`` mtime.
+    """
+
+    def __init__(self, root: str, maxsize: int = 256):
+        self.root = root
+        self._tables = LRUCache(maxsize=maxsize)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def write(self, key: str, kinds: dict, columns: dict, attrs: dict = None):
+        """
+        Store ``columns`` (``{name: list of values}``) as table ``key``; ``kinds`` gives the type of each
+        column (``float``, ``int`` or ``str``) and ``attrs`` is free metadata kept in ``meta.json``.
+        """
+        rows = len(next(iter(columns.values()), []))
+        path = self._path(key)
+        temporary = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(temporary)
+        try:
+            for name, kind in kinds.items():
+                if kind not in COLUMN_KINDS:
+                    raise ValueError(f"Column kind must be one of {', '.join(COLUMN_KINDS)}")
+                values = columns.get(name, [])
+                if kind == "str":
+                    dictionary, codes = np.unique(
+                        np.asarray([str(value) for value in values], dtype=str), return_inverse=True
+                    )
+                    codes = codes.astype(np.int32)
+                    np.save(os.path.join(temporary, f"{name}.values.npy"), dictionary)
+                    np.save(os.path.join(temporary, f"{name}.codes.npy"), codes)
+                    # Listas de filas por valor: filas ordenadas por código y dónde empieza cada código
+                    counts = np.bincount(codes, minlength=len(dictionary))
+                    np.save(os.path.join(temporary, f"{name}.postings.npy"), np.argsort(codes, kind="stable"))
+                    np.save(os.path.join(temporary, f"{name}.offsets.npy"), np.concatenate(([0], np.cumsum(counts))))
+                else:
+                    numbers, valid = _parse_numbers(values, COLUMN_KINDS[kind])
+                    np.save(os.path.join(temporary, f"{name}.npy"), numbers)
+                    np.save(os.path.join(temporary, f"{name}.valid.npy"), valid)
+                    # Valores ordenados (y sus filas) para resolver rangos con una búsqueda binaria
+                    order = np.flatnonzero(valid)[np.argsort(numbers[valid], kind="stable")]
+                    np.save(os.path.join(temporary, f"{name}.order.npy"), order)
+                    np.save(os.path.join(temporary, f"{name}.sorted.npy"), numbers[order])
+            with open(os.path.join(temporary, META_FILE), "w") as meta:
+                json.dump({"rows": rows, "columns": kinds, "attrs": attrs or {}, "indexed": True}, meta)
+
+            previous = f"{path}.old-{uuid.uuid4().hex}"
+            if os.path.exists(path):
+                os.replace(path, previous)
+            os.replace(temporary, path)
+            shutil.rmtree(previous, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+
+    def open(self, key: str) -> ColumnarTable:
+        """The table stored as ``key``, or ``None``."""
+        path = self._path(key)
+        try:
+            version = os.stat(os.path.join(path, META_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        table = self._tables.get((key, version))
+        if table is None:
+            with open(os.path.join(path, META_FILE)) as meta:
+                table = ColumnarTable(path, json.load(meta), version)
+            self._tables.set((key, version), table)
+        return table
+
+    def keys(self) -> list:
+        """Keys of every stored table (``<group>/<name>``), in a stable order."""
+        if not os.path.isdir(self.root):
+            return []
+        keys = []
+        for group in sorted(os.listdir(self.root)):
+            group_path = os.path.join(self.root, group)
+            if not os.path.isdir(group_path) or ".tmp-" in group or ".old-" in group:
+                continue
+            for name in sorted(os.listdir(group_path)):
+                if ".tmp-" not in name and ".old-" not in name and os.path.isdir(os.path.join(group_path, name)):
+                    keys.append(f"{group}/{name}")
+        return keys
+
+    def delete(self, key: str):
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def scan(self, filters, keys=None, columns=None, limit: int = 100) -> dict:
+        """
+        Apply ``filters`` to every table (or only ``keys``) with vectorized masks.
+
+        Returns the total number of matching rows and up to ``limit`` of them, each with the
+        ``attrs`` of its table.
+        """
+        for _, op, _ in filters:
+            if op not in FILTER_OPS:
+                raise ValueError(f"Filter operator must be one of {', '.join(FILTER_OPS)}")
+        total = 0
+        rows = []
+        for key in self.keys() if keys is None else keys:
+            table = self.open(key)
+            if table is None or not table.rows:
+                continue
+            mask = table.mask(filters)
+            matches = int(np.count_nonzero(mask))
+            if not matches:
+                continue
+            total += matches
+            if len(rows) < limit:
+                rows.extend(dict(row, **table.attrs) for row in table.take(mask, columns, limit - len(rows)))
+        return {"total": total, "rows": rows}
+
+
+def _parse_numbers(values, dtype):
+    numbers = np.zeros(len(values), dtype=dtype)
+    valid = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        try:
+            number = float(value)
+            # nan/inf no son valores: ni int() los convierte ni deben entrar en los rangos ordenados
+            if not math.isfinite(number):
+                continue
+            numbers[index] = number if dtype is np.float64 else int(number)
+        except (TypeError, ValueError, OverflowError):
+            continue
+        valid[index] = True
+    return numbers, valid
@@ -0,0 +1,149 @@
+import csv
+import os
+import threading
+
+from core.caching.lru_cache import LRUCache
+
+# Cada cuántas filas se guarda su offset en el índice: memoria acotada a filas / INDEX_STRIDE enteros
+INDEX_STRIDE = 1000
+DEFAULT_PAGE_ROWS = 100
+MAX_PAGE_ROWS = 1000
+DEFAULT_WINDOW_BYTES = 64 * 1024
+MAX_WINDOW_BYTES = 1024 * 1024
+
+
+class RowOffsetIndex:
+    """
+    Sparse row -> byte offset index of one CSV file.
+
+    Stores the offset where every ``stride``-th row starts, filled in as pages are read, so a
+    later page starts parsing from the nearest known row instead of the beginning of the file.
+    """
+
+    def __init__(self, stride: int = INDEX_STRIDE):
+        self.stride = stride
+        self.offsets = [0]
+        self._lock = threading.Lock()
+
+    def nearest(self, row: int) -> tuple:
+        """``(row, offset)`` of the last indexed row at or before ``row``."""
+        with self._lock:
+            position = min(row // self.stride, len(self.offsets) - 1)
+            return position * self.stride, self.offsets[position]
+
+    def record(self, row: int, offset: int):
+        if row % self.stride:
+            return
+        with self._lock:
+            # Solo se añade el siguiente checkpoint: los anteriores ya están y los posteriores faltan
+            if row // self.stride == len(self.offsets):
+                self.offsets.append(offset)
+
+    @property
+    def indexed_rows(self) -> int:
+        return (len(self.offsets) - 1) * self.stride
+
+
+class CSVPreview:
+    """
+    Constant-memory preview of CSV files: pages of rows or byte windows parsed with ``csv.reader``.
+
+    The file is read from a seek position one line at a time, never whole. The offset index of
+    each file is kept in an in-process LRU keyed by path, size and mtime, so a changed file gets a
+    new index.
+    """
+
+    def __init__(self, maxsize: int = 128, stride: int = INDEX_STRIDE):
+        self.stride = stride
+        self._indexes = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def index_for(self, path: str) -> RowOffsetIndex:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = RowOffsetIndex(self.stride)
+                self._indexes.set(key, index)
+        return index
+
+    def read_rows(self, path: str, start_row: int = 0, limit: int = DEFAULT_PAGE_ROWS) -> dict:
+        """Rows ``start_row .. start_row + limit`` of the file, plus where the next page starts."""
+        start_row = max(start_row, 0)
+        limit = min(max(limit, 1), MAX_PAGE_ROWS)
+        index = self.index_for(path)
+        row, offset = index.nearest(start_row)
+
+        rows = []
+        page_offset = next_offset = offset
+        with open(path, "rb") as file:
+            for parsed, end in _rows_from(file, offset):
+                if row >= start_row:
+                    if len(rows) == limit:
+                        break
+                    rows.append(parsed)
+                else:
+                    page_offset = end
+                row += 1
+                next_offset = end
+                index.record(row, end)
+            else:
+                next_offset = None
+            size = os.fstat(file.fileno()).st_size
+
+        next_row = start_row + len(rows) if next_offset is not None else None
+        return _page(rows, start_row, next_row, next_offset, size, offset=page_offset)
+
+    def read_window(self, path: str, offset: int = 0, max_bytes: int = DEFAULT_WINDOW_BYTES) -> dict:
+        """
+        Rows starting at byte ``offset`` (a row boundary, e.g. a previous ``next_offset``) until
+        ``max_bytes`` have been read; at least one row is returned so a page always advances.
+        """
+        max_bytes = min(max(max_bytes, 1), MAX_WINDOW_BYTES)
+        rows = []
+        next_offset = None
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            offset = min(max(offset, 0), size)
+            for parsed, end in _rows_from(file, offset):
+                if rows and end - offset > max_bytes:
+                    break
+                rows.append(parsed)
+                next_offset = end
+            else:
+                next_offset = None
+        return _page(rows, None, None, next_offset, size, offset=offset)
+
+
+def _rows_from(file, offset: int):
+    """Yield ``(row, end_offset)`` for each CSV row from ``offset`` (quoted newlines included)."""
+    file.seek(offset)
+    position = [offset]
+
+    def lines():
+        while True:
+            line = file.readline()
+            if not line:
+                return
+            position[0] += len(line)
+            yield line.decode("utf-8", errors="replace")
+
+    # csv.reader pide líneas hasta completar una fila: al devolverla, position apunta a su final
+    for row in csv.reader(lines()):
+        yield row, position[0]
+
+
+def _page(rows, start_row, next_row, next_offset, size, offset=None) -> dict:
+    return {
+        "rows": rows,
+        "start_row": start_row,
+        "next_row": next_row,
+        "offset": offset,
+        "next_offset": next_offset,
+        "eof": next_offset is None or next_offset >= size,
+        "size": size,
+    }
+
+
+csv_preview = CSVPreview()
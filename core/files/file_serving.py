@@ -0,0 +1,58 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import Response, abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+SERVING_MODES = ("sendfile", "x-accel")
+
+
+def uploads_root() -> str:
+    """Absolute path of the uploads directory (``uploads/`` next to the ``app`` package)."""
+    return os.path.join(os.path.dirname(current_app.root_path), current_app.config.get("UPLOAD_FOLDER", "uploads"))
+
+
+def send_upload(relative_path: str, download_name: str, etag: str = None, mimetype: str = None) -> Response:
+    """
+    Response that sends ``uploads/<relative_path>`` as an attachment, according to ``FILE_SERVING_MODE``.
+
+    ``x-accel`` returns an empty response with an ``X-Accel-Redirect`` to the ``internal`` location
+    ``FILE_SERVING_ACCEL_PREFIX`` and nginx sends the file itself (``sendfile``, ``Range``), so the
+    worker is released straight away. ``sendfile`` (default, development) lets Werkzeug stream it,
+    also with ``Range`` support. In both modes a path outside ``uploads/`` or a missing file is a
+    ``404``, and ``etag`` (the stored checksum) answers conditional requests with ``304 Not Modified``
+    without reading the file.
+    """
+    mode = current_app.config.get("FILE_SERVING_MODE", "sendfile")
+    if mode not in SERVING_MODES:
+        raise ValueError(f"FILE_SERVING_MODE must be one of {', '.join(SERVING_MODES)}")
+
+    # Como send_from_directory: nada fuera de uploads/ y 404 (no 500) si el fichero no está
+    file_path = safe_join(uploads_root(), relative_path)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    if mode == "sendfile":
+        return send_file(
+            file_path,
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=download_name,
+            etag=etag if etag else True,
+            conditional=True,
+        )
+
+    prefix = current_app.config.get("FILE_SERVING_ACCEL_PREFIX", "/protected-uploads/").rstrip("/")
+    response = Response(mimetype=mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    response.headers["X-Accel-Redirect"] = f"{prefix}/{quote(relative_path)}"
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    response.headers["Accept-Ranges"] = "bytes"
+    if etag:
+        response.set_etag(etag)
+    return response
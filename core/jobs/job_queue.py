@@ -0,0 +1,95 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """
+    Background job queue.
+
+    Jobs go to a Redis-backed RQ queue when ``REDIS_URL`` is set (they are then processed by
+    ``rq worker <name> --url $REDIS_URL``). Otherwise, or if Redis cannot be reached, they run on a
+    small in-process thread pool inside the application context of the enqueuing request.
+    When the app sets ``JOBS_RUN_SYNC`` (testing) the job runs eagerly in the caller.
+
+    Jobs must be module-level functions so RQ can import them, and should be idempotent: RQ may
+    run them again after a failure.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._rq_queue = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_rq_queue(self):
+        redis_url = os.getenv("REDIS_URL")
+        if not redis_url:
+            return None
+
+        if self._rq_queue is None:
+            from redis import Redis
+            from rq import Queue
+
+            self._rq_queue = Queue(self.name, connection=Redis.from_url(redis_url))
+        return self._rq_queue
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+                    thread_name_prefix=f"jobs-{self.name}",
+                )
+        return self._executor
+
+    def enqueue(self, func, *args, retries: int = 0, job_timeout: int = 3600, **kwargs) -> str:
+        """
+        Schedule ``func(*args, **kwargs)`` and return the job id.
+
+        ``retries`` is only honoured by the RQ backend; in-process jobs run once.
+        """
+        if has_app_context() and current_app.config.get("JOBS_RUN_SYNC"):
+            job_id = str(uuid.uuid4())
+            self._run(job_id, None, func, *args, **kwargs)
+            return job_id
+
+        try:
+            queue = self._get_rq_queue()
+            if queue is not None:
+                from rq import Retry
+
+                job = queue.enqueue(
+                    func,
+                    *args,
+                    retry=Retry(max=retries, interval=[10, 30, 60]) if retries else None,
+                    job_timeout=job_timeout,
+                    **kwargs,
+                )
+                return job.id
+        except Exception as exc:
+            logger.warning("RQ queue '%s' unavailable, running job in-process: %s", self.name, exc)
+
+        return self._submit_in_process(func, *args, **kwargs)
+
+    def _submit_in_process(self, func, *args, **kwargs) -> str:
+        job_id = str(uuid.uuid4())
+        app = current_app._get_current_object() if has_app_context() else None
+        self._get_executor().submit(self._run, job_id, app, func, *args, **kwargs)
+        return job_id
+
+    @staticmethod
+    def _run(job_id, app, func, *args, **kwargs):
+        try:
+            if app is None:
+                return func(*args, **kwargs)
+            with app.app_context():
+                return func(*args, **kwargs)
+        except Exception:
+            logger.exception("Job %s (%s) failed", job_id, getattr(func, "__name__", func))
@@ -0,0 +1,35 @@
+import logging
+import uuid
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+def assign_request_id() -> str:
+    """Give the current request an id: the incoming ``X-Request-ID`` if there is one, a new one otherwise."""
+    incoming = request.headers.get(REQUEST_ID_HEADER, "")
+    g.request_id = incoming[:64] if incoming else uuid.uuid4().hex
+    return g.request_id
+
+
+def get_request_id() -> str:
+    if "request_id" not in g:
+        return assign_request_id()
+    return g.request_id
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the request id, method and path.
+
+    It must run in the thread that logs (on the ``QueueHandler``), because the listener thread
+    that formats the records has no request context.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = get_request_id()
+            record.method = request.method
+            record.path = request.path
+        return True
@@ -0,0 +1,21 @@
+import logging
+import random
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only a fraction of the records below ``min_level``.
+
+    Useful for debug/info output on hot paths: ``rate=0.01`` keeps roughly one record in a hundred,
+    while warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, min_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.min_level = min_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.min_level:
+            return True
+        return self.rate >= 1 or random.random() < self.rate
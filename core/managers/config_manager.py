@@ -33,10 +33,42 @@ class Config:
     TIMEZONE = "Europe/Madrid"
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
+    # Perfilado SQL por petición (core/managers/query_profiler_manager.py), desactivado por defecto
+    SQL_PROFILER = os.getenv("SQL_PROFILER", "false").lower() == "true"
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", "5"))
+    # Caché de páginas públicas para visitantes anónimos (core/caching/response_cache.py): none, lru, filesystem, redis
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "lru").lower()
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+    RESPONSE_CACHE_STALE_TTL = int(os.getenv("RESPONSE_CACHE_STALE_TTL", "300"))
+    RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "512"))
+    RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR")
+    RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", os.getenv("REDIS_URL"))
+    # Secciones de plantilla cacheadas con {% cache %} (core/caching/fragment_cache.py)
+    FRAGMENT_CACHE_BACKEND = os.getenv("FRAGMENT_CACHE_BACKEND", "lru").lower()
+    FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", "3600"))
+    FRAGMENT_CACHE_MAXSIZE = int(os.getenv("FRAGMENT_CACHE_MAXSIZE", "1024"))
+    FRAGMENT_CACHE_DIR = os.getenv("FRAGMENT_CACHE_DIR")
+    # Descargas de ficheros (core/files/file_serving.py): sendfile (Werkzeug) o x-accel (nginx)
+    FILE_SERVING_MODE = os.getenv("FILE_SERVING_MODE", "sendfile").lower()
+    FILE_SERVING_ACCEL_PREFIX = os.getenv("FILE_SERVING_ACCEL_PREFIX", "/protected-uploads/")
+    # Copia columnar (.npy) de los CSV subidos (app/modules/dataset/beer_catalog.py); por defecto columnar/
+    COLUMNAR_STORE_DIR = os.getenv("COLUMNAR_STORE_DIR")
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    # Valores por defecto del pool, sobrescribibles con las variables DB_* (ver core/managers/database_manager.py)
+    DB_POOL_PROFILE = {
+        "mode": "auto",
+        "pool_size": 5,
+        "max_overflow": 5,
+        "gevent_pool_size": 10,
+        "gevent_max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pre_ping": True,
+        "statement_timeout": 0,
+    }
 
 
 class TestingConfig(Config):
@@ -49,7 +81,23 @@ class TestingConfig(Config):
         f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
     )
     WTF_CSRF_ENABLED = False
+    JOBS_RUN_SYNC = True
+    RESPONSE_CACHE_BACKEND = "none"
+    FRAGMENT_CACHE_BACKEND = "none"
 
 
 class ProductionConfig(Config):
     DEBUG = False
+    # Un pool por worker de gunicorn: workers * (pool_size + max_overflow) debe caber en max_connections
+    DB_POOL_PROFILE = {
+        "mode": "auto",
+        "pool_size": 10,
+        "max_overflow": 20,
+        "gevent_pool_size": 20,
+        "gevent_max_overflow": 40,
+        "pool_timeout": 30,
+        "pool_recycle": 280,
+        "pre_ping": True,
+        "connect_timeout": 10,
+        "statement_timeout": 30,
+    }
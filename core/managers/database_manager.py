@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, jsonify, session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from core.managers.metrics_manager import check_metrics_access
+from core.metrics.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS
+from core.repositories.routing import REPLICA_BIND_PREFIX
+
+logger = logging.getLogger(__name__)
+
+POOL_MODES = ("auto", "queue", "gevent", "null")
+
+# Límites (en segundos) de los buckets del histograma de espera al obtener una conexión
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+def gevent_patched() -> bool:
+    """Whether the process runs under gevent (e.g. ``gunicorn -k gevent``) with sockets monkey-patched."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+class PoolMetrics:
+    """Checkout wait time, utilisation and connection churn of one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool = None
+        self.max_overflow = 0
+        self.checkouts = 0
+        self.checkout_errors = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_wait_buckets = [0] * len(CHECKOUT_WAIT_BUCKETS)
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.connections_invalidated = 0
+
+    def observe_checkout(self, seconds: float, failed: bool = False):
+        DB_POOL_CHECKOUT_WAIT.observe(seconds)
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_errors += int(failed)
+            self.checkout_wait_seconds += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+            for index, bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.checkout_wait_buckets[index] += 1
+
+    def count(self, counter: str):
+        DB_POOL_CONNECTIONS.labels(event=counter.replace("connections_", "")).inc()
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def listen(self, engine):
+        """Attach to the pool events of ``engine`` (they survive ``engine.dispose()``)."""
+        self.pool = engine.pool
+        self.max_overflow = getattr(engine.pool, "_max_overflow", 0)
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = self
+        event.listen(engine, "connect", lambda *args: self.count("connections_opened"))
+        event.listen(engine, "close", lambda *args: self.count("connections_closed"))
+        event.listen(engine, "close_detached", lambda *args: self.count("connections_closed"))
+        event.listen(engine, "invalidate", lambda *args: self.count("connections_invalidated"))
+        event.listen(engine, "engine_disposed", lambda engine: setattr(self, "pool", engine.pool))
+        event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+        event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        size = pool.size() if isinstance(pool, QueuePool) else 0
+        checked_out = pool.checkedout() if isinstance(pool, QueuePool) else 0
+        capacity = size + max(self.max_overflow, 0)
+        with self._lock:
+            return {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                "size": size,
+                "max_overflow": self.max_overflow,
+                "checked_out": checked_out,
+                "overflow": pool.overflow() if isinstance(pool, QueuePool) else 0,
+                "utilisation": round(checked_out / capacity, 4) if capacity else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_errors": self.checkout_errors,
+                "checkout_wait_seconds_total": round(self.checkout_wait_seconds, 6),
+                "checkout_wait_seconds_max": round(self.checkout_wait_max, 6),
+                "checkout_wait_buckets": dict(zip(CHECKOUT_WAIT_BUCKETS, self.checkout_wait_buckets)),
+                "connections_opened": self.connections_opened,
+                "connections_closed": self.connections_closed,
+                "connections_invalidated": self.connections_invalidated,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """``QueuePool`` that records how long each checkout takes (waiting for a free slot, pre-ping, connecting)."""
+
+    metrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+        failed = True
+        try:
+            connection = super().connect()
+            failed = False
+            return connection
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_checkout(time.perf_counter() - start, failed)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _env(name: str, default, kind=int):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if kind is bool:
+        return value.lower() in ("1", "true", "yes", "on")
+    return kind(value)
+
+
+def build_engine_options(database_uri: str, profile: dict) -> dict:
+    """
+    ``SQLALCHEMY_ENGINE_OPTIONS`` for ``database_uri`` from a config profile overridden by ``DB_*`` env vars.
+
+    ``DB_POOL_MODE`` selects the pool: ``queue`` (one pool per worker process), ``gevent`` (larger LIFO pool
+    shared by the greenlets of a gevent worker), ``null`` (no pooling, e.g. behind an external pooler) or
+    ``auto`` (``gevent`` when gevent has monkey-patched the process, ``queue`` otherwise).
+    """
+    mode = _env("DB_POOL_MODE", profile.get("mode", "auto"), str).lower()
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}")
+    if mode == "auto":
+        mode = "gevent" if gevent_patched() else "queue"
+
+    url = make_url(database_uri)
+    options = {"pool_pre_ping": _env("DB_POOL_PRE_PING", profile.get("pre_ping", True), bool)}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # SQLite en memoria usa su propio pool de una conexión por hilo
+        return options
+
+    if mode == "null":
+        options["poolclass"] = NullPool
+    else:
+        gevent = mode == "gevent"
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=_env("DB_POOL_SIZE", profile.get("gevent_pool_size" if gevent else "pool_size", 5)),
+            max_overflow=_env("DB_MAX_OVERFLOW", profile.get("gevent_max_overflow" if gevent else "max_overflow", 10)),
+            pool_timeout=_env("DB_POOL_TIMEOUT", profile.get("pool_timeout", 30), float),
+            pool_recycle=_env("DB_POOL_RECYCLE", profile.get("pool_recycle", 1800)),
+            # LIFO deja que las conexiones sobrantes envejezcan y se reciclen cuando baja la carga
+            pool_use_lifo=gevent,
+        )
+
+    if url.get_backend_name() in ("mysql", "mariadb"):
+        connect_args = {"connect_timeout": _env("DB_CONNECT_TIMEOUT", profile.get("connect_timeout", 10))}
+        statement_timeout = _env("DB_STATEMENT_TIMEOUT", profile.get("statement_timeout", 0), float)
+        if statement_timeout > 0:
+            # max_statement_time de MariaDB, en segundos
+            connect_args["init_command"] = f"SET SESSION max_statement_time={statement_timeout:g}"
+        options["connect_args"] = connect_args
+    return options
+
+
+class DatabaseManager:
+    def __init__(self, app):
+        self.app = app
+
+    def configure_engine(self):
+        """
+        Fill ``SQLALCHEMY_ENGINE_OPTIONS`` from the config's ``DB_POOL_PROFILE`` and add the read replicas
+        listed in ``DB_REPLICA_URIS`` (comma separated) as ``replica_<n>`` binds. Call before ``db.init_app``.
+        """
+        replica_uris = [uri.strip() for uri in os.getenv("DB_REPLICA_URIS", "").split(",") if uri.strip()]
+        if replica_uris:
+            binds = self.app.config.setdefault("SQLALCHEMY_BINDS", {})
+            for index, uri in enumerate(replica_uris):
+                binds[f"{REPLICA_BIND_PREFIX}{index}"] = uri
+
+        profile = self.app.config.get("DB_POOL_PROFILE")
+        if profile is None or "SQLALCHEMY_ENGINE_OPTIONS" in self.app.config:
+            return
+        self.app.config["SQLALCHEMY_ENGINE_OPTIONS"] = build_engine_options(
+            self.app.config["SQLALCHEMY_DATABASE_URI"], profile
+        )
+
+    def register_pool_metrics(self, db):
+        with self.app.app_context():
+            metrics = PoolMetrics()
+            metrics.listen(db.engine)
+        self.app.extensions["pool_metrics"] = metrics
+
+        self.app.add_url_rule("/metrics/db-pool", "db_pool_metrics", db_pool_metrics)
+
+    def register_replica_stickiness(self, db):
+        """
+        Keep a client on the primary for ``DB_REPLICA_STICKY_SECONDS`` after a request of theirs wrote,
+        so the page it redirects to does not read a replica that has not caught up yet.
+        """
+        if not any(str(key).startswith(REPLICA_BIND_PREFIX) for key in self.app.config.get("SQLALCHEMY_BINDS", {})):
+            return
+        sticky_seconds = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+        @self.app.before_request
+        def stick_to_primary():
+            if session.get("_db_primary_until", 0) > time.time():
+                db.session().primary_sticky = True
+
+        @self.app.after_request
+        def remember_write(response):
+            if db.session.registry.has() and db.session().primary_sticky:
+                session["_db_primary_until"] = time.time() + sticky_seconds
+            return response
+
+
+def db_pool_metrics():
+    error = check_metrics_access()
+    if error is not None:
+        return error
+    return jsonify(current_app.extensions["pool_metrics"].snapshot())
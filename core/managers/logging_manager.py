@@ -1,5 +1,36 @@
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from core.logging.json_formatter import JSONFormatter
+from core.logging.request_context import (
+    REQUEST_ID_HEADER,
+    RequestContextFilter,
+    assign_request_id,
+    get_request_id,
+)
+from core.logging.sampling import SamplingFilter
+
+# Loggers que pasan por la cola: el de la app ("app", padre de app.modules.*) y los de core
+LOGGER_NAMES = ("app", "core")
+
+
+class RecordQueueHandler(QueueHandler):
+    """``QueueHandler`` that keeps the traceback apart from the message, for the JSON formatter."""
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
 
 
 class LoggingManager:
@@ -7,23 +38,72 @@ class LoggingManager:
         self.app = app
 
     def setup_logging(self):
-        # Configure log format
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        """
+        Send the app's log records through a queue, so request threads never wait on log I/O.
+
+        A ``QueueHandler`` stamps each record with the request id and enqueues it; a ``QueueListener``
+        thread writes JSON lines to the rotating error file and, in debug or with ``LOG_TO_STDOUT=true``,
+        to the console. Records below INFO are sampled at ``LOG_DEBUG_SAMPLE_RATE``.
+        """
+        formatter = JSONFormatter()
 
         # Configure the log file with file rotation
-        file_handler = RotatingFileHandler("app.log", maxBytes=10240, backupCount=10)
+        file_handler = RotatingFileHandler(
+            "app.log", maxBytes=int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024))), backupCount=10
+        )
         file_handler.setLevel(logging.ERROR)
         file_handler.setFormatter(formatter)
-
-        # Add handler to app logger
-        self.app.logger.addHandler(file_handler)
+        handlers = [file_handler]
 
         # Configure console log if necessary
-        if self.app.debug:
+        if self.app.debug or os.getenv("LOG_TO_STDOUT", "false").lower() == "true":
             stream_handler = logging.StreamHandler()
-            stream_handler.setLevel(logging.INFO)
+            stream_handler.setLevel(logging.DEBUG)
             stream_handler.setFormatter(formatter)
-            self.app.logger.addHandler(stream_handler)
+            handlers.append(stream_handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = RecordQueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        queue_handler.addFilter(SamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01")), logging.INFO))
+        queue_handler._logging_manager = True
+
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(_stop_listener, listener)
 
         # Set the overall log level
-        self.app.logger.setLevel(logging.INFO)
+        level = os.getenv("LOG_LEVEL", "INFO").upper()
+        for name in LOGGER_NAMES:
+            logger = logging.getLogger(name)
+            self._remove_previous_pipeline(logger)
+            logger.addHandler(queue_handler)
+            logger.setLevel(level)
+        queue_handler._listener = listener
+
+        # ``g`` puede sobrevivir a la petición (contexto de aplicación ya abierto), así que se asigna siempre
+        @self.app.before_request
+        def start_request_log_context():
+            assign_request_id()
+
+        @self.app.after_request
+        def add_request_id_header(response):
+            response.headers[REQUEST_ID_HEADER] = get_request_id()
+            return response
+
+    @staticmethod
+    def _remove_previous_pipeline(logger):
+        # create_app puede llamarse varias veces (tests): se sustituye la cola anterior en vez de duplicarla
+        from flask.logging import default_handler
+
+        logger.removeHandler(default_handler)
+        for handler in list(logger.handlers):
+            if getattr(handler, "_logging_manager", False):
+                logger.removeHandler(handler)
+                _stop_listener(getattr(handler, "_listener", None))
+
+
+def _stop_listener(listener):
+    # Vacía la cola antes de salir; stop() falla si el hilo ya se paró
+    if listener is not None and listener._thread is not None:
+        listener.stop()
@@ -0,0 +1,65 @@
+import os
+import time
+
+from flask import current_app, g, jsonify, request
+from sqlalchemy import event
+
+from core.metrics.metrics import DB_QUERY_LATENCY, REQUEST_LATENCY, render_latest, statement_type
+
+
+def check_metrics_access():
+    """``None`` when the caller may read metrics, otherwise the error response to return."""
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return jsonify({"message": "Unauthorized"}), 401
+    elif not current_app.debug and not current_app.testing:
+        return jsonify({"message": "Set METRICS_TOKEN to expose metrics"}), 403
+    return None
+
+
+class MetricsManager:
+    """Request and SQL latency histograms, plus the ``/metrics`` endpoint in Prometheus text format."""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+
+    def setup_metrics(self):
+        with self.app.app_context():
+            for engine in self.db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        @self.app.before_request
+        def start_timer():
+            g._metrics_start = time.perf_counter()
+
+        @self.app.after_request
+        def observe_request(response):
+            start = g.pop("_metrics_start", None)
+            if start is not None and request.endpoint != "metrics":
+                # Las rutas inexistentes comparten etiqueta para no disparar la cardinalidad
+                REQUEST_LATENCY.labels(
+                    method=request.method, endpoint=request.endpoint or "unmatched", status=response.status_code
+                ).observe(time.perf_counter() - start)
+            return response
+
+        self.app.add_url_rule("/metrics", "metrics", metrics)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY_LATENCY.labels(statement=statement_type(statement)).observe(
+            time.perf_counter() - context._metrics_start
+        )
+
+
+def metrics():
+    error = check_metrics_access()
+    if error is not None:
+        return error
+    return current_app.response_class(render_latest(), mimetype="text/plain; version=0.0.4; charset=utf-8")
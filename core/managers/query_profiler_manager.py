@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+import traceback
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+APP_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def _app_frame():
+    """First frame of our own code (app/ or core/, excluding this module) that led to the query."""
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_ROOT) and "site-packages" not in filename and filename != os.path.abspath(__file__):
+            return f"{os.path.relpath(filename, APP_ROOT)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class QueryProfile:
+    """SQL statements executed during one request."""
+
+    def __init__(self, n_plus_one_threshold: int):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = Counter()
+        self.executions = Counter()
+        self.n_plus_one = {}
+
+    def record(self, statement: str, parameters, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        self.executions[(statement, repr(parameters))] += 1
+        # La misma consulta repetida con distintos parámetros suele ser una carga perezosa dentro de un bucle
+        if self.statements[statement] == self.n_plus_one_threshold:
+            self.n_plus_one[statement] = _app_frame()
+
+    @property
+    def duplicates(self) -> int:
+        """Executions that repeated an identical statement with identical parameters."""
+        return sum(count - 1 for count in self.executions.values() if count > 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_seconds * 1000, 2),
+            "duplicates": self.duplicates,
+            "n_plus_one": [
+                {"statement": " ".join(statement.split())[:200], "count": self.statements[statement], "origin": origin}
+                for statement, origin in self.n_plus_one.items()
+            ],
+        }
+
+
+class QueryProfilerManager:
+    """
+    Opt-in per-request SQL profiler (``SQL_PROFILER=true``).
+
+    Counts the statements each request runs and their total time, spots identical statements
+    repeated with the same parameters (duplicates) or with different ones at least
+    ``SQL_PROFILER_N_PLUS_ONE_THRESHOLD`` times (N+1), adds a ``Server-Timing`` header and logs a
+    structured log record per request (a warning when an N+1 pattern was found).
+    """
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+
+    def setup_profiler(self):
+        if not self.app.config.get("SQL_PROFILER"):
+            return
+        threshold = int(self.app.config.get("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", 5))
+
+        with self.app.app_context():
+            for engine in self.db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        @self.app.before_request
+        def start_profile():
+            g._query_profile = QueryProfile(threshold)
+
+        @self.app.after_request
+        def report_profile(response):
+            profile = g.pop("_query_profile", None)
+            if profile is None:
+                return response
+            summary = profile.to_dict()
+            response.headers.add("Server-Timing", f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"')
+            logger.log(
+                logging.WARNING if summary["n_plus_one"] else logging.INFO,
+                "SQL profile of %s: %d queries in %.2f ms",
+                request.endpoint,
+                summary["queries"],
+                summary["db_ms"],
+                extra={"event": "sql_profile", "endpoint": request.endpoint, "status": response.status_code, **summary},
+            )
+            return response
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profiler_start = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._profiler_start
+        if has_request_context():
+            profile = g.get("_query_profile")
+            if profile is not None:
+                profile.record(statement, parameters, elapsed)
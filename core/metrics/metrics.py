@@ -0,0 +1,81 @@
+"""
+Prometheus metrics of the app.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (before the app is imported) every gunicorn worker writes its
+samples to memory-mapped files in that directory and ``/metrics`` aggregates all of them, whichever
+worker answers the scrape. Without it the metrics live in the current process only (dev server, tests).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Buckets en segundos: desde consultas SQL rápidas hasta entrenamientos y ZIPs de varios segundos
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by endpoint",
+    ["method", "endpoint", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Latency of SQL statements by type", ["statement"], buckets=FAST_BUCKETS
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the pool", buckets=FAST_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out", multiprocess_mode="livesum"
+)
+DB_POOL_CONNECTIONS = Counter("db_pool_connection_events_total", "Pool connection churn", ["event"])
+RECOMMENDER_LATENCY = Histogram(
+    "recommender_duration_seconds", "Recommender training and query time", ["operation"], buckets=SLOW_BUCKETS
+)
+NLP_DOCUMENTS = Counter("nlp_documents_processed_total", "Documents run through NLP preprocessing")
+NLP_LATENCY = Histogram(
+    "nlp_preprocessing_duration_seconds", "NLP preprocessing time per document", buckets=FAST_BUCKETS
+)
+EXTERNAL_API_LATENCY = Histogram(
+    "external_api_request_duration_seconds",
+    "Latency of Zenodo/Fakenodo API calls",
+    ["service", "method", "status"],
+    buckets=SLOW_BUCKETS,
+)
+ZIP_BUILD_LATENCY = Histogram("dataset_zip_build_duration_seconds", "Time to build dataset ZIPs", buckets=SLOW_BUCKETS)
+RESPONSE_CACHE_REQUESTS = Counter("response_cache_requests_total", "Public page cache lookups by result", ["result"])
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the duration of the ``with`` block in ``histogram`` (with ``labels`` if it has any)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def statement_type(statement: str) -> str:
+    words = statement.lstrip(" (").split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def render_latest() -> bytes:
+    """Text exposition of every metric, aggregated across worker processes when running multiprocess."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of a dead worker (called from gunicorn's ``child_exit`` hook)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -1,9 +1,20 @@
-from typing import Generic, List, NoReturn, Optional, TypeVar, Union
+from typing import Generic, Iterable, List, NoReturn, Optional, TypeVar, Union
+
+from sqlalchemy import delete, insert, inspect, update
 
 import app
 
 T = TypeVar("T")
 
+BULK_BATCH_SIZE = 1000
+
+
+def _batches(items: list, batch_size: int):
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    for start in range(0, len(items), batch_size):
+        yield items[start : start + batch_size]
+
 
 class BaseRepository(Generic[T]):
     def __init__(self, model: T):
@@ -19,6 +30,40 @@ class BaseRepository(Generic[T]):
             self.session.flush()
         return instance
 
+    def bulk_create(
+        self, rows: Iterable[dict], returning: bool = False, batch_size: int = BULK_BATCH_SIZE, commit: bool = True
+    ) -> Union[int, List[int]]:
+        """
+        Insert many rows with one executemany ``INSERT`` per batch, without building ORM instances.
+
+        Returns the number of inserted rows, or their primary keys (in order) when ``returning`` is set.
+        Databases without ``INSERT ... RETURNING`` for executemany fall back to an ORM flush, which still
+        batches the inserts where it can. Instances already in the session do not see the new rows until
+        they are expired (``commit`` does that).
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if returning else 0
+
+        primary_key = inspect(self.model).primary_key[0]
+        ids = []
+        for batch in _batches(rows, batch_size):
+            if not returning:
+                self.session.execute(insert(self.model), batch)
+            elif self.session.get_bind().dialect.insert_executemany_returning:
+                result = self.session.execute(
+                    insert(self.model).returning(primary_key, sort_by_parameter_order=True), batch
+                )
+                ids.extend(result.scalars().all())
+            else:
+                instances = [self.model(**row) for row in batch]
+                self.session.add_all(instances)
+                self.session.flush()
+                ids.extend(getattr(instance, primary_key.key) for instance in instances)
+
+        self._finish(commit)
+        return ids if returning else len(rows)
+
     def get_by_id(self, id: int) -> Optional[T]:
         instance: Optional[T] = self.model.query.get(id)
         return instance
@@ -39,6 +84,32 @@ class BaseRepository(Generic[T]):
             return instance
         return None
 
+    def bulk_update(self, rows: Iterable[dict], batch_size: int = BULK_BATCH_SIZE, commit: bool = True) -> int:
+        """
+        Update many rows by primary key with one executemany ``UPDATE`` per batch.
+
+        Every dict must include the primary key plus the columns to change; rows may change different columns.
+        Returns the number of rows given.
+        """
+        rows = list(rows)
+        primary_key = inspect(self.model).primary_key[0].key
+        if any(primary_key not in row for row in rows):
+            raise ValueError(f"Every row must include the primary key '{primary_key}'")
+
+        for batch in _batches(rows, batch_size):
+            self.session.execute(update(self.model), batch)
+        self._finish(commit)
+        return len(rows)
+
+    def update_where(self, values: dict, commit: bool = True, **filters) -> int:
+        """Set-based ``UPDATE ... SET values WHERE column = value AND ...``. Returns the matched row count."""
+        if not filters:
+            raise ValueError("update_where needs at least one filter")
+        statement = update(self.model).where(*self._filters(filters)).values(**values)
+        result = self.session.execute(statement)
+        self._finish(commit)
+        return result.rowcount
+
     def delete(self, id: int) -> bool:
         instance: Optional[T] = self.get_by_id(id)
         if instance:
@@ -57,5 +128,42 @@ class BaseRepository(Generic[T]):
         self.session.commit()
         return True
 
+    def bulk_delete(
+        self, ids: Iterable[int] = None, batch_size: int = BULK_BATCH_SIZE, commit: bool = True, **filters
+    ) -> int:
+        """
+        Set-based ``DELETE`` by primary keys (``IN`` lists of ``batch_size``) and/or ``column=value`` filters.
+
+        Unlike ``delete``/``delete_by_column`` it does not load the instances, so ORM ``cascade`` rules
+        and events do not run: only use it where the database constraints cover the dependants.
+        Returns the number of deleted rows.
+        """
+        if ids is None and not filters:
+            raise ValueError("bulk_delete needs ids or at least one filter")
+
+        conditions = self._filters(filters)
+        statements = []
+        if ids is None:
+            statements.append(delete(self.model).where(*conditions))
+        else:
+            primary_key = inspect(self.model).primary_key[0]
+            for batch in _batches(list(ids), batch_size):
+                statements.append(delete(self.model).where(primary_key.in_(batch), *conditions))
+
+        deleted = 0
+        for statement in statements:
+            deleted += self.session.execute(statement).rowcount
+        self._finish(commit)
+        return deleted
+
     def count(self) -> int:
         return self.model.query.count()
+
+    def _filters(self, filters: dict) -> list:
+        return [getattr(self.model, column_name) == value for column_name, value in filters.items()]
+
+    def _finish(self, commit: bool):
+        if commit:
+            self.session.commit()
+        else:
+            self.session.flush()
@@ -0,0 +1,87 @@
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND_PREFIX = "replica_"
+
+_read_only = ContextVar("read_only", default=False)
+
+
+def read_only(func):
+    """
+    Mark a repository or service method as read-only so its queries may be served by a replica.
+
+    The replica is only used when ``DB_REPLICA_URIS`` is configured and the session has not written
+    anything yet (see ``RoutingSession``); otherwise the method runs against the primary as usual.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with reading_from_replica():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def reading_from_replica():
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the queries of ``read_only`` code to a read replica.
+
+    Everything else goes to the primary, and so does everything after the session has flushed or
+    committed a write: once a request writes, it keeps reading its own writes from the primary
+    (read-your-writes) until the session is closed at the end of the request. ``DatabaseManager``
+    extends that to the following requests of the same client for ``DB_REPLICA_STICKY_SECONDS``,
+    which covers the redirect after a form POST.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.primary_sticky = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            replicas = [engine for key, engine in self._db.engines.items() if _is_replica_key(key)]
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause) -> bool:
+        if not _read_only.get() or self.primary_sticky or self._flushing:
+            return False
+        if getattr(clause, "is_dml", False):
+            return False
+        # Con cambios pendientes el autoflush escribirá en el primario: se lee de ahí
+        return not (self.new or self.dirty or self.deleted)
+
+    def close(self):
+        super().close()
+        self.primary_sticky = False
+
+
+def _is_replica_key(key) -> bool:
+    return isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary_after_flush(session, flush_context):
+    session.primary_sticky = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _stick_to_primary_after_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE ejecutados con session.execute (p. ej. las operaciones bulk_*)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.primary_sticky = True
@@ -1,9 +1,16 @@
+import base64
+import json
+import os
 from datetime import datetime
 
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
 
 from app import db
+from core.serialisers.serializer import encode_json
+
+DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
 
 
 def convert_value(value):
@@ -19,14 +26,76 @@ class GenericResource(Resource):
         self.serializer = serializer
 
     def get(self, id=None):
+        try:
+            fields = self._get_fields()
+            options = self.serializer.load_options(self.model, fields)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
         if id:
-            item = self.model.query.get(id)
+            item = db.session.get(self.model, id, options=options)
             if not item:
                 return {"message": f"{self.model_name} not found"}, 404
-            return self.serializer.serialize(item), 200
-        else:
-            items = self.model.query.all()
-            return {"items": [self.serializer.serialize(i) for i in items]}, 200
+            return self.serializer.serialize(item, fields), 200
+
+        # Paginación por clave (keyset): coste constante sea cual sea la página
+        key = self.model.__mapper__.primary_key[0]
+        try:
+            limit = self._get_limit()
+            last_key = self._decode_cursor(request.args.get("cursor"), key.type.python_type)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+
+        query = self.model.query.options(*options).order_by(key)
+        if last_key is not None:
+            query = query.filter(key > last_key)
+        items = query.limit(limit + 1).all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = self._encode_cursor(getattr(items[-1], key.key))
+
+        body = encode_json(
+            {"items": self.serializer.serialize_many(items, fields), "limit": limit, "next_cursor": next_cursor}
+        )
+        return current_app.response_class(body, status=200, mimetype="application/json")
+
+    @staticmethod
+    def _get_fields():
+        fields = request.args.get("fields")
+        if not fields:
+            return None
+        return [field.strip() for field in fields.split(",") if field.strip()]
+
+    @staticmethod
+    def _get_limit() -> int:
+        limit = request.args.get("limit", DEFAULT_PAGE_SIZE)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer") from None
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        return min(limit, MAX_PAGE_SIZE)
+
+    @staticmethod
+    def _encode_cursor(value) -> str:
+        return base64.urlsafe_b64encode(json.dumps({"after": value}).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor, key_type: type):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value = json.loads(base64.urlsafe_b64decode(padded))["after"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor") from None
+        # Solo un escalar del tipo de la clave primaria llega al filtro (bool es subclase de int)
+        if isinstance(value, bool) or not isinstance(value, key_type):
+            raise ValueError("Invalid cursor")
+        return value
 
     def post(self):
         data = request.get_json()
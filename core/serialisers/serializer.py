@@ -1,5 +1,17 @@
+import inspect as pyinspect
+import json
 from datetime import datetime
 
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+try:
+    import msgspec
+
+    _json_encoder = msgspec.json.Encoder()
+except ImportError:  # pragma: no cover - msgspec está en requirements, el fallback es por si acaso
+    _json_encoder = None
+
 
 def convert_value(value):
     if isinstance(value, datetime):
@@ -7,25 +19,148 @@ def convert_value(value):
     return value
 
 
+def encode_json(data) -> bytes:
+    """Encode serialized data as JSON bytes, with msgspec when it is available."""
+    if _json_encoder is not None:
+        return _json_encoder.encode(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _generic_value(instance, attr_name):
+    # Comportamiento original para atributos que no se pueden resolver en la clase
+    attr = getattr(instance, attr_name, None)
+    if callable(attr):
+        attr = attr()
+    return convert_value(attr)
+
+
+def _is_plain_column(class_attr) -> bool:
+    """Whether ``class_attr`` is a mapped column whose values never need ``convert_value``."""
+    columns = getattr(getattr(class_attr, "property", None), "columns", None)
+    if not columns:
+        return False
+    try:
+        return not issubclass(columns[0].type.python_type, datetime)
+    except (AttributeError, NotImplementedError):
+        return False
+
+
+def _related_value(serialize, related_data):
+    if isinstance(related_data, list):
+        return [serialize(sub_instance) for sub_instance in related_data]
+    return serialize(related_data)
+
+
 class Serializer:
-    def __init__(self, serialization_fields, related_serializers=None):
+    def __init__(self, serialization_fields, related_serializers=None, eager_load=None):
         self.serialization_fields = serialization_fields
         self.related_serializers = related_serializers or {}
+        # campo -> rutas de relaciones que necesita ese campo, p. ej. {"files": ["csv_models.files"]}
+        self.eager_load = eager_load or {}
+        # (clase, campos) -> función de serialización compilada; clase -> plan con todos los campos
+        self._plans = {}
+        self._default_plans = {}
+
+    def resolve_fields(self, fields=None) -> list[str]:
+        """Validate a field selection (``None`` means every field). Raises ``ValueError`` on unknown fields."""
+        if not fields:
+            return list(self.serialization_fields)
+        unknown = [field for field in fields if field not in self.serialization_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(fields)
+
+    def load_options(self, model, fields=None) -> list:
+        """
+        SQLAlchemy loader options for the relationship paths the selected fields need.
+
+        Collections are loaded with ``selectinload`` (one extra query per level) and many-to-one or
+        one-to-one relationships with ``joinedload``, so serializing N instances costs a fixed number of queries.
+        """
+        paths = []
+        for field in self.resolve_fields(fields):
+            for path in self.eager_load.get(field, []):
+                if path not in paths:
+                    paths.append(path)
+
+        options = []
+        for path in paths:
+            option = None
+            current = model
+            for name in path.split("."):
+                attribute = getattr(current, name)
+                relationship = inspect(current).relationships[name]
+                loader = selectinload if relationship.uselist else joinedload
+                option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+                current = relationship.mapper.class_
+            options.append(option)
+        return options
+
+    def serialize(self, instance, fields=None):
+        if not fields:
+            plan = self._default_plans.get(type(instance))
+            if plan is not None:
+                return plan(instance)
+        return self._get_plan(type(instance), self._fields_key(fields))(instance)
+
+    def serialize_many(self, instances, fields=None) -> list[dict]:
+        """Serialize a batch, validating the fields and looking up the compiled plan once per class."""
+        fields_key = self._fields_key(fields)
+        plan_class = plan = None
+        result = []
+        for instance in instances:
+            if type(instance) is not plan_class:
+                plan_class = type(instance)
+                plan = self._get_plan(plan_class, fields_key)
+            result.append(plan(instance))
+        return result
+
+    def serialize_many_json(self, instances, fields=None) -> bytes:
+        return encode_json(self.serialize_many(instances, fields))
+
+    def _fields_key(self, fields) -> tuple:
+        return tuple(self.resolve_fields(fields)) if fields else tuple(self.serialization_fields)
+
+    def _get_plan(self, cls, fields_key):
+        plan = self._plans.get((cls, fields_key))
+        if plan is None:
+            plan = self._plans[(cls, fields_key)] = self._compile(cls, fields_key)
+            if fields_key == tuple(self.serialization_fields):
+                self._default_plans[cls] = plan
+        return plan
+
+    def _compile(self, cls, fields):
+        """
+        Generate a function that builds the serialized dict of a ``cls`` instance in a single expression.
+
+        How to read each field (plain attribute or method call) is decided once from the class, so the
+        per-instance ``getattr``/``callable`` checks disappear. Attributes not found on the class fall back
+        to the generic lookup.
+        """
+        namespace = {
+            "_datetime": datetime,
+            "_generic_value": _generic_value,
+            "_related_value": _related_value,
+        }
+        items = []
+        for index, key in enumerate(fields):
+            attr_name = self.serialization_fields[key]
+            class_attr = pyinspect.getattr_static(cls, attr_name, None) if attr_name.isidentifier() else None
 
-    def serialize(self, instance):
-        serialized_data = {}
-        for key, attr_name in self.serialization_fields.items():
             if key in self.related_serializers:
-                related_data = getattr(instance, attr_name)()
-                if isinstance(related_data, list):
-                    serialized_data[key] = [
-                        self.related_serializers[key].serialize(sub_instance) for sub_instance in related_data
-                    ]
-                else:
-                    serialized_data[key] = self.related_serializers[key].serialize(related_data)
+                namespace[f"_related_{index}"] = self.related_serializers[key].serialize
+                value = f"_related_value(_related_{index}, obj.{attr_name}())"
+            elif class_attr is None:
+                namespace[f"_attr_{index}"] = attr_name
+                value = f"_generic_value(obj, _attr_{index})"
+            elif _is_plain_column(class_attr):
+                value = f"obj.{attr_name}"
+            elif pyinspect.isfunction(class_attr) or isinstance(class_attr, (staticmethod, classmethod)):
+                value = f"(_v.isoformat() if isinstance(_v := obj.{attr_name}(), _datetime) else _v)"
             else:
-                attr = getattr(instance, attr_name, None)
-                if callable(attr):
-                    attr = attr()
-                serialized_data[key] = convert_value(attr)
-        return serialized_data
+                value = f"(_v.isoformat() if isinstance(_v := obj.{attr_name}, _datetime) else _v)"
+            items.append(f"{key!r}: {value}")
+
+        source = "def _plan(obj):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<serializer plan {cls.__name__}>", "exec"), namespace)
+        return namespace["_plan"]
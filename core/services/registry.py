@@ -0,0 +1,47 @@
+from flask import g, has_request_context
+
+_SERVICES = "_request_services"
+_IDENTITY_MAP = "_request_identity_map"
+
+
+def get_service(service_class):
+    """
+    Instance of ``service_class`` shared by the whole request.
+
+    Model helpers called from templates use it instead of building a service (and all its
+    repositories) on every call. Outside a request a new instance is returned, as before.
+    """
+    if not has_request_context():
+        return service_class()
+    services = g.setdefault(_SERVICES, {})
+    if service_class not in services:
+        services[service_class] = service_class()
+    return services[service_class]
+
+
+def request_memoize(namespace: str, key, loader):
+    """
+    Return ``loader()`` memoized for the current request under ``(namespace, key)``.
+
+    Used for lookups derived from an entity (its owner, its dataset, its path...) so repeated
+    template calls during one render hit the database at most once per entity. Nothing is
+    shared between requests, so there is no invalidation to care about; outside a request
+    ``loader`` is simply called.
+    """
+    if not has_request_context() or key is None:
+        return loader()
+    identity_map = g.setdefault(_IDENTITY_MAP, {})
+    cache_key = (namespace, key)
+    if cache_key not in identity_map:
+        identity_map[cache_key] = loader()
+    return identity_map[cache_key]
+
+
+def clear_request_registry(exception=None):
+    g.pop(_SERVICES, None)
+    g.pop(_IDENTITY_MAP, None)
+
+
+def init_app(app):
+    # En los tests el contexto de aplicación (y por tanto ``g``) dura varias peticiones
+    app.teardown_request(clear_request_registry)
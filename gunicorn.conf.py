@@ -0,0 +1,8 @@
+# Gunicorn loads ./gunicorn.conf.py automatically; the command line options of the entrypoints still apply.
+
+
+def child_exit(server, worker):
+    # Las métricas en vivo (gauges) de un worker muerto no deben seguir sumando
+    from core.metrics.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,25 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from app.modules.dataset.beer_catalog import write_beer_table
+from app.modules.hubfile.repositories import HubfileRepository
+from core.files.file_serving import uploads_root
+
+
+@click.command("csv:columnar", help="Rebuilds the columnar copy of every uploaded CSV used by /explore/beers.")
+@with_appcontext
+def csv_columnar():
+    written = missing = 0
+
+    for hubfile, user_id, dataset_id in HubfileRepository().get_all_download_targets():
+        path = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset_id}", hubfile.name)
+        if not os.path.exists(path):
+            click.echo(click.style(f"File '{hubfile.name}' of dataset {dataset_id} not found, skipping.", fg="yellow"))
+            missing += 1
+            continue
+        write_beer_table(dataset_id, hubfile.id, path)
+        written += 1
+
+    click.echo(click.style(f"Wrote the columnar tables of {written} CSV file(s), {missing} not found.", fg="green"))
@@ -0,0 +1,36 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from app import db
+from app.modules.csvmodel.models import FMMetrics
+from app.modules.csvmodel.repositories import FMMetaDataRepository
+from app.modules.dataset.csv_stats import compute_csv_stats
+from app.modules.hubfile.services import HubfileService
+
+
+@click.command("csv:stats", help="Computes the statistics of the CSV files uploaded before they were stored.")
+@with_appcontext
+def csv_stats():
+    hubfile_service = HubfileService()
+    computed = missing = 0
+
+    for fm_meta_data in FMMetaDataRepository().get_without_stats():
+        files = fm_meta_data.csv_model.files if fm_meta_data.csv_model else []
+        path = hubfile_service.get_path_by_hubfile(files[0]) if files else None
+        if path is None or not os.path.exists(path):
+            click.echo(click.style(f"File of '{fm_meta_data.csv_filename}' not found, skipping.", fg="yellow"))
+            missing += 1
+            continue
+
+        stats = compute_csv_stats(path)
+        if fm_meta_data.fm_metrics is None:
+            fm_meta_data.fm_metrics = FMMetrics(**stats)
+        else:
+            for field, value in stats.items():
+                setattr(fm_meta_data.fm_metrics, field, value)
+        computed += 1
+
+    db.session.commit()
+    click.echo(click.style(f"Computed the statistics of {computed} CSV file(s), {missing} not found.", fg="green"))
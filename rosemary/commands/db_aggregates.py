@@ -0,0 +1,31 @@
+import click
+from flask.cli import with_appcontext
+
+from app.modules.dataset.repositories import DataSetRepository
+
+
+@click.command(
+    "db:aggregates",
+    help="Checks that the files_count/total_size_bytes of every dataset match its file rows.",
+)
+@click.option("--fix", is_flag=True, help="Recompute the aggregates of the datasets that do not match.")
+@with_appcontext
+def db_aggregates(fix):
+    repository = DataSetRepository()
+    mismatches = repository.inconsistent_file_aggregates()
+
+    if not mismatches:
+        click.echo(click.style("All dataset aggregates are consistent.", fg="green"))
+        return
+
+    click.echo(f"{'Dataset':<10} {'files_count':<20} {'total_size_bytes':<30}")
+    click.echo("-" * 60)
+    for dataset_id, files_count, actual_count, total_size, actual_size in mismatches:
+        click.echo(f"{dataset_id:<10} {f'{files_count} -> {actual_count}':<20} {f'{total_size} -> {actual_size}':<30}")
+
+    if fix:
+        repository.refresh_file_aggregates([row[0] for row in mismatches])
+        click.echo(click.style(f"Fixed the aggregates of {len(mismatches)} dataset(s).", fg="green"))
+    else:
+        click.echo(click.style(f"{len(mismatches)} dataset(s) out of sync. Run with --fix to repair them.", fg="red"))
+        raise SystemExit(1)
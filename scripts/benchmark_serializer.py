@@ -0,0 +1,105 @@
+"""
+Microbenchmark de core.serialisers.Serializer.
+
+Compara la implementación original (getattr/callable por campo y por instancia) con los planes
+compilados, serialize_many y la codificación JSON con msgspec, sobre objetos en memoria con la
+misma forma que la API de datasets (sin base de datos).
+
+Uso: python scripts/benchmark_serializer.py [número de datasets] [ficheros por dataset]
+"""
+
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.serialisers.serializer import Serializer, convert_value, encode_json  # noqa: E402
+
+
+class File:
+    # Con __slots__ los atributos son descriptores de clase, como las columnas de los modelos SQLAlchemy
+    __slots__ = ("id", "name", "size")
+
+    def __init__(self, id):
+        self.id = id
+        self.name = f"file_{id}.csv"
+        self.size = 1024 * id
+
+    def get_formatted_size(self):
+        return f"{round(self.size / 1024, 2)} KB"
+
+
+class Dataset:
+    __slots__ = ("id", "created_at", "title", "_files")
+
+    def __init__(self, id, files_per_dataset):
+        self.id = id
+        self.created_at = datetime(2024, 1, 1, 12, 0, 0)
+        self.title = f"Dataset {id}"
+        self._files = [File(id * 100 + i) for i in range(files_per_dataset)]
+
+    def name(self):
+        return self.title
+
+    def get_csvhub_doi(self):
+        return f"/doi/10.1234/dataset{self.id}/"
+
+    def files(self):
+        return self._files
+
+
+def legacy_serialize(serializer, instance):
+    # Copia de Serializer.serialize antes de compilar los planes
+    serialized_data = {}
+    for key, attr_name in serializer.serialization_fields.items():
+        if key in serializer.related_serializers:
+            related_data = getattr(instance, attr_name)()
+            if isinstance(related_data, list):
+                serialized_data[key] = [
+                    legacy_serialize(serializer.related_serializers[key], sub_instance) for sub_instance in related_data
+                ]
+            else:
+                serialized_data[key] = legacy_serialize(serializer.related_serializers[key], related_data)
+        else:
+            attr = getattr(instance, attr_name, None)
+            if callable(attr):
+                attr = attr()
+            serialized_data[key] = convert_value(attr)
+    return serialized_data
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    files_per_dataset = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    file_serializer = Serializer({"file_id": "id", "file_name": "name", "size": "get_formatted_size"})
+    serializer = Serializer(
+        {"dataset_id": "id", "created": "created_at", "name": "name", "doi": "get_csvhub_doi", "files": "files"},
+        related_serializers={"files": file_serializer},
+    )
+    datasets = [Dataset(i, files_per_dataset) for i in range(count)]
+
+    assert [legacy_serialize(serializer, d) for d in datasets] == serializer.serialize_many(datasets)
+
+    cases = {
+        "legacy serialize": lambda: [legacy_serialize(serializer, d) for d in datasets],
+        "compiled serialize": lambda: [serializer.serialize(d) for d in datasets],
+        "serialize_many": lambda: serializer.serialize_many(datasets),
+        "legacy + json.dumps": lambda: json.dumps([legacy_serialize(serializer, d) for d in datasets]).encode(),
+        "serialize_many_json": lambda: encode_json(serializer.serialize_many(datasets)),
+    }
+
+    print(f"{count} datasets x {files_per_dataset} files")
+    baseline = None
+    for label, case in cases.items():
+        runs, total = timeit.Timer(case).autorange()
+        per_run = total / runs * 1000
+        baseline = baseline or per_run
+        print(f"  {label:<22} {per_run:8.2f} ms/run  ({baseline / per_run:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()